@@ -1,14 +1,16 @@
+import json
 import random
 import timeit
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Union
 
 from ottype import core_boost  # type: ignore
+from ottype import core_mypyc  # type: ignore
 from ottype import core
 from tests import utils
 
 NUM_ITERATION = 100_000
 
-CORE_IMPL = [("python", core), ("cython", core_boost)]
+CORE_IMPL = [("python", core), ("mypyc", core_mypyc), ("cython", core_boost)]
 
 random.seed(457700)
 
@@ -106,6 +108,156 @@ def benchmark_inverse_apply() -> None:
             print(f"| {test_config} | " + " | ".join(perfs) + " |")
 
 
+def benchmark_large_insert() -> None:
+    print("### Benchmark : 1 MB insert against a 1000-component op")
+    print()
+
+    print(
+        "| operation | " + " | ".join(f"{name} (ops/s)" for name, _ in CORE_IMPL) + " |"
+    )
+    print("|---|" + "---:|" * len(CORE_IMPL))
+
+    num_iteration = 100
+
+    text = utils.make_random_doc(1_000_000)
+    step = len(text) // 500
+
+    # alternating skips and deletes over the inserted text
+    fragmented_ots: list[Union[int, str, dict[str, str]]] = []
+    for pos in range(0, 500 * step, step):
+        fragmented_ots.append(step - 10)
+        fragmented_ots.append({"d": text[pos + step - 10 : pos + step]})
+
+    for operation in [
+        "core_impl.transform([text], fragmented_ots, 'left')",
+        "core_impl.compose([text], fragmented_ots)",
+    ]:
+        perfs: list[str] = []
+        baseline_perf = None
+        for _, core_impl in CORE_IMPL:
+            duration = timeit.timeit(
+                operation,
+                number=num_iteration,
+                globals={
+                    "core_impl": core_impl,
+                    "text": text,
+                    "fragmented_ots": core_impl.normalize(fragmented_ots),
+                },
+            )
+
+            perf = num_iteration / duration
+            if baseline_perf is None:
+                baseline_perf = perf
+
+            perfs.append(f"{perf:7.2f} ({perf / baseline_perf:5.2f}x)")
+
+        name = operation.split("(")[0].split(".")[1]
+        print(f"| {name} | " + " | ".join(perfs) + " |")
+
+
+def benchmark_apply_batch() -> None:
+    print("### Benchmark : `apply_batch` operation on many small docs")
+    print()
+
+    print("| len(docs) | method | Kdocs/s |")
+    print("|---:|---|---:|")
+
+    num_iteration = 100
+
+    for num_docs in [100, 1_000, 10_000]:
+        docs = [utils.make_random_doc(50) for _ in range(num_docs)]
+        ot_raw_lists = [core.normalize(utils.make_random_ots(doc, 5)) for doc in docs]
+
+        baseline_perf = None
+        for method, statement in [
+            (
+                "python, loop",
+                "[core.apply(d, o) for d, o in zip(docs, ot_raw_lists)]",
+            ),
+            (
+                "mypyc, loop",
+                "[core_mypyc.apply(d, o) for d, o in zip(docs, ot_raw_lists)]",
+            ),
+            (
+                "cython, loop",
+                "[core_boost.apply(d, o) for d, o in zip(docs, ot_raw_lists)]",
+            ),
+            ("cython, batch", "core_boost.apply_batch(docs, ot_raw_lists)"),
+        ]:
+            duration = timeit.timeit(
+                statement,
+                number=num_iteration,
+                globals={
+                    "core": core,
+                    "core_mypyc": core_mypyc,
+                    "core_boost": core_boost,
+                    "docs": docs,
+                    "ot_raw_lists": ot_raw_lists,
+                },
+            )
+
+            perf = num_iteration * num_docs / duration / 1000
+            if baseline_perf is None:
+                baseline_perf = perf
+
+            print(
+                f"| {num_docs:5d} | {method} | "
+                f"{perf:7.2f} ({perf / baseline_perf:5.2f}x) |"
+            )
+
+
+def benchmark_loads_ops() -> None:
+    print("### Benchmark : parsing and applying JSON ots")
+    print()
+
+    print("| len(ots) | method | Kops/s |")
+    print("|---:|---|---:|")
+
+    num_iteration = 1_000
+
+    for num_ots in [10, 100, 1_000]:
+        doc = utils.make_random_doc(10_000)
+        data = json.dumps(core.normalize(utils.make_random_ots(doc, num_ots)))
+
+        baseline_perf = None
+        for method, statement in [
+            ("json.loads", "core_boost.apply(doc, json.loads(data))"),
+            ("loads_ops, python", "core.apply(doc, core.loads_ops(data))"),
+            (
+                "loads_ops, mypyc",
+                "core_mypyc.apply(doc, core_mypyc.loads_ops(data))",
+            ),
+            ("loads_ops, cython", "core_boost.apply(doc, core_boost.loads_ops(data))"),
+        ]:
+            duration = timeit.timeit(
+                statement,
+                number=num_iteration,
+                globals={
+                    "core": core,
+                    "core_mypyc": core_mypyc,
+                    "core_boost": core_boost,
+                    "doc": doc,
+                    "data": data,
+                    "json": json,
+                },
+            )
+
+            perf = num_iteration / duration / 1000
+            if baseline_perf is None:
+                baseline_perf = perf
+
+            print(
+                f"| {num_ots:5d} | {method} | "
+                f"{perf:7.2f} ({perf / baseline_perf:5.2f}x) |"
+            )
+
+
 benchmark_apply()
 print()
 benchmark_inverse_apply()
+print()
+benchmark_large_insert()
+print()
+benchmark_apply_batch()
+print()
+benchmark_loads_ops()
@@ -2,11 +2,24 @@ import os
 from typing import TYPE_CHECKING
 
 from .core import apply as _apply_py
+from .core import apply_batch as _apply_batch_py
+from .core import apply_chain as _apply_chain_py
+from .core import bounded_diff as _bounded_diff_py
 from .core import check as _check_py
 from .core import compose as _compose_py
 from .core import diff as _diff_py
+from .core import dumps_ops as _dumps_ops_py
 from .core import inverse_apply as _inverse_apply_py
+from .core import iter_compose as _iter_compose_py
+from .core import iter_transform as _iter_transform_py
+from .core import loads_ops as _loads_ops_py
+from .core import merge_histories as _merge_histories_py
 from .core import normalize as _normalize_py
+from .core import op_lengths as _op_lengths_py
+from .core import op_stats as _op_stats_py
+from .core import ops_from_edits as _ops_from_edits_py
+from .core import replace_ops as _replace_ops_py
+from .core import split_ops as _split_ops_py
 from .core import transform as _transform_py
 
 try:
@@ -25,30 +38,131 @@ NO_EXTENSIONS = bool(os.environ.get("OTTYPE_NO_EXTENSIONS"))
 
 
 apply = _apply_py
+apply_batch = _apply_batch_py
+apply_chain = _apply_chain_py
+bounded_diff = _bounded_diff_py
 check = _check_py
 compose = _compose_py
 diff = _diff_py
+dumps_ops = _dumps_ops_py
 inverse_apply = _inverse_apply_py
+iter_compose = _iter_compose_py
+iter_transform = _iter_transform_py
+loads_ops = _loads_ops_py
+merge_histories = _merge_histories_py
 normalize = _normalize_py
+op_lengths = _op_lengths_py
+op_stats = _op_stats_py
+ops_from_edits = _ops_from_edits_py
+replace_ops = _replace_ops_py
+split_ops = _split_ops_py
 transform = _transform_py
 
+# `python`, `mypyc` or `cython`
+BACKEND = "python"
+
+
+try:
+    if not TYPE_CHECKING and not NO_EXTENSIONS:
+        from .core_mypyc import apply as _apply_mypyc
+        from .core_mypyc import apply_batch as _apply_batch_mypyc
+        from .core_mypyc import apply_chain as _apply_chain_mypyc
+        from .core_mypyc import bounded_diff as _bounded_diff_mypyc
+        from .core_mypyc import check as _check_mypyc
+        from .core_mypyc import compose as _compose_mypyc
+        from .core_mypyc import diff as _diff_mypyc
+        from .core_mypyc import dumps_ops as _dumps_ops_mypyc
+        from .core_mypyc import inverse_apply as _inverse_apply_mypyc
+        from .core_mypyc import iter_compose as _iter_compose_mypyc
+        from .core_mypyc import iter_transform as _iter_transform_mypyc
+        from .core_mypyc import loads_ops as _loads_ops_mypyc
+        from .core_mypyc import merge_histories as _merge_histories_mypyc
+        from .core_mypyc import normalize as _normalize_mypyc
+        from .core_mypyc import op_lengths as _op_lengths_mypyc
+        from .core_mypyc import op_stats as _op_stats_mypyc
+        from .core_mypyc import ops_from_edits as _ops_from_edits_mypyc
+        from .core_mypyc import replace_ops as _replace_ops_mypyc
+        from .core_mypyc import split_ops as _split_ops_mypyc
+        from .core_mypyc import transform as _transform_mypyc
+
+        apply = _apply_mypyc
+        apply_batch = _apply_batch_mypyc
+        apply_chain = _apply_chain_mypyc
+        bounded_diff = _bounded_diff_mypyc
+        check = _check_mypyc
+        compose = _compose_mypyc
+        diff = _diff_mypyc
+        dumps_ops = _dumps_ops_mypyc
+        inverse_apply = _inverse_apply_mypyc
+        iter_compose = _iter_compose_mypyc
+        iter_transform = _iter_transform_mypyc
+        loads_ops = _loads_ops_mypyc
+        merge_histories = _merge_histories_mypyc
+        normalize = _normalize_mypyc
+        op_lengths = _op_lengths_mypyc
+        op_stats = _op_stats_mypyc
+        ops_from_edits = _ops_from_edits_mypyc
+        replace_ops = _replace_ops_mypyc
+        split_ops = _split_ops_mypyc
+        transform = _transform_mypyc
+
+        BACKEND = "mypyc"
+
+except ImportError:
+    pass
+
 
 try:
     if not TYPE_CHECKING and not NO_EXTENSIONS:
         from .core_boost import apply as _apply_c
+        from .core_boost import apply_batch as _apply_batch_c
+        from .core_boost import apply_chain as _apply_chain_c
         from .core_boost import check as _check_c
         from .core_boost import compose as _compose_c
+        from .core_boost import dumps_ops as _dumps_ops_c
         from .core_boost import inverse_apply as _inverse_apply_c
+        from .core_boost import iter_compose as _iter_compose_c
+        from .core_boost import iter_transform as _iter_transform_c
+        from .core_boost import loads_ops as _loads_ops_c
+        from .core_boost import merge_histories as _merge_histories_c
         from .core_boost import normalize as _normalize_c
+        from .core_boost import op_lengths as _op_lengths_c
+        from .core_boost import op_stats as _op_stats_c
         from .core_boost import transform as _transform_c
 
         apply = _apply_c
+        apply_batch = _apply_batch_c
+        apply_chain = _apply_chain_c
         check = _check_c
         compose = _compose_c
-        diff = _diff_py  # does not support boost yet
+        dumps_ops = _dumps_ops_c
         inverse_apply = _inverse_apply_c
+        iter_compose = _iter_compose_c
+        iter_transform = _iter_transform_c
+        loads_ops = _loads_ops_c
+        merge_histories = _merge_histories_c
         normalize = _normalize_c
+        op_lengths = _op_lengths_c
+        op_stats = _op_stats_c
         transform = _transform_c
 
+        # `bounded_diff`, `diff`, `ops_from_edits`, `replace_ops` and
+        # `split_ops` do not support boost yet
+
+        BACKEND = "cython"
+
 except ImportError:
     pass
+
+
+if os.environ.get("OTTYPE_RECORD"):
+    import atexit
+
+    from .profile import Recorder
+
+    _recorder = Recorder(os.environ["OTTYPE_RECORD"])
+    atexit.register(_recorder.close)
+
+    apply = _recorder.wrap(apply)
+    compose = _recorder.wrap(compose)
+    transform = _recorder.wrap(transform)
@@ -0,0 +1,288 @@
+"""Authorship of each character of a doc maintained by ots"""
+
+from __future__ import annotations
+
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+from . import check
+from .core import (
+    _OTRawInputSeq,
+    _OTTypeActionDelete,
+    _OTTypeActionInsert,
+    _OTTypeActionSkip,
+    _resolve_ot,
+)
+
+_MAGIC = b"OTBL"
+_VERSION = 1
+_HEADER = struct.Struct("<4sIQ")
+
+# maximum number of runs in a block
+_BLOCK_RUNS = 256
+
+_Block = tuple["array[int]", "array[int]"]
+
+
+class _RunWriter:
+    """Append runs, merging runs of the same author"""
+
+    def __init__(self) -> None:
+        self.lengths = array("Q")
+        self.authors = array("Q")
+
+    def append(self, length: int, author: int) -> None:
+        if length == 0:
+            return
+        if self.authors and self.authors[-1] == author:
+            self.lengths[-1] += length
+        else:
+            self.lengths.append(length)
+            self.authors.append(author)
+
+    def extend(self, lengths: array[int], authors: array[int]) -> None:
+        """Append runs which do not have consecutive runs of the same author"""
+        if not lengths:
+            return
+        self.append(lengths[0], authors[0])
+        self.lengths.extend(lengths[1:])
+        self.authors.extend(authors[1:])
+
+
+def _edit_runs(
+    lengths: array[int],
+    authors: array[int],
+    ots: list[tuple[int, int]],
+    author: int,
+) -> _RunWriter:
+    """Edit runs by `(action, length)` of ots, which must fit the runs"""
+    ends = array("Q", accumulate(lengths))
+
+    writer = _RunWriter()
+    idx = 0  # run at `pos`
+    pos = 0
+
+    def take(n: int, keep: bool) -> None:
+        nonlocal idx, pos
+
+        stop = pos + n
+        while pos < stop:
+            # runs entirely covered are copied as slices
+            end_idx = bisect_right(ends, stop, idx)
+            if idx < end_idx and ends[idx] - lengths[idx] == pos:
+                if keep:
+                    writer.extend(lengths[idx:end_idx], authors[idx:end_idx])
+                pos = ends[end_idx - 1]
+                idx = end_idx
+                continue
+
+            k = min(stop, ends[idx]) - pos
+            if keep:
+                writer.append(k, authors[idx])
+            pos += k
+            if pos == ends[idx]:
+                idx += 1
+
+    for ot_action, n in ots:
+        if ot_action == _OTTypeActionSkip:
+            take(n, True)
+        elif ot_action == _OTTypeActionInsert:
+            writer.append(n, author)
+        elif ot_action == _OTTypeActionDelete:
+            take(n, False)
+
+    take((ends[-1] if ends else 0) - pos, True)
+
+    return writer
+
+
+class AuthorMap:
+    """Run-length encoded author of each character of a doc
+
+    Runs are kept in arrays of lengths and author ids, split into blocks of
+    up to `_BLOCK_RUNS` runs. `apply` tags the inserted text with an author
+    and rewrites only the blocks around the edits, so it takes
+    `O(components + affected runs + blocks)` steps. The map is a function of
+    the doc history, so replicas applying transformed ots in different orders
+    end up with the same map.
+    """
+
+    def __init__(self, length: int = 0, author: int = 0) -> None:
+        if length < 0:
+            raise ValueError("invalid length")
+
+        self._blocks: list[_Block] = []
+        self._block_lengths: list[int] = []
+        if length:
+            self._blocks.append((array("Q", [length]), array("Q", [author])))
+            self._block_lengths.append(length)
+
+    def __len__(self) -> int:
+        """Length of the doc"""
+        return sum(self._block_lengths)
+
+    def spans(self) -> list[tuple[int, int, int]]:
+        """Return `(start, end, author)` of each run"""
+        spans = []
+        start = 0
+        for lengths, authors in self._blocks:
+            for length, author in zip(lengths, authors):
+                spans.append((start, start + length, author))
+                start += length
+        return spans
+
+    def author_at(self, offset: int) -> int:
+        """Return the author of the character at `offset`"""
+        if not 0 <= offset < len(self):
+            raise IndexError("offset out of range")
+
+        block_ends = list(accumulate(self._block_lengths))
+        block_idx = bisect_right(block_ends, offset)
+        offset -= block_ends[block_idx] - self._block_lengths[block_idx]
+
+        lengths, authors = self._blocks[block_idx]
+        return authors[bisect_right(list(accumulate(lengths)), offset)]
+
+    def apply(
+        self,
+        ot_raw_list: _OTRawInputSeq,
+        author: int,
+        *,
+        check_unoptimized: bool = True,
+    ) -> None:
+        """Update the map by ots applied to the doc, inserted by `author`
+
+        If ots do not fit the doc, `ValueError` is raised and the map is not
+        changed.
+        """
+
+        if not isinstance(ot_raw_list, (list, tuple)):
+            raise TypeError("`ot_raw_list` must be a list or tuple")
+
+        if not isinstance(author, int) or not 0 <= author < 2**64:
+            raise ValueError("invalid author")
+
+        if not check(ot_raw_list, check_unoptimized=check_unoptimized):
+            raise ValueError("invalid OTs")
+
+        doc_length = len(self)
+
+        ots: list[tuple[int, int]] = []
+        first_edit = -1
+        last_edit = -1
+        last_edit_idx = -1
+        pos = 0
+
+        for ot_raw in ot_raw_list:
+            ot_action, ot_arg = _resolve_ot(ot_raw)
+
+            if ot_action == _OTTypeActionSkip:
+                assert isinstance(ot_arg, int)
+                n = ot_arg
+            else:
+                assert isinstance(ot_arg, str)
+                n = len(ot_arg)
+                if first_edit < 0:
+                    first_edit = pos
+
+            if ot_action != _OTTypeActionInsert:
+                if n > doc_length - pos:
+                    raise ValueError("skip exceeds doc length")
+                pos += n
+
+            if ot_action != _OTTypeActionSkip:
+                last_edit = pos
+                last_edit_idx = len(ots)
+
+            ots.append((ot_action, n))
+
+        if first_edit < 0:
+            return
+
+        # blocks around the edits, including one more block at each side so
+        # that runs merged by the edits are in the rewritten blocks
+        block_ends = list(accumulate(self._block_lengths))
+        lo = max(bisect_left(block_ends, first_edit) - 1, 0)
+        hi = min(bisect_left(block_ends, last_edit) + 2, len(self._blocks))
+
+        region_start = block_ends[lo] - self._block_lengths[lo] if self._blocks else 0
+
+        lengths = array("Q")
+        authors = array("Q")
+        for block_lengths, block_authors in self._blocks[lo:hi]:
+            lengths.extend(block_lengths)
+            authors.extend(block_authors)
+
+        # shift ots to the start of the blocks, which is before the first edit,
+        # and drop skips after the last edit, which may run past the blocks
+        region_ots: list[tuple[int, int]] = []
+        for action, length in ots[: last_edit_idx + 1]:
+            if region_start and action == _OTTypeActionSkip:
+                shift = min(length, region_start)
+                region_start -= shift
+                length -= shift
+                if length == 0:
+                    continue
+            region_ots.append((action, length))
+
+        writer = _edit_runs(lengths, authors, region_ots, author)
+
+        new_lengths = writer.lengths
+        new_authors = writer.authors
+
+        blocks: list[_Block] = []
+        for i in range(0, len(new_lengths), _BLOCK_RUNS):
+            blocks.append(
+                (new_lengths[i : i + _BLOCK_RUNS], new_authors[i : i + _BLOCK_RUNS])
+            )
+
+        self._blocks[lo:hi] = blocks
+        self._block_lengths[lo:hi] = [sum(block[0]) for block in blocks]
+
+    def to_bytes(self) -> bytes:
+        """Serialize the map as the header and the arrays in little-endian"""
+        lengths = array("Q")
+        authors = array("Q")
+        for block_lengths, block_authors in self._blocks:
+            lengths.extend(block_lengths)
+            authors.extend(block_authors)
+        if sys.byteorder == "big":  # pragma: no cover
+            lengths.byteswap()
+            authors.byteswap()
+
+        return (
+            _HEADER.pack(_MAGIC, _VERSION, len(lengths))
+            + lengths.tobytes()
+            + authors.tobytes()
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> AuthorMap:
+        """Deserialize the map serialized by `to_bytes`"""
+        if len(data) < _HEADER.size:
+            raise ValueError("not an author map")
+
+        magic, version, count = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("not an author map")
+
+        if len(data) != _HEADER.size + count * 16:
+            raise ValueError("corrupted author map")
+
+        lengths = array("Q")
+        authors = array("Q")
+        lengths.frombytes(data[_HEADER.size : _HEADER.size + count * 8])
+        authors.frombytes(data[_HEADER.size + count * 8 :])
+        if sys.byteorder == "big":  # pragma: no cover
+            lengths.byteswap()
+            authors.byteswap()
+
+        author_map = cls()
+        for i in range(0, count, _BLOCK_RUNS):
+            block = (lengths[i : i + _BLOCK_RUNS], authors[i : i + _BLOCK_RUNS])
+            author_map._blocks.append(block)
+            author_map._block_lengths.append(sum(block[0]))
+        return author_map
@@ -0,0 +1,136 @@
+"""Outgoing queue of ots for a subscriber of a doc"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from . import check, dumps_ops
+from .core import _OTRawInputSeq
+from .history import compose_all
+
+# (start_revision, end_revision, ots, size in bytes, time queued)
+_Entry = tuple[int, int, _OTRawInputSeq, int, float]
+
+
+def _ots_size(ot_raw_list: _OTRawInputSeq) -> int:
+    """Size of ots in bytes when encoded by `dumps_ops`"""
+    return len(dumps_ops(ot_raw_list).encode())
+
+
+class OutgoingQueue:
+    """Ots waiting to be sent to a subscriber
+
+    Ots are pushed in the order of revisions and popped as entries of
+    `(start_revision, end_revision, ots)` where `ots` changes the doc at
+    `start_revision` to the doc at `end_revision`, so acknowledgements of the
+    subscriber still refer to the revisions of the log.
+
+    When a push makes the queue longer than `max_ops` entries, or the oldest
+    entry has waited for `max_age` seconds or more, the queued ots are composed
+    into one entry. `ops_merged` and `bytes_saved` (in the compact JSON
+    encoding) count the effect of the composition.
+    """
+
+    def __init__(
+        self,
+        revision: int = 0,
+        *,
+        max_ops: Optional[int] = None,
+        max_age: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_ops is not None and max_ops < 1:
+            raise ValueError("invalid max_ops")
+
+        if max_age is not None and max_age < 0:
+            raise ValueError("invalid max_age")
+
+        self.max_ops = max_ops
+        self.max_age = max_age
+        self.clock = clock
+
+        self.nbytes = 0
+        self.ops_merged = 0
+        self.bytes_saved = 0
+
+        self._entries: deque[_Entry] = deque()
+        self._end_revision = revision
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def start_revision(self) -> int:
+        """Revision of the doc before the first queued ots"""
+        return self._entries[0][0] if self._entries else self._end_revision
+
+    @property
+    def end_revision(self) -> int:
+        """Revision of the doc after the last queued ots"""
+        return self._end_revision
+
+    def push(self, ot_raw_list: _OTRawInputSeq) -> int:
+        """Queue ots of the next revision and return the revision"""
+
+        if not isinstance(ot_raw_list, (list, tuple)):
+            raise TypeError("`ot_raw_list` must be a list or tuple")
+
+        if not check(ot_raw_list):
+            raise ValueError("invalid OTs")
+
+        revision = self._end_revision
+        size = _ots_size(ot_raw_list)
+        now = self.clock()
+
+        self._entries.append((revision, revision + 1, ot_raw_list, size, now))
+        self._end_revision += 1
+        self.nbytes += size
+
+        if (self.max_ops is not None and len(self._entries) > self.max_ops) or (
+            self.max_age is not None and now - self._entries[0][4] >= self.max_age
+        ):
+            self.coalesce()
+
+        return revision
+
+    def coalesce(self) -> None:
+        """Compose the queued ots into one entry"""
+
+        if len(self._entries) < 2:
+            return
+
+        composed = compose_all([entry[2] for entry in self._entries])
+        size = _ots_size(composed)
+
+        self.ops_merged += len(self._entries) - 1
+        self.bytes_saved += self.nbytes - size
+
+        start_revision = self._entries[0][0]
+        queued_at = self._entries[0][4]
+
+        self._entries.clear()
+        self._entries.append(
+            (start_revision, self._end_revision, composed, size, queued_at)
+        )
+        self.nbytes = size
+
+    def pop(self) -> tuple[int, int, _OTRawInputSeq]:
+        """Remove and return the oldest entry"""
+
+        if not self._entries:
+            raise IndexError("pop from an empty queue")
+
+        start_revision, end_revision, ot_raw_list, size, _ = self._entries.popleft()
+        self.nbytes -= size
+
+        return start_revision, end_revision, ot_raw_list
+
+    def drain(self) -> list[tuple[int, int, _OTRawInputSeq]]:
+        """Remove and return all entries"""
+
+        entries = []
+        while self._entries:
+            entries.append(self.pop())
+        return entries
@@ -1,27 +1,59 @@
 from __future__ import annotations
 
+import json
+import os
+import re
+import sys
+import time
+from bisect import bisect_left
 from difflib import SequenceMatcher
-from typing import Literal, NewType, Optional, Sequence, Union
+from json import JSONDecodeError
+from json.decoder import scanstring  # type: ignore[attr-defined]
+from typing import (
+    Any,
+    Callable,
+    Final,
+    Iterable,
+    Iterator,
+    Literal,
+    NewType,
+    Optional,
+    Sequence,
+    Union,
+)
 
 _OTTypeAction = NewType("_OTTypeAction", int)
 
-_OTTypeActionNop = _OTTypeAction(0)
-_OTTypeActionSkip = _OTTypeAction(1)
-_OTTypeActionInsert = _OTTypeAction(2)
-_OTTypeActionDelete = _OTTypeAction(3)
+_OTTypeActionNop: Final = _OTTypeAction(0)
+_OTTypeActionSkip: Final = _OTTypeAction(1)
+_OTTypeActionInsert: Final = _OTTypeAction(2)
+_OTTypeActionDelete: Final = _OTTypeAction(3)
 
 _OTType = tuple[_OTTypeAction, Union[int, str]]
 
 _OTRawInputType = Union[int, str, dict[str, str], tuple[int, Union[int, str]]]
 _OTRawInputSeq = Sequence[_OTRawInputType]
 
+# (action, source, start, end) : `source[start:end]` of OT-Insert or OT-Delete,
+# or OT-Skip of `end - start` with an empty `source`
+_OTView = tuple[_OTTypeAction, str, int, int]
+
 _OTRawOutputType = Union[int, str, dict[str, str]]
 _OTRawOutputSeq = Sequence[_OTRawOutputType]
 
+_DiffGranularity = Literal["char", "word", "line"]
+
+# (start, end) of an equality in the first doc followed by (deleted, inserted)
+_DiffHunk = tuple[int, int, str, str]
+
+_DiffOpcode = tuple[str, int, int, int, int]
+
+_DIFF_WORD_RE = re.compile(r"\w+|\s+|[^\w\s]")
 
-def _resolve_ot(ot_raw: _OTRawInputType) -> _OTType:
+
+def _resolve_ot(ot_raw: object) -> _OTType:
     if isinstance(ot_raw, int):
-        if ot_raw <= 0:
+        if not 0 < ot_raw <= sys.maxsize:
             raise ValueError("invalid OT-Skip")
         return (_OTTypeActionSkip, ot_raw)
     elif isinstance(ot_raw, str):
@@ -37,20 +69,17 @@ def _resolve_ot(ot_raw: _OTRawInputType) -> _OTType:
         if len(ot_raw) == 2:
             ot_action, ot_arg = ot_raw
             if ot_action == 1:
-                assert isinstance(ot_arg, int)
-                if ot_arg <= 0:
+                if not isinstance(ot_arg, int) or not 0 < ot_arg <= sys.maxsize:
                     raise ValueError("invalid OT-Skip")
-                return ot_raw  # type: ignore
+                return ot_raw
             elif ot_action == 2:
-                assert isinstance(ot_arg, str)
-                if ot_arg == "":
+                if not isinstance(ot_arg, str) or ot_arg == "":
                     raise ValueError("invalid OT-Insert")
-                return ot_raw  # type: ignore
+                return ot_raw
             elif ot_action == 3:
-                assert isinstance(ot_arg, str)
-                if ot_arg == "":
+                if not isinstance(ot_arg, str) or ot_arg == "":
                     raise ValueError("invalid OT-Delete")
-                return ot_raw  # type: ignore
+                return ot_raw
 
     raise ValueError("unexpected OT structure")
 
@@ -84,10 +113,16 @@ class _Appender:
     def __init__(self, ots: list[_OTType]) -> None:
         self.ots = ots
 
+        # parts of the trailing OT-Insert or OT-Delete, not materialized yet
+        self._pending_action = _OTTypeActionNop
+        self._pending_parts: list[tuple[str, int, int]] = []
+
     def append(self, ot: Optional[_OTType]) -> None:
         if ot is None:
             return
 
+        self.flush()
+
         if not self.ots:
             self.ots.append(ot)
             return
@@ -110,62 +145,135 @@ class _Appender:
         else:
             self.ots.append(ot)
 
+    def append_view(self, view: Optional[_OTView]) -> None:
+        """Append a view of an OT
+
+        Consecutive OT-Inserts or OT-Deletes are kept as views and concatenated
+        only once by `flush`, which must be called before using `ots`.
+        """
+        if view is None:
+            return
+
+        ot_action, source, start, end = view
+
+        if ot_action == self._pending_action:
+            self._pending_parts.append((source, start, end))
+            return
+
+        self.flush()
+
+        if ot_action == _OTTypeActionSkip:
+            if self.ots and self.ots[-1][0] == _OTTypeActionSkip:
+                last_ot_arg = self.ots[-1][1]
+                assert isinstance(last_ot_arg, int)
+                self.ots[-1] = (_OTTypeActionSkip, last_ot_arg + end - start)
+            else:
+                self.ots.append((_OTTypeActionSkip, end - start))
+            return
+
+        if self.ots and self.ots[-1][0] == ot_action:
+            last_ot_arg = self.ots.pop()[1]
+            assert isinstance(last_ot_arg, str)
+            self._pending_parts.append((last_ot_arg, 0, len(last_ot_arg)))
+
+        self._pending_action = ot_action
+        self._pending_parts.append((source, start, end))
+
+    def flush(self) -> None:
+        """Materialize the pending OT-Insert or OT-Delete"""
+        if self._pending_action == _OTTypeActionNop:
+            return
+
+        parts = self._pending_parts
+        if len(parts) == 1 and parts[0][1] == 0 and parts[0][2] == len(parts[0][0]):
+            ot_arg = parts[0][0]
+        else:
+            ot_arg = "".join([source[start:end] for source, start, end in parts])
+
+        self.ots.append((self._pending_action, ot_arg))
+
+        self._pending_action = _OTTypeActionNop
+        self._pending_parts = []
+
 
 class _Taker:
-    def __init__(self, ot_raw_list: _OTRawInputSeq) -> None:
-        self.ot_raw_list = ot_raw_list
-        self.ot_raw_list_len = len(ot_raw_list)
+    def __init__(self, ot_raw_list: Iterable[_OTRawInputType]) -> None:
+        self._iter = iter(ot_raw_list)
 
-        self._idx = 0
         self._offset = 0
 
-    def take(
-        self, n: int, indivisable: Optional[Literal["d", "i"]] = None
-    ) -> Optional[_OTType]:
-        if self._idx == self.ot_raw_list_len:
-            if n == -1:
-                return None
-            return (_OTTypeActionSkip, n)
+        # OT being taken, unpacked so that `take_view` needs no tuples with
+        # `Union` args, and `_ot_action` is OT-Nop after the last OT
+        self._ot_action = _OTTypeActionNop
+        self._ot_source = ""  # empty for OT-Skip
+        self._ot_length = 0
+        self._next()
+
+    def _next(self) -> None:
+        ot_raw = next(self._iter, None)
+        if ot_raw is None:
+            self._ot_action = _OTTypeActionNop
+            self._ot_source = ""
+            self._ot_length = 0
+            return
 
-        ot_action, ot_arg = _resolve_ot(self.ot_raw_list[self._idx])
-        ret_ot: Optional[_OTType] = None
+        ot_action, ot_arg = _resolve_ot(ot_raw)
 
         if ot_action == _OTTypeActionSkip:
             assert isinstance(ot_arg, int)
-            if n == -1 or ot_arg - self._offset <= n:
-                ret_ot = (_OTTypeActionSkip, ot_arg - self._offset)
-                self._idx += 1
-                self._offset = 0
-            else:
-                ret_ot = (_OTTypeActionSkip, n)
-                self._offset += n
-
-        elif ot_action == _OTTypeActionInsert:
+            self._ot_source = ""
+            self._ot_length = ot_arg
+        else:
             assert isinstance(ot_arg, str)
-            if n == -1 or indivisable == "i" or len(ot_arg) - self._offset <= n:
-                ret_ot = (_OTTypeActionInsert, ot_arg[self._offset :])
-                self._idx += 1
-                self._offset = 0
-            else:
-                ret_ot = (_OTTypeActionInsert, ot_arg[self._offset : self._offset + n])
-                self._offset += n
+            self._ot_source = ot_arg
+            self._ot_length = len(ot_arg)
 
-        elif ot_action == _OTTypeActionDelete:
-            assert isinstance(ot_arg, str)
-            if n == -1 or indivisable == "d" or len(ot_arg) - self._offset <= n:
-                ret_ot = (_OTTypeActionDelete, ot_arg[self._offset :])
-                self._idx += 1
-                self._offset = 0
-            else:
-                ret_ot = (_OTTypeActionDelete, ot_arg[self._offset : self._offset + n])
-                self._offset += n
+        self._ot_action = ot_action
+
+    def take_view(
+        self, n: int, indivisable: Optional[Literal["d", "i"]] = None
+    ) -> Optional[_OTView]:
+        """Take `n` characters (or all if `n` is -1) as a view without copying"""
+        ot_action = self._ot_action
+
+        if ot_action == _OTTypeActionNop:
+            if n == -1:
+                return None
+            return (_OTTypeActionSkip, "", 0, n)
+
+        source = self._ot_source
+        length = self._ot_length
+        start = self._offset
+
+        if (
+            n == -1
+            or (indivisable == "i" and ot_action == _OTTypeActionInsert)
+            or (indivisable == "d" and ot_action == _OTTypeActionDelete)
+            or length - start <= n
+        ):
+            end = length
+            self._offset = 0
+            self._next()
+        else:
+            end = start + n
+            self._offset = end
 
-        return ret_ot
+        return (ot_action, source, start, end)
+
+    def take(
+        self, n: int, indivisable: Optional[Literal["d", "i"]] = None
+    ) -> Optional[_OTType]:
+        view = self.take_view(n, indivisable)
+        if view is None:
+            return None
+
+        ot_action, source, start, end = view
+        if ot_action == _OTTypeActionSkip:
+            return (_OTTypeActionSkip, end - start)
+        return (ot_action, source[start:end])
 
     def peak_action(self) -> _OTTypeAction:
-        if 0 <= self._idx < self.ot_raw_list_len:
-            return _resolve_ot(self.ot_raw_list[self._idx])[0]
-        return _OTTypeActionNop
+        return self._ot_action
 
 
 def _trim(ots: list[_OTType]) -> None:
@@ -178,7 +286,36 @@ def _trim(ots: list[_OTType]) -> None:
         ots.pop()
 
 
-def check(ot_raw_list: _OTRawInputSeq, *, check_unoptimized: bool = True) -> bool:
+def _op_stats(ot_raw_list: _OTRawInputSeq) -> tuple[int, int, int, int]:
+    """Return `(base_len, target_len, inserted, deleted)` of ots
+
+    `ot_raw_list` must be checked.
+    """
+    skipped = 0
+    inserted = 0
+    deleted = 0
+
+    for ot_raw in ot_raw_list:
+        ot_action, ot_arg = _resolve_ot(ot_raw)
+
+        if ot_action == _OTTypeActionSkip:
+            assert isinstance(ot_arg, int)
+            skipped += ot_arg
+
+        elif ot_action == _OTTypeActionInsert:
+            assert isinstance(ot_arg, str)
+            inserted += len(ot_arg)
+
+        elif ot_action == _OTTypeActionDelete:
+            assert isinstance(ot_arg, str)
+            deleted += len(ot_arg)
+
+    return skipped + deleted, skipped + inserted, inserted, deleted
+
+
+# flags such as `check_unoptimized` are typed as `object` and used by their
+# truthiness, since mypyc would reject anything but `bool` for `bool`
+def check(ot_raw_list: _OTRawInputSeq, *, check_unoptimized: object = True) -> bool:
     if not isinstance(ot_raw_list, (list, tuple)):
         raise TypeError("`ot_raw_list` must be a list or tuple")
 
@@ -206,7 +343,7 @@ def apply(
     doc: str,
     ot_raw_list: _OTRawInputSeq,
     *,
-    check_unoptimized: bool = True,
+    check_unoptimized: object = True,
 ) -> str:
     """Apply ots to doc"""
 
@@ -252,11 +389,92 @@ def apply(
     return "".join(new_doc)
 
 
+def apply_batch(
+    docs: Sequence[str],
+    ot_raw_lists: Sequence[_OTRawInputSeq],
+    *,
+    check_unoptimized: object = True,
+) -> list[Union[str, Exception]]:
+    """Apply `ot_raw_lists[i]` to `docs[i]` for each i
+
+    An error of an item does not abort the batch; the exception is returned
+    in place of the new doc instead.
+    """
+
+    if not isinstance(docs, (list, tuple)):
+        raise TypeError("`docs` must be a list or tuple")
+
+    if not isinstance(ot_raw_lists, (list, tuple)):
+        raise TypeError("`ot_raw_lists` must be a list or tuple")
+
+    if len(docs) != len(ot_raw_lists):
+        raise ValueError("`docs` and `ot_raw_lists` must have the same length")
+
+    results: list[Union[str, Exception]] = []
+    for doc, ot_raw_list in zip(docs, ot_raw_lists):
+        try:
+            results.append(apply(doc, ot_raw_list, check_unoptimized=check_unoptimized))
+        except Exception as e:
+            results.append(e)
+
+    return results
+
+
+def apply_chain(
+    doc: str,
+    ot_raw_lists: Sequence[_OTRawInputSeq],
+    *,
+    check_unoptimized: object = True,
+) -> str:
+    """Apply a chain of ots to doc
+
+    Same as applying each of `ot_raw_lists` in order, but the ots are composed
+    pairwise as a balanced tree first and the doc is copied only once. The
+    length of the doc is tracked along the chain, so ots which do not fit the
+    doc they are applied to raise `ValueError` as `apply` does.
+    """
+
+    if not isinstance(doc, str):
+        raise TypeError("`doc` must be string")
+
+    if not isinstance(ot_raw_lists, (list, tuple)):
+        raise TypeError("`ot_raw_lists` must be a list or tuple")
+
+    length = len(doc)
+    level: list[_OTRawInputSeq] = []
+    for ot_raw_list in ot_raw_lists:
+        if not isinstance(ot_raw_list, (list, tuple)):
+            raise TypeError("`ot_raw_list` must be a list or tuple")
+
+        if not check_unoptimized:
+            ot_raw_list = normalize(ot_raw_list)
+
+        base_len, target_len = op_lengths(ot_raw_list)
+        if base_len > length:
+            raise ValueError("skip exceeds doc length")
+        length += target_len - base_len
+
+        level.append(ot_raw_list)
+
+    if not level:
+        return doc
+
+    while len(level) > 1:
+        next_level: list[_OTRawInputSeq] = [
+            compose(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)
+        ]
+        if len(level) % 2 == 1:
+            next_level.append(level[-1])
+        level = next_level
+
+    return apply(doc, level[0])
+
+
 def inverse_apply(
     doc: str,
     ot_raw_list: _OTRawInputSeq,
     *,
-    check_unoptimized: bool = True,
+    check_unoptimized: object = True,
 ) -> str:
     """Inversely apply ots to doc"""
 
@@ -269,20 +487,7 @@ def inverse_apply(
     if not check(ot_raw_list, check_unoptimized=check_unoptimized):
         raise ValueError("invalid OTs")
 
-    last_pos = 0
-    for ot_raw in ot_raw_list:
-        ot_action, ot_arg = _resolve_ot(ot_raw)
-
-        if ot_action == _OTTypeActionSkip:
-            assert isinstance(ot_arg, int)
-            last_pos += ot_arg
-
-        elif ot_action == _OTTypeActionInsert:
-            assert isinstance(ot_arg, str)
-            last_pos += len(ot_arg)
-
-        elif ot_action == _OTTypeActionDelete:
-            pass
+    last_pos = _op_stats(ot_raw_list)[1]
 
     if last_pos > len(doc):
         raise ValueError("skip exceeds doc length")
@@ -316,6 +521,61 @@ def inverse_apply(
     return "".join(reversed(old_doc))
 
 
+def op_lengths(
+    ot_raw_list: _OTRawInputSeq,
+    *,
+    check_unoptimized: object = True,
+) -> tuple[int, int]:
+    """Return `(base_len, target_len)` of ots
+
+    `base_len` is the length of the prefix of a doc that ots consume (skips and
+    deletes) and `target_len` is the length of the prefix they produce (skips
+    and inserts). The trailing part of a doc is kept as is, so `apply(doc, ots)`
+    requires `len(doc) >= base_len` and then satisfies
+    .. code::
+        len(apply(doc, ots)) == len(doc) - base_len + target_len
+    """
+
+    if not isinstance(ot_raw_list, (list, tuple)):
+        raise TypeError("`ot_raw_list` must be a list or tuple")
+
+    if not check(ot_raw_list, check_unoptimized=check_unoptimized):
+        raise ValueError("invalid OTs")
+
+    base_len, target_len, _, _ = _op_stats(ot_raw_list)
+
+    return base_len, target_len
+
+
+def op_stats(
+    ot_raw_list: _OTRawInputSeq,
+    *,
+    check_unoptimized: object = True,
+) -> dict[str, int]:
+    """Return size and shape statistics of ots
+
+    The result has the keys `base_len` and `target_len` (see `op_lengths`),
+    `inserted` and `deleted` (number of inserted and deleted characters) and
+    `components` (number of OTs).
+    """
+
+    if not isinstance(ot_raw_list, (list, tuple)):
+        raise TypeError("`ot_raw_list` must be a list or tuple")
+
+    if not check(ot_raw_list, check_unoptimized=check_unoptimized):
+        raise ValueError("invalid OTs")
+
+    base_len, target_len, inserted, deleted = _op_stats(ot_raw_list)
+
+    return {
+        "base_len": base_len,
+        "target_len": target_len,
+        "inserted": inserted,
+        "deleted": deleted,
+        "components": len(ot_raw_list),
+    }
+
+
 def normalize(ot_raw_list: _OTRawInputSeq) -> _OTRawOutputSeq:
     """Normalize ots
 
@@ -376,75 +636,167 @@ def transform(
     if side not in ["left", "right"]:
         raise ValueError("invalid side")
 
+    return _to_ot_raw_list(_transform(ot_raw_list_1, ot_raw_list_2, side == "left"))
+
+
+def _transform(
+    ot_raw_list_1: _OTRawInputSeq, ot_raw_list_2: _OTRawInputSeq, is_left: bool
+) -> list[_OTType]:
+    """Transform checked ots and return the result as resolved ots"""
+
     new_ots: list[_OTType] = []
     appender = _Appender(new_ots)
     taker = _Taker(ot_raw_list_1)
 
     for ot_raw in ot_raw_list_2:
-        ot_action, ot_arg = _resolve_ot(ot_raw)
+        _transform_step(taker, appender, _resolve_ot(ot_raw), is_left)
 
-        if ot_action == _OTTypeActionSkip:
-            assert isinstance(ot_arg, int)
+    _take_rest(taker, appender)
+    _trim(new_ots)
 
-            n = ot_arg
-            while 0 < n:
-                chunk_ot = taker.take(n, "i")
-                appender.append(chunk_ot)
+    return new_ots
 
-                if chunk_ot is None:
-                    break  # pragma: no cover
 
-                chunk_ot_action, chunk_ot_arg = chunk_ot
+def _transform_step(
+    taker: _Taker, appender: _Appender, ot: _OTType, is_left: bool
+) -> None:
+    """Transform the taken ots against one OT of the other ots"""
 
-                if chunk_ot_action == _OTTypeActionSkip:
-                    assert isinstance(chunk_ot_arg, int)
-                    n -= chunk_ot_arg
-                elif chunk_ot_action == _OTTypeActionInsert:
-                    pass
-                elif chunk_ot_action == _OTTypeActionDelete:
-                    assert isinstance(chunk_ot_arg, str)
-                    n -= len(chunk_ot_arg)
+    ot_action, ot_arg = ot
 
-        elif ot_action == _OTTypeActionInsert:
-            assert isinstance(ot_arg, str)
+    if ot_action == _OTTypeActionSkip:
+        assert isinstance(ot_arg, int)
 
-            n = len(ot_arg)
+        n = ot_arg
+        while 0 < n:
+            chunk_view = taker.take_view(n, "i")
+            appender.append_view(chunk_view)
 
-            if side == "left" and taker.peak_action() == _OTTypeActionInsert:
-                appender.append(taker.take(-1))
+            if chunk_view is None:
+                break  # pragma: no cover
 
-            appender.append((_OTTypeActionSkip, n))
+            chunk_ot_action, _, chunk_start, chunk_end = chunk_view
 
-        elif ot_action == _OTTypeActionDelete:
-            assert isinstance(ot_arg, str)
+            if chunk_ot_action == _OTTypeActionSkip:
+                n -= chunk_end - chunk_start
+            elif chunk_ot_action == _OTTypeActionInsert:
+                pass
+            elif chunk_ot_action == _OTTypeActionDelete:
+                n -= chunk_end - chunk_start
 
-            n = len(ot_arg)
-            while 0 < n:
-                chunk_ot = taker.take(n, "i")
+    elif ot_action == _OTTypeActionInsert:
+        assert isinstance(ot_arg, str)
 
-                if chunk_ot is None:
-                    break  # pragma: no cover
+        n = len(ot_arg)
 
-                chunk_ot_action, chunk_ot_arg = chunk_ot
+        if is_left and taker.peak_action() == _OTTypeActionInsert:
+            appender.append_view(taker.take_view(-1))
 
-                if chunk_ot_action == _OTTypeActionSkip:
-                    assert isinstance(chunk_ot_arg, int)
-                    n -= chunk_ot_arg
-                elif chunk_ot_action == _OTTypeActionInsert:
-                    appender.append(chunk_ot)
-                elif chunk_ot_action == _OTTypeActionDelete:
-                    assert isinstance(chunk_ot_arg, str)
-                    n -= len(chunk_ot_arg)
+        appender.append_view((_OTTypeActionSkip, "", 0, n))
+
+    elif ot_action == _OTTypeActionDelete:
+        assert isinstance(ot_arg, str)
+
+        n = len(ot_arg)
+        while 0 < n:
+            chunk_view = taker.take_view(n, "i")
+
+            if chunk_view is None:
+                break  # pragma: no cover
+
+            chunk_ot_action, _, chunk_start, chunk_end = chunk_view
+
+            if chunk_ot_action == _OTTypeActionSkip:
+                n -= chunk_end - chunk_start
+            elif chunk_ot_action == _OTTypeActionInsert:
+                appender.append_view(chunk_view)
+            elif chunk_ot_action == _OTTypeActionDelete:
+                n -= chunk_end - chunk_start
+
+
+def _compose_step(taker: _Taker, appender: _Appender, ot: _OTType) -> None:
+    """Compose the taken ots with one OT of the second ots"""
+
+    ot_action, ot_arg = ot
+
+    if ot_action == _OTTypeActionSkip:
+        assert isinstance(ot_arg, int)
+
+        n = ot_arg
+        while 0 < n:
+            chunk_view = taker.take_view(n, "d")
+            appender.append_view(chunk_view)
+
+            if chunk_view is None:
+                break  # pragma: no cover
+
+            chunk_ot_action, _, chunk_start, chunk_end = chunk_view
+
+            if chunk_ot_action == _OTTypeActionSkip:
+                n -= chunk_end - chunk_start
+            elif chunk_ot_action == _OTTypeActionInsert:
+                n -= chunk_end - chunk_start
+            elif chunk_ot_action == _OTTypeActionDelete:
+                pass
+
+    elif ot_action == _OTTypeActionInsert:
+        assert isinstance(ot_arg, str)
+
+        appender.append_view((_OTTypeActionInsert, ot_arg, 0, len(ot_arg)))
+
+    elif ot_action == _OTTypeActionDelete:
+        assert isinstance(ot_arg, str)
+
+        offset = 0
+        n = len(ot_arg)
+
+        while 0 < n:
+            chunk_view = taker.take_view(n, "d")
+
+            if chunk_view is None:
+                break  # pragma: no cover
+
+            chunk_ot_action, chunk_source, chunk_start, chunk_end = chunk_view
+            chunk_len = chunk_end - chunk_start
+
+            if chunk_ot_action == _OTTypeActionSkip:
+                appender.append_view(
+                    (_OTTypeActionDelete, ot_arg, offset, offset + chunk_len)
+                )
+                offset += chunk_len
+                n -= chunk_len
+
+            elif chunk_ot_action == _OTTypeActionInsert:
+                if chunk_start == 0 and chunk_end == len(chunk_source):
+                    is_consistent = ot_arg.startswith(chunk_source, offset)
+                else:
+                    is_consistent = ot_arg.startswith(
+                        chunk_source[chunk_start:chunk_end], offset
+                    )
+
+                if not is_consistent:
+                    raise ValueError(
+                        "inconsistent delete in the seconds OTs (doc, OT.arg)",
+                        chunk_source[chunk_start:chunk_end],
+                        ot_arg[offset : offset + chunk_len],
+                    )
+                offset += chunk_len
+                n -= chunk_len
+
+            elif chunk_ot_action == _OTTypeActionDelete:
+                appender.append_view(chunk_view)
+
+
+def _take_rest(taker: _Taker, appender: _Appender) -> None:
+    """Append the rest of the taken ots and flush the appender"""
 
     while True:
-        chunk_ot = taker.take(-1)
-        if chunk_ot is None:
+        chunk_view = taker.take_view(-1)
+        if chunk_view is None:
             break
-        appender.append(chunk_ot)
+        appender.append_view(chunk_view)
 
-    _trim(new_ots)
-
-    return _to_ot_raw_list(new_ots)
+    appender.flush()
 
 
 def compose(
@@ -472,97 +824,826 @@ def compose(
     taker = _Taker(ot_raw_list_1)
 
     for ot_raw in ot_raw_list_2:
-        ot_action, ot_arg = ot = _resolve_ot(ot_raw)
+        _compose_step(taker, appender, _resolve_ot(ot_raw))
 
-        if ot_action == _OTTypeActionSkip:
-            assert isinstance(ot_arg, int)
+    _take_rest(taker, appender)
+    _trim(new_ots)
 
-            n = ot_arg
-            while 0 < n:
-                chunk_ot = taker.take(n, "d")
-                appender.append(chunk_ot)
+    return _to_ot_raw_list(new_ots)
 
-                if chunk_ot is None:
-                    break  # pragma: no cover
 
-                chunk_ot_action, chunk_ot_arg = chunk_ot
+def _iter_checked(ot_raw_iter: Iterable[object]) -> Iterator[_OTType]:
+    """Resolve ots one by one, raising `ValueError` when they turn out invalid
 
-                if chunk_ot_action == _OTTypeActionSkip:
-                    assert isinstance(chunk_ot_arg, int)
-                    n -= chunk_ot_arg
-                elif chunk_ot_action == _OTTypeActionInsert:
-                    assert isinstance(chunk_ot_arg, str)
-                    n -= len(chunk_ot_arg)
-                elif chunk_ot_action == _OTTypeActionDelete:
-                    pass
+    Items are typed as `object` since mypyc would raise `TypeError` for
+    unexpected types before they are resolved.
+    """
 
-        elif ot_action == _OTTypeActionInsert:
-            appender.append(ot)
+    last_ot_action = _OTTypeActionNop
+    for ot_raw in ot_raw_iter:
+        try:
+            ot = _resolve_ot(ot_raw)
+        except (ValueError, TypeError):
+            raise ValueError("invalid OTs") from None
 
-        elif ot_action == _OTTypeActionDelete:
-            assert isinstance(ot_arg, str)
+        if last_ot_action == ot[0]:
+            raise ValueError("invalid OTs")
 
-            offset = 0
-            n = len(ot_arg)
+        last_ot_action = ot[0]
+        yield ot
 
-            while 0 < n:
-                chunk_ot = taker.take(n, "d")
+    if last_ot_action == _OTTypeActionSkip:
+        raise ValueError("invalid OTs")
 
-                if chunk_ot is None:
-                    break  # pragma: no cover
 
-                chunk_ot_action, chunk_ot_arg = chunk_ot
+def _iter_ots(ot_raw_iter: Iterable[_OTRawInputType], name: str) -> Iterator[_OTType]:
+    if isinstance(ot_raw_iter, (str, dict)) or not hasattr(ot_raw_iter, "__iter__"):
+        raise TypeError(f"`{name}` must be an iterable of OTs")
 
-                if chunk_ot_action == _OTTypeActionSkip:
-                    assert isinstance(chunk_ot_arg, int)
+    return _iter_checked(ot_raw_iter)
 
-                    appender.append(
-                        (_OTTypeActionDelete, ot_arg[offset : offset + chunk_ot_arg])
-                    )
-                    offset += chunk_ot_arg
-                    n -= chunk_ot_arg
 
-                elif chunk_ot_action == _OTTypeActionInsert:
-                    assert isinstance(chunk_ot_arg, str)
+def _iter_steps(
+    ot_iter_1: Iterator[_OTType],
+    ot_iter_2: Iterator[_OTType],
+    step: Callable[[_Taker, _Appender, _OTType], None],
+) -> Iterator[_OTRawOutputType]:
+    """Run `step` for each OT of `ot_iter_2` and yield finished OTs
+
+    Only the last OT of the appender can be extended by later steps, so the
+    others are yielded and dropped after each step.
+    """
+
+    new_ots: list[_OTType] = []
+    appender = _Appender(new_ots)
+    taker = _Taker(ot_iter_1)
 
-                    if chunk_ot_arg != ot_arg[offset : offset + len(chunk_ot_arg)]:
-                        raise ValueError(
-                            "inconsistent delete in the seconds OTs (doc, OT.arg)",
-                            chunk_ot_arg,
-                            ot_arg[offset : offset + len(chunk_ot_arg)],
-                        )
-                    offset += len(chunk_ot_arg)
-                    n -= len(chunk_ot_arg)
+    for ot in ot_iter_2:
+        step(taker, appender, ot)
 
-                elif chunk_ot_action == _OTTypeActionDelete:
-                    appender.append(chunk_ot)
+        if len(new_ots) > 1:
+            yield from _to_ot_raw_list(new_ots[:-1])
+            del new_ots[:-1]
 
     while True:
-        chunk_ot = taker.take(-1)
-        if chunk_ot is None:
+        chunk_view = taker.take_view(-1)
+        if chunk_view is None:
             break
-        appender.append(chunk_ot)
+        appender.append_view(chunk_view)
+
+        if len(new_ots) > 1:
+            yield from _to_ot_raw_list(new_ots[:-1])
+            del new_ots[:-1]
 
+    appender.flush()
     _trim(new_ots)
 
-    return _to_ot_raw_list(new_ots)
+    yield from _to_ot_raw_list(new_ots)
 
 
-def diff(doc1: str, doc2: str) -> _OTRawOutputSeq:
-    seq = SequenceMatcher(None, doc1, doc2)
+def iter_transform(
+    ot_raw_iter_1: Iterable[_OTRawInputType],
+    ot_raw_iter_2: Iterable[_OTRawInputType],
+    side: Literal["left", "right"],
+) -> Iterator[_OTRawOutputType]:
+    """Transform like `transform`, consuming and yielding OTs one by one
+
+    Both ots can be any iterables, such as generators reading an encoded log,
+    and only a few OTs are kept in memory at a time. Ots are checked as they
+    are consumed, so `ValueError` can be raised after some OTs are yielded.
+    """
+
+    ot_iter_1 = _iter_ots(ot_raw_iter_1, "ot_raw_iter_1")
+    ot_iter_2 = _iter_ots(ot_raw_iter_2, "ot_raw_iter_2")
+
+    if not isinstance(side, str):
+        raise TypeError("`side` must be str")
+
+    if side not in ["left", "right"]:
+        raise ValueError("invalid side")
+
+    is_left = side == "left"
+
+    return _iter_steps(
+        ot_iter_1,
+        ot_iter_2,
+        lambda taker, appender, ot: _transform_step(taker, appender, ot, is_left),
+    )
+
+
+def iter_compose(
+    ot_raw_iter_1: Iterable[_OTRawInputType],
+    ot_raw_iter_2: Iterable[_OTRawInputType],
+) -> Iterator[_OTRawOutputType]:
+    """Compose like `compose`, consuming and yielding OTs one by one
+
+    Ots are consumed and checked in the same way as `iter_transform`.
+    """
+
+    ot_iter_1 = _iter_ots(ot_raw_iter_1, "ot_raw_iter_1")
+    ot_iter_2 = _iter_ots(ot_raw_iter_2, "ot_raw_iter_2")
+
+    return _iter_steps(ot_iter_1, ot_iter_2, _compose_step)
+
+
+def merge_histories(
+    local_ot_raw_lists: Sequence[_OTRawInputSeq],
+    remote_ot_raw_lists: Sequence[_OTRawInputSeq],
+    side: Literal["left", "right"],
+) -> tuple[list[_OTRawOutputSeq], _OTRawOutputSeq]:
+    """Merge two histories diverged from the same doc
+
+    Return `(rebased_local, remote_for_local)` where `rebased_local[i]` is
+    `local_ot_raw_lists[i]` transformed to apply after the remote history and
+    the rebased local ots before it, and `remote_for_local` is the remote
+    history transformed to apply after the local history, composed into one.
+    `side` is the side of the local ots.
+
+    The result is the same as the pairwise transform grid, but only one row of
+    the grid is kept, and ots are checked and resolved only once.
+    """
+
+    if not isinstance(local_ot_raw_lists, (list, tuple)):
+        raise TypeError("`local_ot_raw_lists` must be a list or tuple")
+
+    if not isinstance(remote_ot_raw_lists, (list, tuple)):
+        raise TypeError("`remote_ot_raw_lists` must be a list or tuple")
+
+    if not isinstance(side, str):
+        raise TypeError("`side` must be str")
+
+    if side not in ["left", "right"]:
+        raise ValueError("invalid side")
+
+    for ot_raw_list in [*local_ot_raw_lists, *remote_ot_raw_lists]:
+        if not isinstance(ot_raw_list, (list, tuple)):
+            raise TypeError("`ot_raw_list` must be a list or tuple")
+
+        if not check(ot_raw_list):
+            raise ValueError("invalid OTs")
+
+    is_left = side == "left"
+
+    # the remote history transformed by the local ots so far
+    row: list[_OTRawInputSeq] = list(remote_ot_raw_lists)
+
+    rebased_local: list[_OTRawOutputSeq] = []
+    for local in local_ot_raw_lists:
+        for j, remote in enumerate(row):
+            row[j] = _transform(remote, local, not is_left)
+            local = _transform(local, remote, is_left)
+        ots = [_resolve_ot(ot_raw) for ot_raw in local]
+        rebased_local.append(_to_ot_raw_list(ots))
+
+    if not row:
+        return rebased_local, []
+
+    while len(row) > 1:
+        next_row: list[_OTRawInputSeq] = [
+            compose(row[i], row[i + 1]) for i in range(0, len(row) - 1, 2)
+        ]
+        if len(row) % 2 == 1:
+            next_row.append(row[-1])
+        row = next_row
+
+    return rebased_local, compose(row[0], [])
+
+
+_JSON_WS_RE = re.compile(r"[ \t\n\r]*")
+_JSON_NUMBER_RE = re.compile(r"(-?(?:0|[1-9][0-9]*))(\.[0-9]+)?([eE][-+]?[0-9]+)?")
+
+
+def _skip_json_ws(s: str, pos: int) -> int:
+    match = _JSON_WS_RE.match(s, pos)
+    assert match is not None
+    return match.end()
+
+
+def _expect_json_char(s: str, pos: int, ch: str) -> int:
+    if not s.startswith(ch, pos):
+        raise JSONDecodeError(f"Expecting '{ch}'", s, pos)
+    return _skip_json_ws(s, pos + 1)
+
+
+def loads_ops(
+    data: Union[str, bytes, bytearray], *, check_unoptimized: object = True
+) -> list[_OTType]:
+    """Parse and check a JSON array of ots
+
+    The ots are returned in the tuple form, which every function accepts
+    without re-inspecting them. `json.JSONDecodeError` is raised with the
+    position of the malformed JSON or OT.
+    """
+
+    if isinstance(data, (bytes, bytearray)):
+        s = data.decode("utf-8")
+    elif isinstance(data, str):
+        s = data
+    else:
+        raise TypeError("`data` must be string or bytes")
+
     ots: list[_OTType] = []
+    last_ot_action = _OTTypeActionNop
+    ot_pos = 0
+
+    pos = _expect_json_char(s, _skip_json_ws(s, 0), "[")
+    if s.startswith("]", pos):
+        pos += 1
+    else:
+        while True:
+            ot_pos = pos
+            ot: _OTType
+
+            if s.startswith('"', pos):
+                ot_arg, pos = scanstring(s, pos + 1)
+                if ot_arg == "":
+                    raise JSONDecodeError("invalid OT-Insert", s, ot_pos)
+                ot = (_OTTypeActionInsert, ot_arg)
+
+            elif s.startswith("{", pos):
+                pos = _skip_json_ws(s, pos + 1)
+                if not s.startswith('"', pos):
+                    raise JSONDecodeError("invalid OT-Delete", s, ot_pos)
+                key, pos = scanstring(s, pos + 1)
+                if key != "d":
+                    raise JSONDecodeError("invalid OT-Delete", s, ot_pos)
+                pos = _expect_json_char(s, _skip_json_ws(s, pos), ":")
+                if not s.startswith('"', pos):
+                    raise JSONDecodeError("invalid OT-Delete", s, ot_pos)
+                ot_arg, pos = scanstring(s, pos + 1)
+                if ot_arg == "":
+                    raise JSONDecodeError("invalid OT-Delete", s, ot_pos)
+                pos = _skip_json_ws(s, pos)
+                if not s.startswith("}", pos):
+                    raise JSONDecodeError("invalid OT-Delete", s, ot_pos)
+                pos += 1
+                ot = (_OTTypeActionDelete, ot_arg)
+
+            else:
+                match = _JSON_NUMBER_RE.match(s, pos)
+                if match is None:
+                    raise JSONDecodeError("unexpected OT structure", s, ot_pos)
+                n = int(match.group(1))
+                if match.group(2) or match.group(3) or not 0 < n <= sys.maxsize:
+                    raise JSONDecodeError("invalid OT-Skip", s, ot_pos)
+                pos = match.end()
+                ot = (_OTTypeActionSkip, n)
+
+            if check_unoptimized and last_ot_action == ot[0]:
+                raise JSONDecodeError("unoptimized OTs", s, ot_pos)
+            last_ot_action = ot[0]
+            ots.append(ot)
+
+            pos = _skip_json_ws(s, pos)
+            if s.startswith("]", pos):
+                pos += 1
+                break
+            pos = _expect_json_char(s, pos, ",")
+
+    pos = _skip_json_ws(s, pos)
+    if pos != len(s):
+        raise JSONDecodeError("Extra data", s, pos)
+
+    if check_unoptimized and last_ot_action == _OTTypeActionSkip:
+        raise JSONDecodeError("unoptimized OTs", s, ot_pos)
+
+    return ots
+
+
+def dumps_ops(ot_raw_list: _OTRawInputSeq, *, check_unoptimized: object = True) -> str:
+    """Serialize ots as a compact JSON array
+
+    The result is the same as `json.dumps` of the ots in the raw form with
+    `ensure_ascii=False` and `separators=(",", ":")`.
+    """
+
+    if not isinstance(ot_raw_list, (list, tuple)):
+        raise TypeError("`ot_raw_list` must be a list or tuple")
+
+    if not check(ot_raw_list, check_unoptimized=check_unoptimized):
+        raise ValueError("invalid OTs")
+
+    ots = [_resolve_ot(ot_raw) for ot_raw in ot_raw_list]
+    return json.dumps(_to_ot_raw_list(ots), ensure_ascii=False, separators=(",", ":"))
+
+
+def _tokenize(doc: str, granularity: _DiffGranularity) -> list[str]:
+    if granularity == "line":
+        return doc.splitlines(keepends=True)
+    return _DIFF_WORD_RE.findall(doc)
+
+
+class _DiffBudget:
+    def __init__(self, deadline: Optional[float], max_cost: Optional[int]) -> None:
+        self.deadline = None if deadline is None else time.monotonic() + deadline
+        self.max_cost = max_cost
 
-    for tag, i1, i2, j1, j2 in seq.get_opcodes():
+        self.cost = 0
+        self.truncated = False
+
+        # steps measured so far and the seconds they took, to predict the time
+        # of comparing pairs of tokens
+        self.steps = 0
+        self.seconds = 0.0
+
+    def measure(self, steps: int, seconds: float) -> None:
+        """Record that `steps` took `seconds`"""
+        self.steps += steps
+        self.seconds += seconds
+
+    def spend(self, cost: int, pairs: int = 0) -> bool:
+        """Spend `cost` and `pairs` of tokens to be compared from the budget
+
+        Return `False` and mark the diff as truncated if the budget is exhausted,
+        or if comparing `pairs` would not finish before the deadline at the rate
+        measured so far.
+        """
+        if self.truncated:
+            return False
+
+        self.cost += cost + pairs
+
+        if self.max_cost is not None and self.cost > self.max_cost:
+            self.truncated = True
+            return False
+
+        if self.deadline is not None:
+            predicted = pairs * self.seconds / self.steps if self.steps else 0.0
+            if time.monotonic() + predicted > self.deadline:
+                self.truncated = True
+                return False
+
+        return True
+
+
+def _get_opcodes(
+    seq: SequenceMatcher[Any],
+    a: Sequence[Any],
+    b: Sequence[Any],
+    budget: _DiffBudget,
+) -> Sequence[_DiffOpcode]:
+    """Bounded version of `SequenceMatcher.get_opcodes`
+
+    Matching blocks are searched region by region as `get_matching_blocks` does,
+    charging the number of pairs compared in each region to `budget` before
+    searching it. Once the budget is exhausted, only the common prefix and
+    suffix of the remaining regions are matched and the unresolved middle is
+    left to be replaced as a whole.
+    """
+    if budget.deadline is None and budget.max_cost is None:
+        return seq.get_opcodes()
+
+    la, lb = len(a), len(b)
+
+    # positions of each token in `b` except junk, which `find_longest_match`
+    # walks up to `bhi` for each token of `a`
+    b2j: dict[Any, list[int]] = seq.b2j  # type: ignore[attr-defined]
+
+    blocks: list[tuple[int, int, int]] = []
+    queue = [(0, la, 0, lb)]
+
+    while queue:
+        alo, ahi, blo, bhi = queue.pop()
+
+        started = time.perf_counter()
+        pairs = sum(bisect_left(b2j[x], bhi) for x in a[alo:ahi] if x in b2j)
+        budget.measure(ahi - alo, time.perf_counter() - started)
+
+        if budget.spend((ahi - alo) + (bhi - blo), pairs):
+            started = time.perf_counter()
+            i, j, k = seq.find_longest_match(alo, ahi, blo, bhi)
+            budget.measure(pairs, time.perf_counter() - started)
+            if k:
+                blocks.append((i, j, k))
+                if alo < i and blo < j:
+                    queue.append((alo, i, blo, j))
+                if i + k < ahi and j + k < bhi:
+                    queue.append((i + k, ahi, j + k, bhi))
+            continue
+
+        k = 0
+        while alo + k < ahi and blo + k < bhi and a[alo + k] == b[blo + k]:
+            k += 1
+        if k:
+            blocks.append((alo, blo, k))
+
+        m = 0
+        while (
+            k < ahi - alo - m and k < bhi - blo - m and a[ahi - m - 1] == b[bhi - m - 1]
+        ):
+            m += 1
+        if m:
+            blocks.append((ahi - m, bhi - m, m))
+
+    blocks.sort()
+
+    opcodes: list[_DiffOpcode] = []
+    i = j = 0
+    for ai, bj, size in blocks + [(la, lb, 0)]:
+        if i < ai and j < bj:
+            opcodes.append(("replace", i, ai, j, bj))
+        elif i < ai:
+            opcodes.append(("delete", i, ai, j, bj))
+        elif j < bj:
+            opcodes.append(("insert", i, ai, j, bj))
+
+        i, j = ai + size, bj + size
+        if size:
+            opcodes.append(("equal", ai, i, bj, j))
+
+    return opcodes
+
+
+def _push_equal(hunks: list[_DiffHunk], start: int, end: int) -> None:
+    last_start, last_end, last_deleted, last_inserted = hunks[-1]
+    if last_end == start and not last_deleted and not last_inserted:
+        hunks[-1] = (last_start, end, "", "")
+    else:
+        hunks.append((start, end, "", ""))
+
+
+def _push_edit(hunks: list[_DiffHunk], deleted: str, inserted: str) -> None:
+    last_start, last_end, last_deleted, last_inserted = hunks[-1]
+    hunks[-1] = (last_start, last_end, last_deleted + deleted, last_inserted + inserted)
+
+
+def _push_coarse(hunks: list[_DiffHunk], doc1: str, doc2: str, offset: int) -> None:
+    """Keep the common prefix and suffix and replace the middle as a whole"""
+    prefix = len(os.path.commonprefix([doc1, doc2]))
+    suffix = len(os.path.commonprefix([doc1[prefix:][::-1], doc2[prefix:][::-1]]))
+
+    if prefix:
+        _push_equal(hunks, offset, offset + prefix)
+
+    _push_edit(
+        hunks, doc1[prefix : len(doc1) - suffix], doc2[prefix : len(doc2) - suffix]
+    )
+
+    if suffix:
+        _push_equal(hunks, offset + len(doc1) - suffix, offset + len(doc1))
+
+
+def _diff_chars(
+    hunks: list[_DiffHunk],
+    doc1: str,
+    doc2: str,
+    offset: int,
+    autojunk: bool,
+    budget: _DiffBudget,
+) -> None:
+    if not budget.spend(len(doc1) + len(doc2)):
+        _push_coarse(hunks, doc1, doc2, offset)
+        return
+
+    seq = SequenceMatcher(None, doc1, doc2, autojunk=autojunk)
+
+    for tag, i1, i2, j1, j2 in _get_opcodes(seq, doc1, doc2, budget):
+        if tag == "equal":
+            _push_equal(hunks, offset + i1, offset + i2)
+        else:
+            _push_edit(hunks, doc1[i1:i2], doc2[j1:j2])
+
+
+def _diff_tokens(
+    hunks: list[_DiffHunk],
+    doc1: str,
+    doc2: str,
+    granularity: _DiffGranularity,
+    budget: _DiffBudget,
+) -> None:
+    tokens1 = _tokenize(doc1, granularity)
+    tokens2 = _tokenize(doc2, granularity)
+
+    pos1 = [0]
+    for token in tokens1:
+        pos1.append(pos1[-1] + len(token))
+
+    pos2 = [0]
+    for token in tokens2:
+        pos2.append(pos2[-1] + len(token))
+
+    if not budget.spend(len(tokens1) + len(tokens2)):
+        _push_coarse(hunks, doc1, doc2, 0)
+        return
+
+    seq = SequenceMatcher(None, tokens1, tokens2, autojunk=False)
+
+    for tag, i1, i2, j1, j2 in _get_opcodes(seq, tokens1, tokens2, budget):
         if tag == "equal":
-            ots.append((_OTTypeActionSkip, i2 - i1))
-        elif tag == "delete":
-            ots.append((_OTTypeActionDelete, doc1[i1:i2]))
-        elif tag == "insert":
-            ots.append((_OTTypeActionInsert, doc2[j1:j2]))
+            _push_equal(hunks, pos1[i1], pos1[i2])
         elif tag == "replace":
-            ots.append((_OTTypeActionDelete, doc1[i1:i2]))
-            ots.append((_OTTypeActionInsert, doc2[j1:j2]))
+            # refine changed regions at character level
+            _diff_chars(
+                hunks,
+                doc1[pos1[i1] : pos1[i2]],
+                doc2[pos2[j1] : pos2[j2]],
+                pos1[i1],
+                True,
+                budget,
+            )
+        else:
+            _push_edit(hunks, doc1[pos1[i1] : pos1[i2]], doc2[pos2[j1] : pos2[j2]])
+
+
+def _cleanup_hunks(doc1: str, hunks: list[_DiffHunk]) -> list[_DiffHunk]:
+    """Merge tiny equalities into surrounding edits
+
+    An equality between two edits is replaced by deleting and re-inserting it
+    if it is not longer than the edits on both sides.
+    """
+    cleaned: list[_DiffHunk] = []
+
+    for hunk in hunks:
+        cleaned.append(hunk)
+
+        while len(cleaned) >= 2:
+            prev_start, prev_end, prev_deleted, prev_inserted = cleaned[-2]
+            start, end, deleted, inserted = cleaned[-1]
+
+            if not (prev_deleted or prev_inserted) or not (deleted or inserted):
+                break
+
+            if end - start > max(len(prev_deleted), len(prev_inserted)):
+                break
+
+            if end - start > max(len(deleted), len(inserted)):
+                break
+
+            equal = doc1[start:end]
+            cleaned[-2:] = [
+                (
+                    prev_start,
+                    prev_end,
+                    prev_deleted + equal + deleted,
+                    prev_inserted + equal + inserted,
+                )
+            ]
+
+    return cleaned
+
+
+def _diff(
+    doc1: str,
+    doc2: str,
+    granularity: _DiffGranularity,
+    cleanup: bool,
+    deadline: Optional[float],
+    max_cost: Optional[int],
+) -> tuple[_OTRawOutputSeq, bool]:
+    if not isinstance(doc1, str) or not isinstance(doc2, str):
+        raise TypeError("`doc1` and `doc2` must be string")
+
+    if granularity not in ["char", "word", "line"]:
+        raise ValueError("invalid granularity")
+
+    if deadline is not None and deadline < 0:
+        raise ValueError("invalid deadline")
+
+    if max_cost is not None and max_cost < 0:
+        raise ValueError("invalid max_cost")
+
+    budget = _DiffBudget(deadline, max_cost)
+    hunks: list[_DiffHunk] = [(0, 0, "", "")]
+
+    if granularity == "char":
+        _diff_chars(hunks, doc1, doc2, 0, True, budget)
+    else:
+        _diff_tokens(hunks, doc1, doc2, granularity, budget)
+
+    if cleanup:
+        hunks = _cleanup_hunks(doc1, hunks)
+
+    ots: list[_OTType] = []
+    appender = _Appender(ots)
+
+    for start, end, deleted, inserted in hunks:
+        if start < end:
+            appender.append((_OTTypeActionSkip, end - start))
+        if deleted:
+            appender.append((_OTTypeActionDelete, deleted))
+        if inserted:
+            appender.append((_OTTypeActionInsert, inserted))
+
+    _trim(ots)
+
+    return _to_ot_raw_list(ots), budget.truncated
+
+
+def diff(
+    doc1: str,
+    doc2: str,
+    *,
+    granularity: _DiffGranularity = "char",
+    cleanup: object = False,
+    deadline: Optional[float] = None,
+    max_cost: Optional[int] = None,
+) -> _OTRawOutputSeq:
+    """Generate ots which change `doc1` to `doc2`
+
+    With `granularity` of "word" or "line", docs are diffed by word or line
+    tokens first and only the changed regions are refined at character level,
+    which is much faster on large docs.
+
+    If `cleanup` is `True`, tiny equalities between edits are merged into the
+    edits, which emits less fragmented ots.
+
+    `deadline` (in seconds) and `max_cost` (in scanned tokens and compared pairs
+    of tokens) bound the time spent on matching. A region is not matched if its
+    worst-case cost exceeds the rest of the budget. Once exceeded, the
+    unresolved regions are replaced as a whole, so the result is still valid
+    but may be less minimal. Use `bounded_diff` to know whether it happened.
+    """
+
+    return _diff(doc1, doc2, granularity, bool(cleanup), deadline, max_cost)[0]
+
+
+def bounded_diff(
+    doc1: str,
+    doc2: str,
+    *,
+    granularity: _DiffGranularity = "char",
+    cleanup: object = False,
+    deadline: Optional[float] = None,
+    max_cost: Optional[int] = None,
+) -> tuple[_OTRawOutputSeq, bool]:
+    """Same as `diff` but also return whether the budget was exhausted"""
+
+    return _diff(doc1, doc2, granularity, bool(cleanup), deadline, max_cost)
+
+
+def _push_replace(appender: _Appender, deleted: str, inserted: str) -> None:
+    """Append ots replacing `deleted` with `inserted` except their common ends"""
+    prefix = len(os.path.commonprefix([deleted, inserted]))
+    suffix = len(
+        os.path.commonprefix([deleted[prefix:][::-1], inserted[prefix:][::-1]])
+    )
+
+    if prefix:
+        appender.append((_OTTypeActionSkip, prefix))
+    if len(deleted) - suffix > prefix:
+        appender.append((_OTTypeActionDelete, deleted[prefix : len(deleted) - suffix]))
+    if len(inserted) - suffix > prefix:
+        appender.append(
+            (_OTTypeActionInsert, inserted[prefix : len(inserted) - suffix])
+        )
+    if suffix:
+        appender.append((_OTTypeActionSkip, suffix))
+
+
+def ops_from_edits(doc: str, edits: Sequence[tuple[int, int, str]]) -> _OTRawOutputSeq:
+    """Generate ots which replace `doc[start:end]` with `text` for each edit
+
+    `edits` of `(start, end, text)` must be sorted and must not overlap.
+    Adjacent edits are merged and the common ends of the replaced and the
+    replacing text are kept, so the result is normalized.
+    """
+
+    if not isinstance(doc, str):
+        raise TypeError("`doc` must be string")
+
+    if not isinstance(edits, (list, tuple)):
+        raise TypeError("`edits` must be a list or tuple")
+
+    ots: list[_OTType] = []
+    appender = _Appender(ots)
+
+    pos = 0
+    region_start = 0  # start of the pending replaced region
+    inserted: list[str] = []
+
+    for edit in edits:
+        if not isinstance(edit, tuple) or len(edit) != 3:
+            raise TypeError("edit must be a tuple of (start, end, text)")
+
+        start, end, text = edit
+        if not isinstance(start, int) or not isinstance(end, int):
+            raise TypeError("`start` and `end` of edit must be int")
+        if not isinstance(text, str):
+            raise TypeError("`text` of edit must be string")
+
+        if not pos <= start <= end <= len(doc):
+            raise ValueError("edits must be sorted, non-overlapping and in doc")
+
+        if start > pos:
+            _push_replace(appender, doc[region_start:pos], "".join(inserted))
+            appender.append((_OTTypeActionSkip, start - pos))
+            region_start = start
+            inserted = []
+
+        inserted.append(text)
+        pos = end
+
+    _push_replace(appender, doc[region_start:pos], "".join(inserted))
 
     _trim(ots)
 
     return _to_ot_raw_list(ots)
+
+
+def replace_ops(
+    doc: str,
+    pattern: Union[str, re.Pattern[str]],
+    repl: Union[str, Callable[[re.Match[str]], str]],
+    *,
+    flags: int = 0,
+    count: int = 0,
+    literal: object = False,
+) -> _OTRawOutputSeq:
+    """Generate ots which replace matches of `pattern` in doc with `repl`
+
+    Same as `re.sub(pattern, repl, doc, count=count, flags=flags)` but the
+    result is ots built from the match positions, without diffing docs. If
+    `literal` is `True`, `pattern` and `repl` are plain strings.
+    """
+
+    if not isinstance(doc, str):
+        raise TypeError("`doc` must be string")
+
+    if count < 0:
+        raise ValueError("invalid count")
+
+    if literal:
+        if not isinstance(pattern, str) or not isinstance(repl, str):
+            raise TypeError("`pattern` and `repl` must be string if `literal`")
+        pattern = re.escape(pattern)
+
+    compiled = re.compile(pattern, flags)
+
+    edits: list[tuple[int, int, str]] = []
+    for match in compiled.finditer(doc):
+        if callable(repl):
+            text = repl(match)
+        elif literal or "\\" not in repl:
+            text = repl
+        else:
+            text = match.expand(repl)
+
+        edits.append((match.start(), match.end(), text))
+
+        if len(edits) == count:
+            break
+
+    return ops_from_edits(doc, edits)
+
+
+def split_ops(ot_raw_list: _OTRawInputSeq, max_chars: int) -> list[_OTRawOutputSeq]:
+    """Split ots into ots with at most `max_chars` inserted and deleted chars
+
+    Applying the results in order is the same as applying `ot_raw_list`. Each
+    result starts with a skip to the position where the previous one ended,
+    and a large OT-Insert or OT-Delete is divided across the results.
+    """
+
+    if not isinstance(ot_raw_list, (list, tuple)):
+        raise TypeError("`ot_raw_list` must be a list or tuple")
+
+    if not isinstance(max_chars, int) or max_chars < 1:
+        raise ValueError("invalid max_chars")
+
+    if not check(ot_raw_list, check_unoptimized=False):
+        raise ValueError("invalid OTs")
+
+    chunks: list[_OTRawOutputSeq] = []
+    ots: list[_OTType] = []
+    appender = _Appender(ots)
+
+    pos = 0  # position in the doc with the ots so far applied
+    budget = max_chars
+
+    for ot_raw in ot_raw_list:
+        ot_action, ot_arg = _resolve_ot(ot_raw)
+
+        if ot_action == _OTTypeActionSkip:
+            assert isinstance(ot_arg, int)
+
+            appender.append((_OTTypeActionSkip, ot_arg))
+            pos += ot_arg
+            continue
+
+        assert isinstance(ot_arg, str)
+
+        offset = 0
+        while offset < len(ot_arg):
+            piece = ot_arg[offset : offset + budget]
+            offset += len(piece)
+            budget -= len(piece)
+
+            appender.append((ot_action, piece))
+            if ot_action == _OTTypeActionInsert:
+                pos += len(piece)
+
+            if budget == 0:
+                _trim(ots)
+                chunks.append(_to_ot_raw_list(ots))
+
+                ots = []
+                appender = _Appender(ots)
+                if pos:
+                    appender.append((_OTTypeActionSkip, pos))
+                budget = max_chars
+
+    if budget < max_chars:
+        _trim(ots)
+        chunks.append(_to_ot_raw_list(ots))
+
+    return chunks
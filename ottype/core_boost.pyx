@@ -1,13 +1,29 @@
 # cython: language_level=3, boundscheck=False
+# cython: freethreading_compatible=True, subinterpreters_compatible=own_gil
+#
+# The module keeps no mutable state: every call works on its own `_Taker`,
+# `_Appender` and result lists, and strings are read only, so functions can
+# run in parallel on the free-threaded build and in isolated subinterpreters.
+cimport cython
 from cpython cimport *
+from cpython.pyport cimport PY_SSIZE_T_MAX
+
+from json import JSONDecodeError
 
 
 cdef enum OTTypeAction:
     nop = 0, skip = 1, insert = 2, delete = 3
 
+cdef inline bint _is_valid_skip(object ot_arg):
+    try:
+        return <Py_ssize_t>ot_arg > 0
+    except OverflowError:
+        return False
+
+
 cpdef inline tuple[OTTypeAction, object]  _resolve_ot(object ot_raw):
     if isinstance(ot_raw, int):
-        if <int>ot_raw <= 0:
+        if not _is_valid_skip(ot_raw):
             raise ValueError("invalid OT-Skip")
         return OTTypeAction.skip, ot_raw
     elif isinstance(ot_raw, str):
@@ -23,18 +39,15 @@ cpdef inline tuple[OTTypeAction, object]  _resolve_ot(object ot_raw):
         if len(ot_raw) == 2:
             ot_action, ot_arg = ot_raw
             if ot_action == 1:
-                assert isinstance(ot_arg, int)
-                if <int>ot_arg <= 0:
+                if not isinstance(ot_arg, int) or not _is_valid_skip(ot_arg):
                     raise ValueError("invalid OT-Skip")
                 return ot_raw
             elif ot_action == 2:
-                assert isinstance(ot_arg, str)
-                if <str>ot_arg == "":
+                if not isinstance(ot_arg, str) or <str>ot_arg == "":
                     raise ValueError("invalid OT-Insert")
                 return ot_raw
             elif ot_action == 3:
-                assert isinstance(ot_arg, str)
-                if <str>ot_arg == "":
+                if not isinstance(ot_arg, str) or <str>ot_arg == "":
                     raise ValueError("invalid OT-Delete")
                 return ot_raw
 
@@ -67,11 +80,18 @@ def _to_ot_raw_list(list ots):
 
 
 cdef class _Appender:
-    cdef list ots
+    cdef:
+        list ots
+
+        OTTypeAction _pending_action
+        list _pending_parts
 
     def __init__(self, list ots):
         self.ots = ots
 
+        self._pending_action = OTTypeAction.nop
+        self._pending_parts = []
+
     def append(self, tuple ot):
         cdef:
             OTTypeAction last_ot_action
@@ -82,7 +102,9 @@ cdef class _Appender:
 
         if ot is None:
             return
-        
+
+        self.flush()
+
         if not self.ots:
             self.ots.append(ot)
             return
@@ -91,7 +113,7 @@ cdef class _Appender:
         last_ot_action, last_ot_arg = <tuple>self.ots[-1]
 
         if last_ot_action == OTTypeAction.skip and ot_action == OTTypeAction.skip:
-            self.ots[-1] = (OTTypeAction.skip, <int>last_ot_arg + <int>ot_arg)
+            self.ots[-1] = (OTTypeAction.skip, last_ot_arg + ot_arg)
         elif last_ot_action == OTTypeAction.insert and ot_action == OTTypeAction.insert:
             self.ots[-1] = (OTTypeAction.insert, <str>last_ot_arg + <str>ot_arg)
         elif last_ot_action == OTTypeAction.delete and ot_action == OTTypeAction.delete:
@@ -99,79 +121,148 @@ cdef class _Appender:
         else:
             self.ots.append(ot)
 
+    cpdef append_view(self, tuple view):
+        cdef:
+            OTTypeAction ot_action
+            str source
+            Py_ssize_t start, end
+
+            tuple last_ot
+            str last_ot_arg
+
+        if view is None:
+            return
+
+        ot_action, source, start, end = view
+
+        if ot_action == self._pending_action:
+            self._pending_parts.append((source, start, end))
+            return
+
+        self.flush()
+
+        if ot_action == OTTypeAction.skip:
+            if self.ots and (<tuple>self.ots[-1])[0] == OTTypeAction.skip:
+                self.ots[-1] = (
+                    OTTypeAction.skip, (<tuple>self.ots[-1])[1] + (end - start)
+                )
+            else:
+                self.ots.append((OTTypeAction.skip, end - start))
+            return
+
+        if self.ots and (<tuple>self.ots[-1])[0] == ot_action:
+            last_ot = <tuple>self.ots.pop()
+            last_ot_arg = <str>last_ot[1]
+            self._pending_parts.append((last_ot_arg, 0, len(last_ot_arg)))
+
+        self._pending_action = ot_action
+        self._pending_parts.append((source, start, end))
+
+    cpdef flush(self):
+        cdef:
+            list parts
+            tuple part
+            str source
+            Py_ssize_t start, end
+            str ot_arg
+
+        if self._pending_action == OTTypeAction.nop:
+            return
+
+        parts = self._pending_parts
+        part = <tuple>parts[0]
+        source, start, end = part
+
+        if len(parts) == 1 and start == 0 and end == len(source):
+            ot_arg = source
+        else:
+            ot_arg = "".join([
+                (<str>part[0])[<Py_ssize_t>part[1]:<Py_ssize_t>part[2]]
+                for part in parts
+            ])
+
+        self.ots.append((self._pending_action, ot_arg))
+
+        self._pending_action = OTTypeAction.nop
+        self._pending_parts = []
+
 
 cdef class _Taker:
     cdef:
-        object ot_raw_list
-        int ot_raw_list_len
-        int _idx
-        int _offset
-    
+        object _iter
+        Py_ssize_t _offset
+        tuple _ot
+
     def __init__(self, object ot_raw_list):
-        self.ot_raw_list = ot_raw_list
-        self.ot_raw_list_len = len(ot_raw_list)
+        self._iter = iter(ot_raw_list)
 
-        self._idx = 0
         self._offset = 0
+        self._ot = None
+        self._next()
+
+    cdef int _next(self) except -1:
+        ot_raw = next(self._iter, None)
+        self._ot = None if ot_raw is None else _resolve_ot(ot_raw)
+        return 0
 
-    def take(self, int n, str indivisable = None):
+    cpdef tuple take_view(self, Py_ssize_t n, str indivisable = None):
         cdef:
-            tuple ret_ot
             OTTypeAction ot_action
             object ot_arg
-            int ot_arg_as_int
-            str ot_arg_as_str
+            str source
+            Py_ssize_t length
+            Py_ssize_t start, end
 
-        if self._idx == self.ot_raw_list_len:
+        if self._ot is None:
             if n == -1:
                 return None
-            return (OTTypeAction.skip, n)
+            return (OTTypeAction.skip, "", 0, n)
 
-        ot_action, ot_arg = _resolve_ot(self.ot_raw_list[self._idx])
-        ret_ot = None
+        ot_action, ot_arg = self._ot
 
         if ot_action == OTTypeAction.skip:
-            ot_arg_as_int = <int>ot_arg
-
-            if n == -1 or ot_arg_as_int - self._offset <= n:
-                ret_ot = (OTTypeAction.skip, ot_arg_as_int - self._offset)
-                self._idx += 1
-                self._offset = 0
-            else:
-                ret_ot = (OTTypeAction.skip, n)
-                self._offset += n
-
-        elif ot_action == OTTypeAction.insert:
-            ot_arg_as_str = <str>ot_arg
+            source = ""
+            length = <Py_ssize_t>ot_arg
+        else:
+            source = <str>ot_arg
+            length = len(source)
+
+        start = self._offset
+
+        if (
+            n == -1
+            or (indivisable == "i" and ot_action == OTTypeAction.insert)
+            or (indivisable == "d" and ot_action == OTTypeAction.delete)
+            or length - start <= n
+        ):
+            end = length
+            self._offset = 0
+            self._next()
+        else:
+            end = start + n
+            self._offset = end
 
-            if n == -1 or indivisable == "i" or len(ot_arg_as_str) - self._offset <= n:
-                ret_ot = (OTTypeAction.insert, ot_arg_as_str[self._offset:])
-                self._idx += 1
-                self._offset = 0
-            else:
-                ret_ot = (
-                    OTTypeAction.insert, ot_arg_as_str[self._offset:self._offset + n]
-                )
-                self._offset += n
+        return (ot_action, source, start, end)
 
-        elif ot_action == OTTypeAction.delete:
-            ot_arg_as_str = <str>ot_arg
+    def take(self, Py_ssize_t n, str indivisable = None):
+        cdef:
+            tuple view
+            OTTypeAction ot_action
+            str source
+            Py_ssize_t start, end
 
-            if n == -1 or indivisable == "d" or len(ot_arg_as_str) - self._offset <= n:
-                ret_ot = (OTTypeAction.delete, ot_arg_as_str[self._offset:])
-                self._idx += 1
-                self._offset = 0
-            else:
-                ret_ot = (
-                    OTTypeAction.delete, ot_arg_as_str[self._offset:self._offset + n]
-                )
-                self._offset += n
+        view = self.take_view(n, indivisable)
+        if view is None:
+            return None
 
-        return ret_ot
+        ot_action, source, start, end = view
+        if ot_action == OTTypeAction.skip:
+            return (OTTypeAction.skip, end - start)
+        return (ot_action, source[start:end])
 
     def peak_action(self):
-        if 0 <= self._idx < self.ot_raw_list_len:
-            return _resolve_ot(self.ot_raw_list[self._idx])[0]
+        if self._ot is not None:
+            return self._ot[0]
         return OTTypeAction.nop
 
 
@@ -180,7 +271,94 @@ def _trim(list ots not None):
         ots.pop()
 
 
-def check(object ot_raw_list not None, *, bool check_unoptimized not None = True):
+cdef tuple _op_stats(object ot_raw_list):
+    cdef:
+        Py_ssize_t skipped, inserted, deleted
+        Py_ssize_t n
+
+        OTTypeAction ot_action
+        object ot_arg
+
+    skipped = 0
+    inserted = 0
+    deleted = 0
+
+    for ot_raw in ot_raw_list:
+        ot_action, ot_arg = _resolve_ot(ot_raw)
+
+        if ot_action == OTTypeAction.skip:
+            n = <Py_ssize_t>ot_arg
+        else:
+            n = len(<str>ot_arg)
+
+        if n > PY_SSIZE_T_MAX - skipped - inserted - deleted:
+            raise OverflowError("OTs are too long")
+
+        if ot_action == OTTypeAction.skip:
+            skipped += n
+
+        elif ot_action == OTTypeAction.insert:
+            inserted += n
+
+        elif ot_action == OTTypeAction.delete:
+            deleted += n
+
+    return skipped + deleted, skipped + inserted, inserted, deleted
+
+
+# modulus of `_poly_hash`, the same as `ottype.digest._POLY_HASH_MOD`
+# (a C constant rather than a global, which would be shared by interpreters)
+cdef extern from *:
+    """
+    #define OTTYPE_POLY_HASH_MOD ((1ULL << 47) - 115)
+    """
+    const unsigned long long _POLY_HASH_MOD "OTTYPE_POLY_HASH_MOD"
+
+
+cdef inline unsigned long long _shl16_mod(unsigned long long h) nogil:
+    """`h << 16` reduced to less than 2**48 with the same residue
+
+    `h` must be less than 2**48. It uses `2**47 == 115 (mod _POLY_HASH_MOD)`.
+    """
+    return (h >> 31) * 115 + ((h & 0x7FFFFFFF) << 16)
+
+
+def _poly_hash(str text not None):
+    cdef:
+        unsigned long long h = 0
+        Py_UCS4 ch
+
+    for ch in text:
+        # plus 1, so that NUL characters count
+        h = _shl16_mod(_shl16_mod(h)) + <unsigned long long>ch + 1
+
+    return h % _POLY_HASH_MOD
+
+
+# whether the module is built with per-module state, which lets it be imported
+# in every subinterpreter
+cdef extern from *:
+    """
+    #if CYTHON_USE_MODULE_STATE
+    #define OTTYPE_MODULE_STATE 1
+    #else
+    #define OTTYPE_MODULE_STATE 0
+    #endif
+    """
+    const bint _MODULE_STATE "OTTYPE_MODULE_STATE"
+
+
+def _has_module_state():
+    """Return whether the module is built with per-module state"""
+    return _MODULE_STATE
+
+
+def _poly_hash_params():
+    """Return `(modulus, base)` of `_poly_hash`"""
+    return _POLY_HASH_MOD, 4294967296
+
+
+def check(object ot_raw_list not None, *, bint check_unoptimized = True):
     cdef:
         OTTypeAction last_ot_action
         OTTypeAction ot_action
@@ -207,37 +385,51 @@ def check(object ot_raw_list not None, *, bool check_unoptimized not None = True
     return True
 
 
-def apply(
-    str doc not None,
-    object ot_raw_list not None,
-    *,
-    bool check_unoptimized not None = True,
-):
+cdef _raise_if_invalid(object ot_raw_list, bint check_unoptimized):
+    """Raise `ValueError` if any of ots is invalid
+
+    Called before reporting ots which do not fit the doc, so that invalid ots
+    later in the list are reported first as `core.apply` does.
+    """
+    if not check(ot_raw_list, check_unoptimized=check_unoptimized):
+        raise ValueError("invalid OTs")
+
+
+cdef str _apply(str doc, object ot_raw_list, bint check_unoptimized):
+    """Apply ots to doc, checking ots in the same pass"""
     cdef:
         list new_doc
-        int pos
+        Py_ssize_t pos
 
+        OTTypeAction last_ot_action
         OTTypeAction ot_action
         object ot_arg
-        int ot_arg_as_int
+        Py_ssize_t ot_arg_as_int
         str ot_arg_as_str
 
     if not isinstance(ot_raw_list, (list, tuple)):
         raise TypeError("`ot_raw_list` must be a list or tuple")
 
-    if not check(ot_raw_list, check_unoptimized=check_unoptimized):
-        raise ValueError("invalid OTs")
-
     new_doc = []
     pos = 0
+    last_ot_action = OTTypeAction.nop
 
     for ot_raw in ot_raw_list:
-        ot_action, ot_arg = _resolve_ot(ot_raw)
+        try:
+            ot_action, ot_arg = _resolve_ot(ot_raw)
+        except (ValueError, TypeError):
+            raise ValueError("invalid OTs")
+
+        if check_unoptimized and last_ot_action == ot_action:
+            raise ValueError("invalid OTs")
+
+        last_ot_action = ot_action
 
         if ot_action == OTTypeAction.skip:
-            ot_arg_as_int = <int>ot_arg
+            ot_arg_as_int = <Py_ssize_t>ot_arg
 
             if ot_arg_as_int > len(doc) - pos:
+                _raise_if_invalid(ot_raw_list, check_unoptimized)
                 raise ValueError("skip exceeds doc length")
 
             new_doc.append(doc[pos:pos + ot_arg_as_int])
@@ -251,7 +443,8 @@ def apply(
         elif ot_action == OTTypeAction.delete:
             ot_arg_as_str = <str>ot_arg
 
-            if doc[pos:pos + len(ot_arg_as_str)] != ot_arg_as_str:
+            if not doc.startswith(ot_arg_as_str, pos):
+                _raise_if_invalid(ot_raw_list, check_unoptimized)
                 raise ValueError(
                     "inconsistent delete (doc, OT.arg)",
                     doc[pos:pos + len(ot_arg_as_str)],
@@ -259,26 +452,121 @@ def apply(
                 )
             pos += len(ot_arg_as_str)
 
+    if check_unoptimized and last_ot_action == OTTypeAction.skip:
+        raise ValueError("invalid OTs")
+
     new_doc.append(doc[pos:])
 
     return "".join(new_doc)
 
 
+def apply(
+    str doc not None,
+    object ot_raw_list not None,
+    *,
+    bint check_unoptimized = True,
+):
+    return _apply(doc, ot_raw_list, check_unoptimized)
+
+
+def apply_batch(
+    object docs not None,
+    object ot_raw_lists not None,
+    *,
+    bint check_unoptimized = True,
+):
+    cdef:
+        list results
+        Py_ssize_t i, n
+        object doc
+
+    if not isinstance(docs, (list, tuple)):
+        raise TypeError("`docs` must be a list or tuple")
+
+    if not isinstance(ot_raw_lists, (list, tuple)):
+        raise TypeError("`ot_raw_lists` must be a list or tuple")
+
+    n = len(docs)
+    if n != len(ot_raw_lists):
+        raise ValueError("`docs` and `ot_raw_lists` must have the same length")
+
+    results = PyList_New(n)
+
+    for i in range(n):
+        doc = docs[i]
+        try:
+            if not isinstance(doc, str):
+                raise TypeError("`doc` must be string")
+            result = _apply(<str>doc, ot_raw_lists[i], check_unoptimized)
+        except Exception as e:
+            result = e
+
+        Py_INCREF(result)
+        PyList_SET_ITEM(results, i, result)
+
+    return results
+
+
+def apply_chain(
+    str doc not None,
+    object ot_raw_lists not None,
+    *,
+    bint check_unoptimized = True,
+):
+    cdef:
+        list level
+        list next_level
+        Py_ssize_t i
+        Py_ssize_t length, base_len, target_len
+
+    if not isinstance(ot_raw_lists, (list, tuple)):
+        raise TypeError("`ot_raw_lists` must be a list or tuple")
+
+    length = len(doc)
+    level = []
+    for ot_raw_list in ot_raw_lists:
+        if not isinstance(ot_raw_list, (list, tuple)):
+            raise TypeError("`ot_raw_list` must be a list or tuple")
+
+        if not check_unoptimized:
+            ot_raw_list = normalize(ot_raw_list)
+
+        base_len, target_len = op_lengths(ot_raw_list)
+        if base_len > length:
+            raise ValueError("skip exceeds doc length")
+        length += target_len - base_len
+
+        level.append(ot_raw_list)
+
+    if not level:
+        return doc
+
+    while len(level) > 1:
+        next_level = []
+        for i in range(0, len(level) - 1, 2):
+            next_level.append(compose(level[i], level[i + 1]))
+        if len(level) % 2 == 1:
+            next_level.append(level[-1])
+        level = next_level
+
+    return apply(doc, level[0])
+
+
 def inverse_apply(
     str doc not None,
     object ot_raw_list not None,
     *,
-    bool check_unoptimized not None = True,
+    bint check_unoptimized = True,
 ):
     cdef:
         list ot_list
 
-        int last_pos
+        Py_ssize_t last_pos
         list old_doc
 
         OTTypeAction ot_action
         object ot_arg
-        int ot_arg_as_int
+        Py_ssize_t ot_arg_as_int
         str ot_arg_as_str
 
     if not isinstance(ot_raw_list, (list, tuple)):
@@ -287,19 +575,7 @@ def inverse_apply(
     if not check(ot_raw_list, check_unoptimized=check_unoptimized):
         raise ValueError("invalid OTs")
 
-    last_pos = 0
-
-    for ot_raw in ot_raw_list:
-        ot_action, ot_arg = _resolve_ot(ot_raw)
-
-        if ot_action == OTTypeAction.skip:
-            last_pos += <int>ot_arg
-
-        elif ot_action == OTTypeAction.insert:
-            last_pos += len(<str>ot_arg)
-
-        elif ot_action == OTTypeAction.delete:
-            pass
+    last_pos = _op_stats(ot_raw_list)[1]
 
     if last_pos > len(doc):
         raise ValueError("skip exceeds doc length")
@@ -310,7 +586,7 @@ def inverse_apply(
         ot_action, ot_arg = _resolve_ot(ot_raw)
 
         if ot_action == OTTypeAction.skip:
-            ot_arg_as_int = <int>ot_arg
+            ot_arg_as_int = <Py_ssize_t>ot_arg
 
             old_doc.append(doc[last_pos - ot_arg_as_int:last_pos])
             last_pos -= ot_arg_as_int
@@ -336,6 +612,50 @@ def inverse_apply(
     return "".join(reversed(old_doc))
 
 
+def op_lengths(
+    object ot_raw_list not None,
+    *,
+    bint check_unoptimized = True,
+):
+    cdef:
+        tuple stats
+
+    if not isinstance(ot_raw_list, (list, tuple)):
+        raise TypeError("`ot_raw_list` must be a list or tuple")
+
+    if not check(ot_raw_list, check_unoptimized=check_unoptimized):
+        raise ValueError("invalid OTs")
+
+    stats = _op_stats(ot_raw_list)
+
+    return stats[0], stats[1]
+
+
+def op_stats(
+    object ot_raw_list not None,
+    *,
+    bint check_unoptimized = True,
+):
+    cdef:
+        tuple stats
+
+    if not isinstance(ot_raw_list, (list, tuple)):
+        raise TypeError("`ot_raw_list` must be a list or tuple")
+
+    if not check(ot_raw_list, check_unoptimized=check_unoptimized):
+        raise ValueError("invalid OTs")
+
+    stats = _op_stats(ot_raw_list)
+
+    return {
+        "base_len": stats[0],
+        "target_len": stats[1],
+        "inserted": stats[2],
+        "deleted": stats[3],
+        "components": len(ot_raw_list),
+    }
+
+
 def normalize(object ot_raw_list not None):
     cdef:
         list new_ots
@@ -361,19 +681,6 @@ def transform(
     object ot_raw_list_2 not None,
     str side not None,
 ):
-    cdef:
-        list new_ots
-        _Appender appender
-        _Taker taker
-
-        OTTypeAction ot_action
-        object ot_arg
-        int n
-
-        tuple chunk_ot
-        OTTypeAction chunk_ot_action
-        object chunk_ot_arg
-
     if not isinstance(ot_raw_list_1, (list, tuple)):
         raise TypeError("`ot_raw_list_1` must be a list or tuple")
 
@@ -386,87 +693,191 @@ def transform(
     if side not in ["left", "right"]:
         raise ValueError("invalid side")
 
+    return _to_ot_raw_list(_transform(ot_raw_list_1, ot_raw_list_2, side == "left"))
+
+
+cdef list _transform(object ot_raw_list_1, object ot_raw_list_2, bint is_left):
+    """Transform checked ots and return the result as resolved ots"""
+    cdef:
+        list new_ots
+        _Appender appender
+        _Taker taker
+
     new_ots = []
     appender = _Appender(new_ots)
     taker = _Taker(ot_raw_list_1)
 
     for ot_raw in ot_raw_list_2:
-        ot_action, ot_arg = _resolve_ot(ot_raw)
+        _transform_step(taker, appender, _resolve_ot(ot_raw), is_left)
 
-        if ot_action == OTTypeAction.skip:
-            n = <int>ot_arg
+    _take_rest(taker, appender)
+    _trim(new_ots)
 
-            while 0 < n:
-                chunk_ot = taker.take(n, "i")
-                appender.append(chunk_ot)
+    return new_ots
 
-                if chunk_ot is None:
-                    break
 
-                chunk_ot_action, chunk_ot_arg = chunk_ot
+cdef int _transform_step(
+    _Taker taker, _Appender appender, tuple ot, bint is_left
+) except -1:
+    """Transform the taken ots against one OT of the other ots"""
+    cdef:
+        OTTypeAction ot_action
+        object ot_arg
+        Py_ssize_t n
 
-                if chunk_ot_action == OTTypeAction.skip:
-                    n -= <int>chunk_ot_arg
-                elif chunk_ot_action == OTTypeAction.insert:
-                    pass
-                elif chunk_ot_action == OTTypeAction.delete:
-                    n -= len(<str>chunk_ot_arg)
+        tuple chunk_view
+        OTTypeAction chunk_ot_action
+        Py_ssize_t chunk_start, chunk_end
 
-        elif ot_action == OTTypeAction.insert:
-            n = len(<str>ot_arg)
+    ot_action, ot_arg = ot
 
-            if (
-                side == "left"
-                and taker.peak_action() == OTTypeAction.insert
-            ):
-                appender.append(taker.take(-1))
+    if ot_action == OTTypeAction.skip:
+        n = <Py_ssize_t>ot_arg
 
-            appender.append((OTTypeAction.skip, n))
+        while 0 < n:
+            chunk_view = taker.take_view(n, "i")
+            appender.append_view(chunk_view)
 
-        elif ot_action == OTTypeAction.delete:
-            n = len(<str>ot_arg)
+            if chunk_view is None:
+                break
 
-            while 0 < n:
-                chunk_ot = taker.take(n, "i")
-                chunk_ot_action, chunk_ot_arg = chunk_ot
+            chunk_ot_action, _, chunk_start, chunk_end = chunk_view
 
-                if chunk_ot_action == OTTypeAction.skip:
-                    n -= <int>chunk_ot_arg
-                elif chunk_ot_action == OTTypeAction.insert:
-                    appender.append(chunk_ot)
-                elif chunk_ot_action == OTTypeAction.delete:
-                    n -= len(<str>chunk_ot_arg)
+            if chunk_ot_action == OTTypeAction.skip:
+                n -= chunk_end - chunk_start
+            elif chunk_ot_action == OTTypeAction.insert:
+                pass
+            elif chunk_ot_action == OTTypeAction.delete:
+                n -= chunk_end - chunk_start
 
-    while True:
-        chunk_ot = taker.take(-1)
-        if chunk_ot is None:
-            break
-        appender.append(chunk_ot)
+    elif ot_action == OTTypeAction.insert:
+        n = len(<str>ot_arg)
 
-    _trim(new_ots)
+        if is_left and taker.peak_action() == OTTypeAction.insert:
+            appender.append_view(taker.take_view(-1))
 
-    return _to_ot_raw_list(new_ots)
+        appender.append_view((OTTypeAction.skip, "", 0, n))
 
+    elif ot_action == OTTypeAction.delete:
+        n = len(<str>ot_arg)
 
-def compose(object ot_raw_list_1 not None, object ot_raw_list_2 not None):
-    cdef:
-        list new_ots
-        _Appender appender
-        _Taker taker
+        while 0 < n:
+            chunk_view = taker.take_view(n, "i")
+            chunk_ot_action, _, chunk_start, chunk_end = chunk_view
 
-        tuple ot
+            if chunk_ot_action == OTTypeAction.skip:
+                n -= chunk_end - chunk_start
+            elif chunk_ot_action == OTTypeAction.insert:
+                appender.append_view(chunk_view)
+            elif chunk_ot_action == OTTypeAction.delete:
+                n -= chunk_end - chunk_start
+
+    return 0
+
+
+cdef int _compose_step(_Taker taker, _Appender appender, tuple ot) except -1:
+    """Compose the taken ots with one OT of the second ots"""
+    cdef:
         OTTypeAction ot_action
         object ot_arg
         str ot_arg_as_str
 
-        int n
-        int offset
+        Py_ssize_t n
+        Py_ssize_t offset
 
-        tuple chunk_ot
+        tuple chunk_view
         OTTypeAction chunk_ot_action
-        object chunk_ot_arg
-        int chunk_ot_arg_as_int
-        str chunk_ot_arg_as_str
+        str chunk_source
+        Py_ssize_t chunk_start, chunk_end, chunk_len
+        bint is_consistent
+
+    ot_action, ot_arg = ot
+
+    if ot_action == OTTypeAction.skip:
+        n = <Py_ssize_t>ot_arg
+
+        while 0 < n:
+            chunk_view = taker.take_view(n, "d")
+            appender.append_view(chunk_view)
+
+            chunk_ot_action, _, chunk_start, chunk_end = chunk_view
+
+            if chunk_ot_action == OTTypeAction.skip:
+                n -= chunk_end - chunk_start
+            elif chunk_ot_action == OTTypeAction.insert:
+                n -= chunk_end - chunk_start
+            elif chunk_ot_action == OTTypeAction.delete:
+                pass
+
+    elif ot_action == OTTypeAction.insert:
+        ot_arg_as_str = <str>ot_arg
+
+        appender.append_view(
+            (OTTypeAction.insert, ot_arg_as_str, 0, len(ot_arg_as_str))
+        )
+
+    elif ot_action == OTTypeAction.delete:
+        ot_arg_as_str = <str>ot_arg
+
+        offset = 0
+        n = len(ot_arg_as_str)
+
+        while 0 < n:
+            chunk_view = taker.take_view(n, "d")
+            chunk_ot_action, chunk_source, chunk_start, chunk_end = chunk_view
+            chunk_len = chunk_end - chunk_start
+
+            if chunk_ot_action == OTTypeAction.skip:
+                appender.append_view(
+                    (OTTypeAction.delete, ot_arg_as_str, offset, offset + chunk_len)
+                )
+                offset += chunk_len
+                n -= chunk_len
+
+            elif chunk_ot_action == OTTypeAction.insert:
+                if chunk_start == 0 and chunk_end == len(chunk_source):
+                    is_consistent = ot_arg_as_str.startswith(chunk_source, offset)
+                else:
+                    is_consistent = ot_arg_as_str.startswith(
+                        chunk_source[chunk_start:chunk_end], offset
+                    )
+
+                if not is_consistent:
+                    raise ValueError(
+                        "inconsistent delete in the seconds OTs (doc, OT.arg)",
+                        chunk_source[chunk_start:chunk_end],
+                        ot_arg_as_str[offset:offset + chunk_len],
+                    )
+                offset += chunk_len
+                n -= chunk_len
+
+            elif chunk_ot_action == OTTypeAction.delete:
+                appender.append_view(chunk_view)
+
+    return 0
+
+
+cdef int _take_rest(_Taker taker, _Appender appender) except -1:
+    """Append the rest of the taken ots and flush the appender"""
+    cdef:
+        tuple chunk_view
+
+    while True:
+        chunk_view = taker.take_view(-1)
+        if chunk_view is None:
+            break
+        appender.append_view(chunk_view)
+
+    appender.flush()
+
+    return 0
+
+
+def compose(object ot_raw_list_1 not None, object ot_raw_list_2 not None):
+    cdef:
+        list new_ots
+        _Appender appender
+        _Taker taker
 
     if not isinstance(ot_raw_list_1, (list, tuple)):
         raise TypeError("`ot_raw_list_1` must be a list or tuple")
@@ -482,72 +893,535 @@ def compose(object ot_raw_list_1 not None, object ot_raw_list_2 not None):
     taker = _Taker(ot_raw_list_1)
 
     for ot_raw in ot_raw_list_2:
-        ot_action, ot_arg = ot = _resolve_ot(ot_raw)
+        _compose_step(taker, appender, _resolve_ot(ot_raw))
 
-        if ot_action == OTTypeAction.skip:
-            n = <int>ot_arg
+    _take_rest(taker, appender)
+    _trim(new_ots)
 
-            while 0 < n:
-                chunk_ot = taker.take(n, "d")
-                appender.append(chunk_ot)
+    return _to_ot_raw_list(new_ots)
 
-                chunk_ot_action, chunk_ot_arg = chunk_ot
 
-                if chunk_ot_action == OTTypeAction.skip:
-                    n -= <int>chunk_ot_arg
-                elif chunk_ot_action == OTTypeAction.insert:
-                    n -= len(<str>chunk_ot_arg)
-                elif chunk_ot_action == OTTypeAction.delete:
-                    pass
+def _iter_checked(object ot_raw_iter):
+    """Resolve ots one by one, raising `ValueError` when they turn out invalid"""
+    cdef:
+        OTTypeAction last_ot_action
+        tuple ot
 
-        elif ot_action == OTTypeAction.insert:
-            appender.append(ot)
+    last_ot_action = OTTypeAction.nop
+    for ot_raw in ot_raw_iter:
+        try:
+            ot = _resolve_ot(ot_raw)
+        except (ValueError, TypeError):
+            raise ValueError("invalid OTs") from None
 
-        elif ot_action == OTTypeAction.delete:
-            ot_arg_as_str = <str>ot_arg
+        if last_ot_action == <OTTypeAction>ot[0]:
+            raise ValueError("invalid OTs")
 
-            offset = 0
-            n = len(ot_arg)
+        last_ot_action = <OTTypeAction>ot[0]
+        yield ot
 
-            while 0 < n:
-                chunk_ot = taker.take(n, "d")
-                chunk_ot_action, chunk_ot_arg = chunk_ot
+    if last_ot_action == OTTypeAction.skip:
+        raise ValueError("invalid OTs")
 
-                if chunk_ot_action == OTTypeAction.skip:
-                    chunk_ot_arg_as_int = <int>chunk_ot_arg
 
-                    appender.append(
-                        (
-                            OTTypeAction.delete,
-                            ot_arg_as_str[offset:offset + chunk_ot_arg_as_int],
-                        )
-                    )
-                    offset += chunk_ot_arg_as_int
-                    n -= chunk_ot_arg_as_int
-
-                elif chunk_ot_action == OTTypeAction.insert:
-                    chunk_ot_arg_as_str = <str>chunk_ot_arg
-
-                    if chunk_ot_arg_as_str != ot_arg_as_str[
-                        offset:offset + len(chunk_ot_arg_as_str)
-                    ]:
-                        raise ValueError(
-                            "inconsistent delete in the seconds OTs (doc, OT.arg)",
-                            chunk_ot_arg_as_str,
-                            ot_arg_as_str[offset:offset + len(chunk_ot_arg_as_str)],
-                        )
-                    offset += len(chunk_ot_arg_as_str)
-                    n -= len(chunk_ot_arg_as_str)
-
-                elif chunk_ot_action == OTTypeAction.delete:
-                    appender.append(chunk_ot)
+cdef object _iter_ots(object ot_raw_iter, str name):
+    if isinstance(ot_raw_iter, (str, dict)) or not hasattr(ot_raw_iter, "__iter__"):
+        raise TypeError(f"`{name}` must be an iterable of OTs")
+
+    return _iter_checked(ot_raw_iter)
+
+
+def _iter_steps(object ot_iter_1, object ot_iter_2, bint is_compose, bint is_left):
+    """Run the step for each OT of `ot_iter_2` and yield finished OTs
+
+    Only the last OT of the appender can be extended by later steps, so the
+    others are yielded and dropped after each step.
+    """
+    cdef:
+        list new_ots
+        _Appender appender
+        _Taker taker
+        tuple chunk_view
+
+    new_ots = []
+    appender = _Appender(new_ots)
+    taker = _Taker(ot_iter_1)
+
+    for ot in ot_iter_2:
+        if is_compose:
+            _compose_step(taker, appender, <tuple>ot)
+        else:
+            _transform_step(taker, appender, <tuple>ot, is_left)
+
+        if len(new_ots) > 1:
+            yield from _to_ot_raw_list(new_ots[:-1])
+            del new_ots[:-1]
 
     while True:
-        chunk_ot = taker.take(-1)
-        if chunk_ot is None:
+        chunk_view = taker.take_view(-1)
+        if chunk_view is None:
             break
-        appender.append(chunk_ot)
+        appender.append_view(chunk_view)
 
+        if len(new_ots) > 1:
+            yield from _to_ot_raw_list(new_ots[:-1])
+            del new_ots[:-1]
+
+    appender.flush()
     _trim(new_ots)
 
-    return _to_ot_raw_list(new_ots)
+    yield from _to_ot_raw_list(new_ots)
+
+
+def iter_transform(
+    object ot_raw_iter_1 not None,
+    object ot_raw_iter_2 not None,
+    str side not None,
+):
+    ot_iter_1 = _iter_ots(ot_raw_iter_1, "ot_raw_iter_1")
+    ot_iter_2 = _iter_ots(ot_raw_iter_2, "ot_raw_iter_2")
+
+    if side not in ["left", "right"]:
+        raise ValueError("invalid side")
+
+    return _iter_steps(ot_iter_1, ot_iter_2, False, side == "left")
+
+
+def iter_compose(object ot_raw_iter_1 not None, object ot_raw_iter_2 not None):
+    ot_iter_1 = _iter_ots(ot_raw_iter_1, "ot_raw_iter_1")
+    ot_iter_2 = _iter_ots(ot_raw_iter_2, "ot_raw_iter_2")
+
+    return _iter_steps(ot_iter_1, ot_iter_2, True, False)
+
+
+def merge_histories(
+    object local_ot_raw_lists not None,
+    object remote_ot_raw_lists not None,
+    str side not None,
+):
+    cdef:
+        bint is_left
+        list row
+        list next_row
+        list rebased_local
+        list ots
+        object local
+        object remote
+        Py_ssize_t i, j
+
+    if not isinstance(local_ot_raw_lists, (list, tuple)):
+        raise TypeError("`local_ot_raw_lists` must be a list or tuple")
+
+    if not isinstance(remote_ot_raw_lists, (list, tuple)):
+        raise TypeError("`remote_ot_raw_lists` must be a list or tuple")
+
+    if side not in ["left", "right"]:
+        raise ValueError("invalid side")
+
+    for ot_raw_list in [*local_ot_raw_lists, *remote_ot_raw_lists]:
+        if not isinstance(ot_raw_list, (list, tuple)):
+            raise TypeError("`ot_raw_list` must be a list or tuple")
+
+        if not check(ot_raw_list):
+            raise ValueError("invalid OTs")
+
+    is_left = side == "left"
+
+    # the remote history transformed by the local ots so far
+    row = list(remote_ot_raw_lists)
+
+    rebased_local = []
+    for local in local_ot_raw_lists:
+        for j in range(len(row)):
+            remote = row[j]
+            row[j] = _transform(remote, local, not is_left)
+            local = _transform(local, remote, is_left)
+
+        ots = [_resolve_ot(ot_raw) for ot_raw in local]
+        rebased_local.append(_to_ot_raw_list(ots))
+
+    if not row:
+        return rebased_local, []
+
+    while len(row) > 1:
+        next_row = []
+        for i in range(0, len(row) - 1, 2):
+            next_row.append(compose(row[i], row[i + 1]))
+        if len(row) % 2 == 1:
+            next_row.append(row[-1])
+        row = next_row
+
+    return rebased_local, compose(row[0], [])
+
+
+cdef inline bint _is_digit(Py_UCS4 ch):
+    return u"0" <= ch <= u"9"
+
+
+@cython.final
+cdef class _OpsReader:
+    """Parser of a JSON array of ots, reading characters of `s` directly"""
+
+    cdef:
+        str s
+        Py_ssize_t length
+        int kind
+        void *data
+        Py_ssize_t end  # end of the last scanned token
+
+    def __init__(self, str s):
+        self.s = s
+        self.length = len(s)
+        self.kind = PyUnicode_KIND(s)
+        self.data = PyUnicode_DATA(s)
+
+    cdef inline Py_UCS4 char_at(self, Py_ssize_t pos):
+        """Return the character at `pos`, or 0 at the end of `s`"""
+        if pos < self.length:
+            return PyUnicode_READ(self.kind, self.data, pos)
+        return 0
+
+    cdef inline Py_ssize_t skip_ws(self, Py_ssize_t pos):
+        cdef Py_UCS4 ch
+
+        while True:
+            ch = self.char_at(pos)
+            if ch != u" " and ch != u"\t" and ch != u"\n" and ch != u"\r":
+                return pos
+            pos += 1
+
+    cdef Py_ssize_t expect(self, Py_ssize_t pos, Py_UCS4 ch) except -1:
+        if pos >= self.length or self.char_at(pos) != ch:
+            raise JSONDecodeError(f"Expecting '{ch}'", self.s, pos)
+        return self.skip_ws(pos + 1)
+
+    cdef long scan_hex(self, Py_ssize_t pos) except -1:
+        """Decode 4 hex digits of `\\uXXXX` at `pos` (the position of `u`)
+
+        Like `json.decoder.scanstring`, the escape must not end the input.
+        """
+        cdef:
+            Py_ssize_t i
+            Py_UCS4 ch
+            long value = 0
+
+        if pos + 5 >= self.length:
+            raise JSONDecodeError("Invalid \\uXXXX escape", self.s, pos)
+
+        for i in range(pos + 1, pos + 5):
+            ch = self.char_at(i)
+            if _is_digit(ch):
+                value = (value << 4) | (<long>ch - 48)
+            elif u"a" <= ch <= u"f":
+                value = (value << 4) | (<long>ch - 87)
+            elif u"A" <= ch <= u"F":
+                value = (value << 4) | (<long>ch - 55)
+            else:
+                raise JSONDecodeError("Invalid \\uXXXX escape", self.s, pos)
+
+        return value
+
+    cdef inline Py_ssize_t scan_plain(self, Py_ssize_t pos):
+        """Return the end of characters from `pos` not to be unescaped"""
+        cdef:
+            Py_UCS1 *data1
+            Py_UCS4 ch
+
+        if self.kind == PyUnicode_1BYTE_KIND:
+            data1 = <Py_UCS1 *>self.data
+            while pos < self.length:
+                ch = data1[pos]
+                if ch < 0x20 or ch == u'"' or ch == u"\\":
+                    break
+                pos += 1
+            return pos
+
+        while pos < self.length:
+            ch = PyUnicode_READ(self.kind, self.data, pos)
+            if ch < 0x20 or ch == u'"' or ch == u"\\":
+                break
+            pos += 1
+        return pos
+
+    cdef str scan_string(self, Py_ssize_t pos):
+        """Return the string starting after the quote at `pos - 1`"""
+        cdef:
+            Py_ssize_t begin = pos - 1
+            Py_ssize_t start = pos
+            list parts = None
+            Py_UCS4 ch
+            long code
+            long code2
+
+        while True:
+            pos = self.scan_plain(pos)
+            ch = self.char_at(pos)
+            if pos >= self.length:
+                raise JSONDecodeError("Unterminated string starting at", self.s, begin)
+            elif ch == u'"':
+                break
+            elif ch < 0x20:
+                raise JSONDecodeError("Invalid control character at", self.s, pos)
+
+            if parts is None:
+                parts = []
+            if start < pos:
+                parts.append(self.s[start:pos])
+
+            if pos + 1 >= self.length:
+                raise JSONDecodeError("Unterminated string starting at", self.s, begin)
+
+            ch = self.char_at(pos + 1)
+            if ch == u"u":
+                code = self.scan_hex(pos + 1)
+                pos += 6
+                if (
+                    0xD800 <= code <= 0xDBFF
+                    and pos + 6 < self.length
+                    and self.char_at(pos) == u"\\"
+                    and self.char_at(pos + 1) == u"u"
+                ):
+                    code2 = self.scan_hex(pos + 1)
+                    if 0xDC00 <= code2 <= 0xDFFF:
+                        code = 0x10000 + ((code - 0xD800) << 10) + (code2 - 0xDC00)
+                        pos += 6
+                parts.append(chr(code))
+            else:
+                if ch == u'"' or ch == u"\\" or ch == u"/":
+                    parts.append(chr(ch))
+                elif ch == u"b":
+                    parts.append("\b")
+                elif ch == u"f":
+                    parts.append("\f")
+                elif ch == u"n":
+                    parts.append("\n")
+                elif ch == u"r":
+                    parts.append("\r")
+                elif ch == u"t":
+                    parts.append("\t")
+                else:
+                    raise JSONDecodeError("Invalid \\escape", self.s, pos)
+                pos += 2
+
+            start = pos
+
+        self.end = pos + 1
+
+        if parts is None:
+            return self.s[start:pos]
+
+        if start < pos:
+            parts.append(self.s[start:pos])
+        return "".join(parts)
+
+    cdef Py_ssize_t scan_skip(self, Py_ssize_t pos) except -1:
+        """Return the skip of the number at `pos`, or 0 if it is invalid"""
+        cdef:
+            Py_ssize_t n = 0
+            Py_ssize_t digit
+            Py_UCS4 ch = self.char_at(pos)
+
+        if ch == u"-":
+            if _is_digit(self.char_at(pos + 1)):
+                return 0
+            raise JSONDecodeError("unexpected OT structure", self.s, pos)
+
+        if ch == u"0":
+            return 0
+
+        while _is_digit(ch):
+            digit = <Py_ssize_t>ch - 48
+            if n > (PY_SSIZE_T_MAX - digit) // 10:
+                return 0
+            n = n * 10 + digit
+            pos += 1
+            ch = self.char_at(pos)
+
+        # a fraction or an exponent makes the number invalid as a skip
+        if ch == u"." and _is_digit(self.char_at(pos + 1)):
+            return 0
+        if ch == u"e" or ch == u"E":
+            ch = self.char_at(pos + 1)
+            if _is_digit(ch):
+                return 0
+            if (ch == u"+" or ch == u"-") and _is_digit(self.char_at(pos + 2)):
+                return 0
+
+        self.end = pos
+        return n
+
+    cdef list read(self, bint check_unoptimized):
+        cdef:
+            list ots = []
+            Py_ssize_t pos
+            Py_ssize_t ot_pos = 0
+            Py_UCS4 ch
+
+            OTTypeAction last_ot_action = OTTypeAction.nop
+            OTTypeAction ot_action
+            object ot_arg
+            Py_ssize_t n
+            str key
+
+        pos = self.expect(self.skip_ws(0), u"[")
+        if self.char_at(pos) == u"]":
+            pos += 1
+        else:
+            while True:
+                ot_pos = pos
+                ch = self.char_at(pos)
+
+                if ch == u'"':
+                    ot_arg = self.scan_string(pos + 1)
+                    pos = self.end
+                    if <str>ot_arg == "":
+                        raise JSONDecodeError("invalid OT-Insert", self.s, ot_pos)
+                    ot_action = OTTypeAction.insert
+
+                elif ch == u"{":
+                    pos = self.skip_ws(pos + 1)
+                    if self.char_at(pos) != u'"':
+                        raise JSONDecodeError("invalid OT-Delete", self.s, ot_pos)
+                    key = self.scan_string(pos + 1)
+                    pos = self.end
+                    if key != "d":
+                        raise JSONDecodeError("invalid OT-Delete", self.s, ot_pos)
+                    pos = self.expect(self.skip_ws(pos), u":")
+                    if self.char_at(pos) != u'"':
+                        raise JSONDecodeError("invalid OT-Delete", self.s, ot_pos)
+                    ot_arg = self.scan_string(pos + 1)
+                    pos = self.end
+                    if <str>ot_arg == "":
+                        raise JSONDecodeError("invalid OT-Delete", self.s, ot_pos)
+                    pos = self.skip_ws(pos)
+                    if self.char_at(pos) != u"}":
+                        raise JSONDecodeError("invalid OT-Delete", self.s, ot_pos)
+                    pos += 1
+                    ot_action = OTTypeAction.delete
+
+                elif ch == u"-" or _is_digit(ch):
+                    n = self.scan_skip(pos)
+                    pos = self.end
+                    if n == 0:
+                        raise JSONDecodeError("invalid OT-Skip", self.s, ot_pos)
+                    ot_arg = n
+                    ot_action = OTTypeAction.skip
+
+                else:
+                    raise JSONDecodeError("unexpected OT structure", self.s, ot_pos)
+
+                if check_unoptimized and last_ot_action == ot_action:
+                    raise JSONDecodeError("unoptimized OTs", self.s, ot_pos)
+                last_ot_action = ot_action
+                ots.append((ot_action, ot_arg))
+
+                pos = self.skip_ws(pos)
+                if self.char_at(pos) == u"]":
+                    pos += 1
+                    break
+                pos = self.expect(pos, u",")
+
+        pos = self.skip_ws(pos)
+        if pos != self.length:
+            raise JSONDecodeError("Extra data", self.s, pos)
+
+        if check_unoptimized and last_ot_action == OTTypeAction.skip:
+            raise JSONDecodeError("unoptimized OTs", self.s, ot_pos)
+
+        return ots
+
+
+def loads_ops(object data not None, *, bint check_unoptimized = True):
+    cdef str s
+
+    if isinstance(data, (bytes, bytearray)):
+        s = data.decode("utf-8")
+    elif isinstance(data, str):
+        s = data
+    else:
+        raise TypeError("`data` must be string or bytes")
+
+    return _OpsReader(s).read(check_unoptimized)
+
+
+cdef void _dump_json_string(list parts, str s):
+    cdef:
+        Py_ssize_t start = 0
+        Py_ssize_t i
+        Py_UCS4 ch
+
+    parts.append('"')
+    for i in range(len(s)):
+        ch = s[i]
+        if ch >= 0x20 and ch != u'"' and ch != u"\\":
+            continue
+
+        if start < i:
+            parts.append(s[start:i])
+        start = i + 1
+
+        if ch == u'"':
+            parts.append('\\"')
+        elif ch == u"\\":
+            parts.append("\\\\")
+        elif ch == u"\b":
+            parts.append("\\b")
+        elif ch == u"\f":
+            parts.append("\\f")
+        elif ch == u"\n":
+            parts.append("\\n")
+        elif ch == u"\r":
+            parts.append("\\r")
+        elif ch == u"\t":
+            parts.append("\\t")
+        else:
+            parts.append(f"\\u{<int>ch:04x}")
+
+    if start == 0:
+        parts.append(s)
+    elif start < len(s):
+        parts.append(s[start:])
+    parts.append('"')
+
+
+def dumps_ops(object ot_raw_list not None, *, bint check_unoptimized = True):
+    cdef:
+        list parts
+        OTTypeAction last_ot_action
+        OTTypeAction ot_action
+        object ot_arg
+
+    if not isinstance(ot_raw_list, (list, tuple)):
+        raise TypeError("`ot_raw_list` must be a list or tuple")
+
+    parts = ["["]
+    last_ot_action = OTTypeAction.nop
+
+    for ot_raw in ot_raw_list:
+        try:
+            ot_action, ot_arg = _resolve_ot(ot_raw)
+        except (ValueError, TypeError):
+            raise ValueError("invalid OTs")
+
+        if check_unoptimized and last_ot_action == ot_action:
+            raise ValueError("invalid OTs")
+
+        if last_ot_action != OTTypeAction.nop:
+            parts.append(",")
+        last_ot_action = ot_action
+
+        if ot_action == OTTypeAction.skip:
+            parts.append(str(ot_arg))
+        elif ot_action == OTTypeAction.insert:
+            _dump_json_string(parts, <str>ot_arg)
+        elif ot_action == OTTypeAction.delete:
+            parts.append('{"d":')
+            _dump_json_string(parts, <str>ot_arg)
+            parts.append("}")
+
+    if check_unoptimized and last_ot_action == OTTypeAction.skip:
+        raise ValueError("invalid OTs")
+
+    parts.append("]")
+
+    return "".join(parts)
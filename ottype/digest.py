@@ -0,0 +1,273 @@
+"""Digest of a doc maintained by ots
+
+The digest is a polynomial hash of the code points (plus 1, so that NUL
+characters count) of a doc, so it depends only on the content of the doc and
+can be compared across replicas which have applied the same ots.
+"""
+
+from __future__ import annotations
+
+import random
+from typing import TYPE_CHECKING, Final, Optional
+
+from . import NO_EXTENSIONS, check
+from .core import (
+    _OTRawInputSeq,
+    _OTTypeActionDelete,
+    _OTTypeActionInsert,
+    _OTTypeActionSkip,
+    _resolve_ot,
+)
+
+# modulus of `_poly_hash`, a prime under 2**47 where 2**32 has a large order,
+# and its base (`core_boost` has the same in C)
+_POLY_HASH_MOD: Final = 2**47 - 115
+_POLY_HASH_BASE: Final = 2**32
+
+# inverse of `base - 1`, to hash a run of ones as `(base**n - 1) / (base - 1)`
+_POLY_HASH_ONES: Final = pow(_POLY_HASH_BASE - 1, -1, _POLY_HASH_MOD)
+
+
+def _poly_hash_py(text: str) -> int:
+    """Polynomial hash of code points plus 1 of text with base 2**32
+
+    A NUL character counts as 1, so that texts differing only by leading NUL
+    characters have different hashes. The hash of a concatenation is
+    `(_poly_hash(a) * _power(len(b)) + _poly_hash(b)) % _POLY_HASH_MOD`.
+    """
+    encoded = text.encode("utf-32-be", "surrogatepass")
+    ones = (_power(len(text)) - 1) * _POLY_HASH_ONES
+    return (int.from_bytes(encoded, "big") + ones) % _POLY_HASH_MOD
+
+
+_poly_hash = _poly_hash_py
+
+try:
+    if not TYPE_CHECKING and not NO_EXTENSIONS:
+        from .core_boost import _poly_hash as _poly_hash_c
+
+        _poly_hash = _poly_hash_c
+
+except ImportError:
+    pass
+
+# An immutable treap of chunks of a doc ordered by position. A node is
+# (priority, chunk, hash of chunk, power of chunk, left, right,
+#  total length, hash, power) where the power of a text is
+# `pow(_POLY_HASH_BASE, len(text), _POLY_HASH_MOD)`, which combines hashes as
+# `hash(a + b) == hash(a) * power(b) + hash(b)`.
+_Node = tuple[float, str, int, int, "_Tree", "_Tree", int, int, int]
+_Tree = Optional[_Node]
+
+
+def _power(length: int) -> int:
+    return pow(_POLY_HASH_BASE, length, _POLY_HASH_MOD)
+
+
+def _make(
+    priority: float,
+    chunk: str,
+    chunk_hash: int,
+    chunk_power: int,
+    left: _Tree,
+    right: _Tree,
+) -> _Node:
+    length = len(chunk)
+    h = chunk_hash
+    power = chunk_power
+    if left is not None:
+        length += left[6]
+        h = (left[7] * chunk_power + h) % _POLY_HASH_MOD
+        power = left[8] * power % _POLY_HASH_MOD
+    if right is not None:
+        length += right[6]
+        h = (h * right[8] + right[7]) % _POLY_HASH_MOD
+        power = power * right[8] % _POLY_HASH_MOD
+    return (priority, chunk, chunk_hash, chunk_power, left, right, length, h, power)
+
+
+def _replace_children(node: _Node, left: _Tree, right: _Tree) -> _Node:
+    return _make(node[0], node[1], node[2], node[3], left, right)
+
+
+def _make_leaf(priority: float, chunk: str, left: _Tree, right: _Tree) -> _Node:
+    return _make(priority, chunk, _poly_hash(chunk), _power(len(chunk)), left, right)
+
+
+def _merge(left: _Tree, right: _Tree) -> _Tree:
+    if left is None:
+        return right
+    if right is None:
+        return left
+
+    if left[0] > right[0]:
+        return _replace_children(left, left[4], _merge(left[5], right))
+    return _replace_children(right, _merge(left, right[4]), right[5])
+
+
+def _split(tree: _Tree, offset: int) -> tuple[_Tree, _Tree]:
+    """Split the first `offset` characters of tree from the rest"""
+    if tree is None:
+        return None, None
+
+    left_length = tree[4][6] if tree[4] is not None else 0
+    chunk_length = len(tree[1])
+
+    if offset <= left_length:
+        left, right = _split(tree[4], offset)
+        return left, _replace_children(tree, right, tree[5])
+
+    if offset >= left_length + chunk_length:
+        left, right = _split(tree[5], offset - left_length - chunk_length)
+        return _replace_children(tree, tree[4], left), right
+
+    # split the chunk itself
+    k = offset - left_length
+    return (
+        _make_leaf(tree[0], tree[1][:k], tree[4], None),
+        _make_leaf(tree[0], tree[1][k:], None, tree[5]),
+    )
+
+
+def _build(chunks: list[str], lo: int, hi: int) -> _Tree:
+    """Build a balanced tree of `chunks[lo:hi]`"""
+    if lo == hi:
+        return None
+
+    mid = (lo + hi) // 2
+    left = _build(chunks, lo, mid)
+    right = _build(chunks, mid + 1, hi)
+
+    # keep the heap order of priorities over the balanced shape
+    priority = random.random()
+    if left is not None:
+        priority += left[0]
+    if right is not None:
+        priority = max(priority, right[0] + random.random())
+
+    return _make_leaf(priority, chunks[mid], left, right)
+
+
+def _first_chunk(tree: _Node) -> str:
+    while tree[4] is not None:
+        tree = tree[4]
+    return tree[1]
+
+
+def _last_chunk(tree: _Node) -> str:
+    while tree[5] is not None:
+        tree = tree[5]
+    return tree[1]
+
+
+def doc_digest(doc: str) -> int:
+    """Return the digest of doc, same as `DocDigest(doc).digest`"""
+    if not isinstance(doc, str):
+        raise TypeError("`doc` must be string")
+
+    return _poly_hash(doc)
+
+
+class DocDigest:
+    """Digest of a doc updated by ots
+
+    The doc is kept as a balanced tree of chunks of about `chunk_size`
+    characters with the hash of each subtree, so `apply` rehashes only the
+    inserted and deleted text and the chunks around them, and updates the
+    digest in `O(log chunks)` for each OT.
+    """
+
+    def __init__(self, doc: str = "", *, chunk_size: int = 1024) -> None:
+        if not isinstance(doc, str):
+            raise TypeError("`doc` must be string")
+
+        if chunk_size <= 0:
+            raise ValueError("invalid chunk_size")
+
+        self.chunk_size = chunk_size
+        self._root = self._build(doc)
+
+    def _build(self, text: str) -> _Tree:
+        chunks = [
+            text[i : i + self.chunk_size] for i in range(0, len(text), self.chunk_size)
+        ]
+        return _build(chunks, 0, len(chunks))
+
+    def __len__(self) -> int:
+        """Length of the doc"""
+        return self._root[6] if self._root is not None else 0
+
+    @property
+    def digest(self) -> int:
+        return self._root[7] if self._root is not None else 0
+
+    def _splice(self, tree: _Tree, start: int, deleted: str, inserted: str) -> _Tree:
+        """Replace `deleted` at `start` of tree with `inserted`"""
+        left, rest = _split(tree, start)
+        middle, right = _split(rest, len(deleted))
+
+        if deleted:
+            assert middle is not None
+            if middle[6] != len(deleted) or middle[7] != _poly_hash(deleted):
+                raise ValueError("inconsistent delete (doc, OT.arg)")
+
+        # absorb small chunks at the edges to avoid fragmentation
+        texts = [inserted]
+        if left is not None:
+            chunk = _last_chunk(left)
+            if len(chunk) < self.chunk_size // 2:
+                left, _ = _split(left, left[6] - len(chunk))
+                texts.insert(0, chunk)
+        if right is not None:
+            chunk = _first_chunk(right)
+            if len(chunk) < self.chunk_size // 2:
+                _, right = _split(right, len(chunk))
+                texts.append(chunk)
+
+        return _merge(_merge(left, self._build("".join(texts))), right)
+
+    def apply(
+        self, ot_raw_list: _OTRawInputSeq, *, check_unoptimized: bool = True
+    ) -> None:
+        """Update the digest by ots applied to the doc
+
+        If ots do not fit the doc, `ValueError` is raised and the digest is
+        not changed.
+        """
+
+        if not isinstance(ot_raw_list, (list, tuple)):
+            raise TypeError("`ot_raw_list` must be a list or tuple")
+
+        if not check(ot_raw_list, check_unoptimized=check_unoptimized):
+            raise ValueError("invalid OTs")
+
+        old_root = self._root
+        pos = 0
+
+        try:
+            for ot_raw in ot_raw_list:
+                ot_action, ot_arg = _resolve_ot(ot_raw)
+
+                if ot_action == _OTTypeActionSkip:
+                    assert isinstance(ot_arg, int)
+
+                    if ot_arg > len(self) - pos:
+                        raise ValueError("skip exceeds doc length")
+                    pos += ot_arg
+
+                elif ot_action == _OTTypeActionInsert:
+                    assert isinstance(ot_arg, str)
+
+                    self._root = self._splice(self._root, pos, "", ot_arg)
+                    pos += len(ot_arg)
+
+                elif ot_action == _OTTypeActionDelete:
+                    assert isinstance(ot_arg, str)
+
+                    if len(ot_arg) > len(self) - pos:
+                        raise ValueError("delete exceeds doc length")
+                    self._root = self._splice(self._root, pos, ot_arg, "")
+
+        except BaseException:
+            self._root = old_root
+            raise
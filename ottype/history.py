@@ -0,0 +1,467 @@
+from __future__ import annotations
+
+import json
+import sys
+from array import array
+from bisect import bisect_right
+from typing import Iterator, NamedTuple, Optional, Sequence, Union
+
+from . import apply, check, compose
+from .core import (
+    _OTRawInputSeq,
+    _OTRawOutputSeq,
+    _OTTypeActionDelete,
+    _OTTypeActionSkip,
+    _resolve_ot,
+)
+
+# (action, arg) of an OT as read from `PackedLog`
+_OTTuple = tuple[int, Union[int, str]]
+
+# texts of `PackedLog` are appended to the last page until it has this many
+# characters, which also bounds the cost of a wide character in a page
+_PAGE_CHARS = 4096
+
+# texts of `PackedLog` are joined into the pages when this many of them or
+# `_PAGE_CHARS` characters are appended, so few separate `str` objects remain
+_TAIL_TEXTS = 256
+
+
+class Compaction(NamedTuple):
+    """Result of `compact`
+
+    `entries` covers the whole log in order. Each entry is
+    `(start_revision, end_revision, ots)` where `ots` changes the doc at
+    `start_revision` to the doc at `end_revision`.
+    """
+
+    entries: list[tuple[int, int, _OTRawOutputSeq]]
+    watermark: int
+    snapshot: Optional[str]
+    bytes_before: int
+    bytes_after: int
+
+    @property
+    def bytes_reclaimed(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+
+def _ots_size(ot_raw_list: _OTRawInputSeq) -> int:
+    """Size of ots in bytes when encoded as compact JSON"""
+    return len(
+        json.dumps(ot_raw_list, ensure_ascii=False, separators=(",", ":")).encode()
+    )
+
+
+def compose_all(ot_raw_lists: Sequence[_OTRawInputSeq]) -> _OTRawOutputSeq:
+    """Compose a sequence of ots into one
+
+    Ots are composed pairwise as a balanced tree, so each component is
+    composed `O(log n)` times instead of `O(n)` times with a left fold.
+    """
+
+    if not isinstance(ot_raw_lists, (list, tuple)):
+        raise TypeError("`ot_raw_lists` must be a list or tuple")
+
+    if not ot_raw_lists:
+        return []
+
+    level = list(ot_raw_lists)
+    while len(level) > 1:
+        next_level = [
+            compose(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)
+        ]
+        if len(level) % 2 == 1:
+            next_level.append(level[-1])
+        level = next_level
+
+    return compose(level[0], [])
+
+
+def compact(
+    ot_raw_lists: Sequence[_OTRawInputSeq],
+    watermark: int,
+    *,
+    keep_every: int = 0,
+    keep_last: int = 0,
+    base_revision: int = 0,
+    doc: Optional[str] = None,
+) -> Compaction:
+    """Compact a revision log
+
+    `ot_raw_lists[i]` changes the doc at revision `base_revision + i` to the
+    next revision. Ots older than `watermark` are composed into snapshots,
+    except that
+
+    - if `keep_every` is positive, revisions which are multiples of it are kept
+      as checkpoints and only the ots between two checkpoints are composed.
+    - the last `keep_last` ots are always kept as is.
+
+    If `doc` (the doc at `base_revision`) is given, the doc at the effective
+    watermark is returned as `snapshot`.
+    """
+
+    if not isinstance(ot_raw_lists, (list, tuple)):
+        raise TypeError("`ot_raw_lists` must be a list or tuple")
+
+    if keep_every < 0:
+        raise ValueError("invalid keep_every")
+
+    if keep_last < 0:
+        raise ValueError("invalid keep_last")
+
+    end_revision = base_revision + len(ot_raw_lists)
+    watermark = max(base_revision, min(watermark, end_revision - keep_last))
+
+    entries: list[tuple[int, int, _OTRawOutputSeq]] = []
+
+    start = base_revision
+    while start < watermark:
+        if keep_every > 0:
+            end = min(watermark, (start // keep_every + 1) * keep_every)
+        else:
+            end = watermark
+
+        entries.append(
+            (
+                start,
+                end,
+                compose_all(ot_raw_lists[start - base_revision : end - base_revision]),
+            )
+        )
+        start = end
+
+    for revision in range(watermark, end_revision):
+        entries.append(
+            (revision, revision + 1, list(ot_raw_lists[revision - base_revision]))
+        )
+
+    snapshot = None
+    if doc is not None:
+        snapshot = apply(
+            doc,
+            compose_all(
+                [ot_raw_list for start, _, ot_raw_list in entries if start < watermark]
+            ),
+        )
+
+    return Compaction(
+        entries=entries,
+        watermark=watermark,
+        snapshot=snapshot,
+        bytes_before=sum(_ots_size(ot_raw_list) for ot_raw_list in ot_raw_lists),
+        bytes_after=sum(_ots_size(ot_raw_list) for _, _, ot_raw_list in entries),
+    )
+
+
+class DeltaIndex:
+    """Ots of a revision log with pre-composed power-of-two ranges
+
+    Level `k` holds the ots composed over revisions
+    `[base_revision + i * 2**k, base_revision + (i + 1) * 2**k)` for each `i`,
+    built as ots are appended, so the delta between any two revisions needs
+    only `O(log n)` compositions.
+
+    If `max_bytes` is given, the upper levels are dropped first (and not built
+    anymore) while the composed levels take more than `max_bytes` as compact
+    JSON. The ots as appended (level 0) are always kept.
+    """
+
+    def __init__(
+        self,
+        ot_raw_lists: Sequence[_OTRawInputSeq] = (),
+        *,
+        base_revision: int = 0,
+        max_bytes: Optional[int] = None,
+    ) -> None:
+        if not isinstance(ot_raw_lists, (list, tuple)):
+            raise TypeError("`ot_raw_lists` must be a list or tuple")
+
+        if max_bytes is not None and max_bytes < 0:
+            raise ValueError("invalid max_bytes")
+
+        self.base_revision = base_revision
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+
+        self._levels: list[list[_OTRawInputSeq]] = [[]]
+        self._level_bytes: list[int] = [0]
+        self._max_level: Optional[int] = None
+
+        for ot_raw_list in ot_raw_lists:
+            self.append(ot_raw_list)
+
+    def __len__(self) -> int:
+        return len(self._levels[0])
+
+    @property
+    def end_revision(self) -> int:
+        return self.base_revision + len(self._levels[0])
+
+    @property
+    def num_levels(self) -> int:
+        return len(self._levels)
+
+    def append(self, ot_raw_list: _OTRawInputSeq) -> int:
+        """Append ots as the next revision and return the revision"""
+
+        if not isinstance(ot_raw_list, (list, tuple)):
+            raise TypeError("`ot_raw_list` must be a list or tuple")
+
+        if not check(ot_raw_list):
+            raise ValueError("invalid OTs")
+
+        self._levels[0].append(ot_raw_list)
+
+        level = 0
+        while len(self._levels[level]) % 2 == 0 and (
+            self._max_level is None or level < self._max_level
+        ):
+            lower = self._levels[level]
+            composed = compose(lower[-2], lower[-1])
+
+            level += 1
+            if level == len(self._levels):
+                self._levels.append([])
+                self._level_bytes.append(0)
+
+            size = _ots_size(composed)
+            self._levels[level].append(composed)
+            self._level_bytes[level] += size
+            self.nbytes += size
+
+        if self.max_bytes is not None:
+            while self.nbytes > self.max_bytes and len(self._levels) > 1:
+                self._levels.pop()
+                self.nbytes -= self._level_bytes.pop()
+                self._max_level = len(self._levels) - 1
+
+        return self.end_revision - 1
+
+    def delta(self, start: int, end: int) -> _OTRawOutputSeq:
+        """Return ots changing the doc at `start` to the doc at `end`"""
+
+        if not self.base_revision <= start <= end <= self.end_revision:
+            raise IndexError("revision out of range")
+
+        pos = start - self.base_revision
+        stop = end - self.base_revision
+
+        pieces: list[_OTRawInputSeq] = []
+        while pos < stop:
+            level = 0
+            while (
+                level + 1 < len(self._levels)
+                and pos % (2 << level) == 0
+                and pos + (2 << level) <= stop
+            ):
+                level += 1
+
+            pieces.append(self._levels[level][pos >> level])
+            pos += 1 << level
+
+        return compose_all(pieces)
+
+
+class MemoryReport(NamedTuple):
+    """Result of `PackedLog.memory_report`
+
+    Sizes are in bytes as reported by `sys.getsizeof`. `list_nbytes` is the
+    size of the same revisions as lists of OTs in the raw form, counting every
+    object as if none of them were shared.
+    """
+
+    revisions: int
+    nbytes: int
+    list_nbytes: int
+
+    @property
+    def bytes_per_revision(self) -> float:
+        return self.nbytes / max(self.revisions, 1)
+
+    @property
+    def list_bytes_per_revision(self) -> float:
+        return self.list_nbytes / max(self.revisions, 1)
+
+
+def _list_nbytes(ots: list[_OTTuple]) -> int:
+    """Size of ots as a list of OTs in the raw form"""
+    nbytes = sys.getsizeof(ots)
+    for ot_action, ot_arg in ots:
+        nbytes += sys.getsizeof(ot_arg)
+        if ot_action == _OTTypeActionDelete:
+            nbytes += sys.getsizeof({"d": ot_arg})
+    return nbytes
+
+
+class PackedLog:
+    """Ots of a revision log packed into arrays over a text arena
+
+    Each OT of every revision is kept as an action byte and a length (of the
+    skip or the text) in two parallel arrays, and the texts of OT-Inserts and
+    OT-Deletes are concatenated into pages of about `_PAGE_CHARS` characters
+    indexed by character offsets, so an OT takes 9 bytes besides its text
+    instead of separate `int`, `str` and `dict` objects. Recently appended
+    texts are joined into the pages in batches, or when they are read.
+
+    `read` builds the ots of a revision in the tuple form, which every
+    function accepts as is.
+    """
+
+    def __init__(
+        self, ot_raw_lists: Sequence[_OTRawInputSeq] = (), *, base_revision: int = 0
+    ) -> None:
+        if not isinstance(ot_raw_lists, (list, tuple)):
+            raise TypeError("`ot_raw_lists` must be a list or tuple")
+
+        self.base_revision = base_revision
+
+        self._actions = bytearray()
+        self._lengths = array("Q")
+
+        # offsets of each revision in `_actions` and in the text, followed by
+        # the end offsets
+        self._ot_starts = array("Q", [0])
+        self._text_starts = array("Q", [0])
+
+        self._pages: list[str] = []
+        self._page_starts = array("Q")
+        self._paged_end = 0
+
+        # texts after `_paged_end`, not joined into the pages yet
+        self._tail: list[str] = []
+
+        for ot_raw_list in ot_raw_lists:
+            self.append(ot_raw_list)
+
+    def __len__(self) -> int:
+        return len(self._ot_starts) - 1
+
+    @property
+    def end_revision(self) -> int:
+        return self.base_revision + len(self)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the arrays and the text arena in bytes"""
+        return (
+            sys.getsizeof(self._actions)
+            + sys.getsizeof(self._lengths)
+            + sys.getsizeof(self._ot_starts)
+            + sys.getsizeof(self._text_starts)
+            + sys.getsizeof(self._pages)
+            + sum(sys.getsizeof(page) for page in self._pages)
+            + sys.getsizeof(self._page_starts)
+            + sys.getsizeof(self._tail)
+            + sum(sys.getsizeof(text) for text in self._tail)
+        )
+
+    def append(self, ot_raw_list: _OTRawInputSeq) -> int:
+        """Append ots as the next revision and return the revision"""
+
+        if not isinstance(ot_raw_list, (list, tuple)):
+            raise TypeError("`ot_raw_list` must be a list or tuple")
+
+        if not check(ot_raw_list):
+            raise ValueError("invalid OTs")
+
+        text_end = self._text_starts[-1]
+        for ot_raw in ot_raw_list:
+            ot_action, ot_arg = _resolve_ot(ot_raw)
+
+            self._actions.append(ot_action)
+            if ot_action == _OTTypeActionSkip:
+                assert isinstance(ot_arg, int)
+                self._lengths.append(ot_arg)
+            else:
+                assert isinstance(ot_arg, str)
+                self._lengths.append(len(ot_arg))
+                self._tail.append(ot_arg)
+                text_end += len(ot_arg)
+
+        self._ot_starts.append(len(self._actions))
+        self._text_starts.append(text_end)
+
+        if len(self._tail) >= _TAIL_TEXTS or text_end - self._paged_end >= _PAGE_CHARS:
+            self._join_tail()
+
+        return self.end_revision - 1
+
+    def _join_tail(self) -> None:
+        """Move the texts of `_tail` into the pages"""
+        if not self._tail:
+            return
+
+        text = "".join(self._tail)
+        self._tail = []
+
+        if self._pages and len(self._pages[-1]) < _PAGE_CHARS:
+            self._pages[-1] += text
+        else:
+            self._pages.append(text)
+            self._page_starts.append(self._paged_end)
+
+        self._paged_end += len(text)
+
+    def read(self, revision: int) -> list[_OTTuple]:
+        """Return the ots changing the doc at `revision` to the next revision"""
+
+        if not self.base_revision <= revision < self.end_revision:
+            raise IndexError("revision out of range")
+
+        index = revision - self.base_revision
+        text_start = self._text_starts[index]
+
+        page = ""
+        pos = 0
+        if text_start < self._text_starts[index + 1]:
+            if text_start >= self._paged_end:
+                self._join_tail()
+
+            # the texts of a revision are always in the same page
+            page_index = bisect_right(self._page_starts, text_start) - 1
+            page = self._pages[page_index]
+            pos = text_start - self._page_starts[page_index]
+
+        actions = self._actions
+        lengths = self._lengths
+
+        ots: list[_OTTuple] = []
+        for i in range(self._ot_starts[index], self._ot_starts[index + 1]):
+            ot_action = actions[i]
+            n = lengths[i]
+
+            if ot_action == _OTTypeActionSkip:
+                ots.append((ot_action, n))
+            else:
+                ots.append((ot_action, page[pos : pos + n]))
+                pos += n
+
+        return ots
+
+    def iter_ots(
+        self, start: Optional[int] = None, stop: Optional[int] = None
+    ) -> Iterator[list[_OTTuple]]:
+        """Yield the ots of revisions from `start` to `stop` (exclusive)"""
+        if start is None:
+            start = self.base_revision
+        if stop is None:
+            stop = self.end_revision
+
+        if start < self.base_revision or stop > self.end_revision:
+            raise IndexError("revision out of range")
+
+        for revision in range(start, stop):
+            yield self.read(revision)
+
+    def memory_report(self) -> MemoryReport:
+        """Compare the size of the log with lists of OTs in the raw form"""
+
+        # before reading, which joins the texts appended since the last join
+        nbytes = self.nbytes
+
+        list_nbytes = sys.getsizeof([None] * len(self))
+        for ots in self.iter_ots():
+            list_nbytes += _list_nbytes(ots)
+
+        return MemoryReport(revisions=len(self), nbytes=nbytes, list_nbytes=list_nbytes)
@@ -0,0 +1,115 @@
+"""Apply large ots across event loop iterations
+
+`apply` here is a coroutine which does the same as `ottype.apply`, but
+copies and compares the text in pieces of `max_chars` characters and yields
+to the event loop between them, so other tasks keep running while a huge
+OT-Insert or OT-Delete is applied.
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+from . import check
+from .core import (
+    _OTRawInputSeq,
+    _OTTypeActionDelete,
+    _OTTypeActionInsert,
+    _OTTypeActionSkip,
+    _resolve_ot,
+)
+
+
+class _Budget:
+    def __init__(self, max_chars: int) -> None:
+        self.max_chars = max_chars
+        self.remaining = max_chars
+
+    async def spend(self, n: int) -> None:
+        self.remaining -= n
+        if self.remaining <= 0:
+            self.remaining = self.max_chars
+            await asyncio.sleep(0)
+
+
+async def apply(
+    doc: str,
+    ot_raw_list: _OTRawInputSeq,
+    *,
+    max_chars: int = 65536,
+    check_unoptimized: object = True,
+) -> str:
+    """Apply ots to doc, yielding every `max_chars` characters processed
+
+    Skipped text and the tail of the doc are sliced in pieces of `max_chars`
+    characters, which are copied again when the doc is joined at the end, so
+    the kept text is copied twice where `ottype.apply` copies it once.
+    """
+
+    if not isinstance(doc, str):
+        raise TypeError("`doc` must be string")
+
+    if not isinstance(ot_raw_list, (list, tuple)):
+        raise TypeError("`ot_raw_list` must be a list or tuple")
+
+    if not isinstance(max_chars, int) or max_chars < 1:
+        raise ValueError("invalid max_chars")
+
+    if not check(ot_raw_list, check_unoptimized=check_unoptimized):
+        raise ValueError("invalid OTs")
+
+    budget = _Budget(max_chars)
+    new_doc = []
+    pos = 0
+
+    for ot_raw in ot_raw_list:
+        ot_action, ot_arg = _resolve_ot(ot_raw)
+
+        if ot_action == _OTTypeActionSkip:
+            assert isinstance(ot_arg, int)
+
+            if ot_arg > len(doc) - pos:
+                raise ValueError("skip exceeds doc length")
+
+            end = pos + ot_arg
+            while pos < end:
+                n = min(end - pos, budget.max_chars)
+                new_doc.append(doc[pos : pos + n])
+                pos += n
+                await budget.spend(n)
+
+        elif ot_action == _OTTypeActionInsert:
+            assert isinstance(ot_arg, str)
+
+            new_doc.append(ot_arg)
+
+        elif ot_action == _OTTypeActionDelete:
+            assert isinstance(ot_arg, str)
+
+            if len(ot_arg) > len(doc) - pos:
+                raise ValueError(
+                    "inconsistent delete (doc, OT.arg)",
+                    doc[pos : pos + len(ot_arg)],
+                    ot_arg,
+                )
+
+            offset = 0
+            while offset < len(ot_arg):
+                n = min(len(ot_arg) - offset, budget.max_chars)
+                if not doc.startswith(ot_arg[offset : offset + n], pos + offset):
+                    raise ValueError(
+                        "inconsistent delete (doc, OT.arg)",
+                        doc[pos : pos + len(ot_arg)],
+                        ot_arg,
+                    )
+                offset += n
+                await budget.spend(n)
+            pos += len(ot_arg)
+
+    while pos < len(doc):
+        n = min(len(doc) - pos, budget.max_chars)
+        new_doc.append(doc[pos : pos + n])
+        pos += n
+        await budget.spend(n)
+
+    return "".join(new_doc)
@@ -0,0 +1,246 @@
+"""Line/column index of a doc maintained by ots"""
+
+from __future__ import annotations
+
+import random
+from typing import Optional
+
+from . import check
+from .core import (
+    _OTRawInputSeq,
+    _OTTypeActionDelete,
+    _OTTypeActionInsert,
+    _OTTypeActionSkip,
+    _resolve_ot,
+)
+
+# An immutable treap of lines ordered by position. A node is
+# (priority, length, left, right, total length, number of lines) where the
+# length of a line includes its trailing newline. Updates copy only the
+# paths being changed, so a failed update leaves the old tree intact.
+_Node = tuple[float, int, "_Tree", "_Tree", int, int]
+_Tree = Optional[_Node]
+
+
+def _make(priority: float, length: int, left: _Tree, right: _Tree) -> _Node:
+    total = length
+    count = 1
+    if left is not None:
+        total += left[4]
+        count += left[5]
+    if right is not None:
+        total += right[4]
+        count += right[5]
+    return (priority, length, left, right, total, count)
+
+
+def _merge(left: _Tree, right: _Tree) -> _Tree:
+    if left is None:
+        return right
+    if right is None:
+        return left
+
+    if left[0] > right[0]:
+        return _make(left[0], left[1], left[2], _merge(left[3], right))
+    return _make(right[0], right[1], _merge(left, right[2]), right[3])
+
+
+def _split(tree: _Tree, n: int) -> tuple[_Tree, _Tree]:
+    """Split the first `n` lines of tree from the rest"""
+    if tree is None:
+        return None, None
+
+    left_count = tree[2][5] if tree[2] is not None else 0
+    if n <= left_count:
+        left, right = _split(tree[2], n)
+        return left, _make(tree[0], tree[1], right, tree[3])
+
+    left, right = _split(tree[3], n - left_count - 1)
+    return _make(tree[0], tree[1], tree[2], left), right
+
+
+def _build(lengths: list[int], lo: int, hi: int) -> _Tree:
+    """Build a balanced tree of `lengths[lo:hi]`"""
+    if lo == hi:
+        return None
+
+    mid = (lo + hi) // 2
+    left = _build(lengths, lo, mid)
+    right = _build(lengths, mid + 1, hi)
+
+    # keep the heap order of priorities over the balanced shape
+    priority = random.random()
+    if left is not None:
+        priority += left[0]
+    if right is not None:
+        priority = max(priority, right[0] + random.random())
+
+    return _make(priority, lengths[mid], left, right)
+
+
+def _line_lengths(text: str) -> list[int]:
+    lengths = [len(line) + 1 for line in text.split("\n")]
+    lengths[-1] -= 1
+    return lengths
+
+
+def _locate(tree: _Tree, offset: int) -> tuple[int, int, int]:
+    """Return `(line, col, line length)` of `offset` in tree"""
+    node = tree
+    assert node is not None
+
+    if offset == node[4]:
+        # the end of the doc is in the last line
+        last = node
+        while last[3] is not None:
+            last = last[3]
+        return node[5] - 1, last[1], last[1]
+
+    line = 0
+    while True:
+        assert node is not None
+        left = node[2]
+        left_total = left[4] if left is not None else 0
+        left_count = left[5] if left is not None else 0
+
+        if offset < left_total:
+            node = left
+        elif offset < left_total + node[1]:
+            return line + left_count, offset - left_total, node[1]
+        else:
+            offset -= left_total + node[1]
+            line += left_count + 1
+            node = node[3]
+
+
+def _replace(tree: _Tree, pos: int, deleted: str, inserted: str) -> _Tree:
+    """Replace `deleted` at `pos` of tree with `inserted`"""
+    first_line, first_col, _ = _locate(tree, pos)
+    last_line, last_col, last_length = _locate(tree, pos + len(deleted))
+
+    if last_line - first_line != deleted.count("\n"):
+        raise ValueError("inconsistent delete (doc, OT.arg)")
+
+    lengths = _line_lengths(inserted)
+    lengths[0] += first_col
+    lengths[-1] += last_length - last_col
+
+    left, rest = _split(tree, first_line)
+    _, right = _split(rest, last_line - first_line + 1)
+
+    return _merge(_merge(left, _build(lengths, 0, len(lengths))), right)
+
+
+class LineIndex:
+    """Index of line starts of a doc
+
+    The index is updated by `apply` in `O(log lines)` for each OT (plus the
+    number of inserted lines), and converts between offsets and
+    `(line, col)` (both 0-based, in characters) in `O(log lines)`.
+    """
+
+    def __init__(self, doc: str = "") -> None:
+        if not isinstance(doc, str):
+            raise TypeError("`doc` must be string")
+
+        lengths = _line_lengths(doc)
+        self._root = _build(lengths, 0, len(lengths))
+
+    def __len__(self) -> int:
+        """Number of lines"""
+        assert self._root is not None
+        return self._root[5]
+
+    @property
+    def length(self) -> int:
+        """Length of the doc"""
+        assert self._root is not None
+        return self._root[4]
+
+    def position(self, offset: int) -> tuple[int, int]:
+        """Return `(line, col)` of `offset`"""
+        if not 0 <= offset <= self.length:
+            raise IndexError("offset out of range")
+
+        line, col, _ = _locate(self._root, offset)
+        return line, col
+
+    def offset(self, line: int, col: int) -> int:
+        """Return the offset of `(line, col)`"""
+        if not 0 <= line < len(self):
+            raise IndexError("line out of range")
+
+        last = line == len(self) - 1
+
+        node = self._root
+        start = 0
+        while True:
+            assert node is not None
+            left = node[2]
+            left_total = left[4] if left is not None else 0
+            left_count = left[5] if left is not None else 0
+
+            if line < left_count:
+                node = left
+            elif line == left_count:
+                start += left_total
+                length = node[1]
+                break
+            else:
+                line -= left_count + 1
+                start += left_total + node[1]
+                node = node[3]
+
+        if not last:
+            length -= 1  # trailing newline
+
+        if not 0 <= col <= length:
+            raise IndexError("col out of range")
+
+        return start + col
+
+    def apply(
+        self, ot_raw_list: _OTRawInputSeq, *, check_unoptimized: bool = True
+    ) -> None:
+        """Update the index by ots applied to the doc
+
+        If ots do not fit the doc, `ValueError` is raised and the index is
+        not changed.
+        """
+
+        if not isinstance(ot_raw_list, (list, tuple)):
+            raise TypeError("`ot_raw_list` must be a list or tuple")
+
+        if not check(ot_raw_list, check_unoptimized=check_unoptimized):
+            raise ValueError("invalid OTs")
+
+        old_root = self._root
+        pos = 0
+
+        try:
+            for ot_raw in ot_raw_list:
+                ot_action, ot_arg = _resolve_ot(ot_raw)
+
+                if ot_action == _OTTypeActionSkip:
+                    assert isinstance(ot_arg, int)
+
+                    if ot_arg > self.length - pos:
+                        raise ValueError("skip exceeds doc length")
+                    pos += ot_arg
+
+                elif ot_action == _OTTypeActionInsert:
+                    assert isinstance(ot_arg, str)
+
+                    self._root = _replace(self._root, pos, "", ot_arg)
+                    pos += len(ot_arg)
+
+                elif ot_action == _OTTypeActionDelete:
+                    assert isinstance(ot_arg, str)
+
+                    if len(ot_arg) > self.length - pos:
+                        raise ValueError("delete exceeds doc length")
+                    self._root = _replace(self._root, pos, ot_arg, "")
+
+        except BaseException:
+            self._root = old_root
+            raise
@@ -0,0 +1,416 @@
+"""Append-only on-disk revision log
+
+An op-log is a pair of files.
+
+- `<path>` : a header (`_DATA_MAGIC`, version) followed by records. A record
+  is the byte length of its payload (u32) followed by the payload, which is
+  a sequence of OTs, each of them is a tag byte (1: skip, 2: insert,
+  3: delete) and a varint of the skip or of the UTF-8 encoded byte length of
+  the text followed by the text.
+- `<path>.idx` : a header (`_INDEX_MAGIC`, version, base revision) followed by
+  the offset (u64) of the record of each revision in `<path>`.
+
+All integers are little-endian. Records are written before their index
+entries, so a torn tail (after a crash) is detected and truncated when the
+log is opened for writing again. The index is created after `<path>`, and it
+is rebuilt from the records if it is missing.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import time
+from types import TracebackType
+from typing import Iterator, Optional, Union
+
+from . import check
+from .core import (
+    _OTRawInputSeq,
+    _OTTypeActionDelete,
+    _OTTypeActionInsert,
+    _OTTypeActionSkip,
+    _resolve_ot,
+)
+
+_DATA_MAGIC = b"OTLG"
+_INDEX_MAGIC = b"OTIX"
+_VERSION = 1
+
+_DATA_HEADER = struct.Struct("<4sI")
+_INDEX_HEADER = struct.Struct("<4sIQ")
+_RECORD_LENGTH = struct.Struct("<I")
+_OFFSET = struct.Struct("<Q")
+
+_OTTuple = tuple[int, Union[int, str]]
+
+
+def _index_path(path: Union[str, os.PathLike[str]]) -> str:
+    return os.fspath(path) + ".idx"
+
+
+def _encode_uvarint(buf: bytearray, n: int) -> None:
+    while n >= 0x80:
+        buf.append((n & 0x7F) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+
+def _encode_record(ot_raw_list: _OTRawInputSeq) -> bytes:
+    payload = bytearray()
+    for ot_raw in ot_raw_list:
+        ot_action, ot_arg = _resolve_ot(ot_raw)
+
+        payload.append(ot_action)
+        if ot_action == _OTTypeActionSkip:
+            assert isinstance(ot_arg, int)
+            _encode_uvarint(payload, ot_arg)
+        else:
+            assert isinstance(ot_arg, str)
+            encoded = ot_arg.encode()
+            _encode_uvarint(payload, len(encoded))
+            payload += encoded
+
+    return _RECORD_LENGTH.pack(len(payload)) + payload
+
+
+def _decode_record(buf: mmap.mmap, offset: int) -> list[_OTTuple]:
+    (length,) = _RECORD_LENGTH.unpack_from(buf, offset)
+    pos = offset + _RECORD_LENGTH.size
+    end = pos + length
+
+    ots: list[_OTTuple] = []
+    while pos < end:
+        ot_action = buf[pos]
+
+        n = 0
+        shift = 0
+        while True:
+            pos += 1
+            byte = buf[pos]
+            n |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        pos += 1
+
+        if ot_action == _OTTypeActionSkip:
+            ots.append((_OTTypeActionSkip, n))
+        elif ot_action == _OTTypeActionInsert or ot_action == _OTTypeActionDelete:
+            ots.append((ot_action, buf[pos : pos + n].decode()))
+            pos += n
+        else:
+            raise ValueError("corrupted op-log record", offset)
+
+    return ots
+
+
+def _rebuild_index(path: Union[str, os.PathLike[str]], base_revision: int) -> None:
+    """Write the index of the records in `path` with `base_revision`"""
+    offsets = bytearray()
+
+    with open(path, "r+b") as f:
+        data_size = f.seek(0, os.SEEK_END)
+        if data_size < _DATA_HEADER.size:
+            # the log was being created
+            f.seek(0)
+            f.truncate()
+            f.write(_DATA_HEADER.pack(_DATA_MAGIC, _VERSION))
+            data_size = _DATA_HEADER.size
+
+        offset = _DATA_HEADER.size
+        while offset + _RECORD_LENGTH.size <= data_size:
+            f.seek(offset)
+            (length,) = _RECORD_LENGTH.unpack(f.read(_RECORD_LENGTH.size))
+            if offset + _RECORD_LENGTH.size + length > data_size:
+                break
+            offsets += _OFFSET.pack(offset)
+            offset += _RECORD_LENGTH.size + length
+
+    # written aside and renamed, so a crash leaves no partial index
+    tmp_path = _index_path(path) + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, _VERSION, base_revision))
+        f.write(offsets)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, _index_path(path))
+
+
+class OpLogWriter:
+    """Append ots to an op-log, creating it if it does not exist
+
+    `base_revision` is the revision of the first record of a new log, or of a
+    log whose index is missing and rebuilt. Written records are fsynced every
+    `sync_every` appends (never if 0) and, checked on `append` and `flush`,
+    when `sync_interval` seconds have passed since the last fsync. Unsynced
+    records are fsynced on `close`.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike[str]],
+        *,
+        base_revision: int = 0,
+        sync_every: int = 1,
+        sync_interval: Optional[float] = None,
+    ) -> None:
+        if sync_every < 0:
+            raise ValueError("invalid sync_every")
+
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+
+        if not os.path.exists(path):
+            with open(path, "xb") as f:
+                f.write(_DATA_HEADER.pack(_DATA_MAGIC, _VERSION))
+        if not os.path.exists(_index_path(path)):
+            _rebuild_index(path, base_revision)
+
+        self.base_revision = 0
+        self.end_revision = 0
+
+        self._data = open(path, "r+b")
+        self._index = open(_index_path(path), "r+b")
+        self._data_end = 0
+
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+        try:
+            self._recover()
+        except BaseException:
+            self.close()
+            raise
+
+    def _recover(self) -> None:
+        """Truncate a torn tail left by an interrupted append"""
+        magic, version = _DATA_HEADER.unpack(self._data.read(_DATA_HEADER.size))
+        if magic != _DATA_MAGIC or version != _VERSION:
+            raise ValueError("not an op-log")
+
+        magic, version, self.base_revision = _INDEX_HEADER.unpack(
+            self._index.read(_INDEX_HEADER.size)
+        )
+        if magic != _INDEX_MAGIC or version != _VERSION:
+            raise ValueError("not an op-log index")
+
+        data_size = self._data.seek(0, os.SEEK_END)
+        index_size = self._index.seek(0, os.SEEK_END)
+
+        count = (index_size - _INDEX_HEADER.size) // _OFFSET.size
+        data_end = _DATA_HEADER.size
+
+        while count > 0:
+            self._index.seek(_INDEX_HEADER.size + (count - 1) * _OFFSET.size)
+            (offset,) = _OFFSET.unpack(self._index.read(_OFFSET.size))
+
+            if offset + _RECORD_LENGTH.size <= data_size:
+                self._data.seek(offset)
+                (length,) = _RECORD_LENGTH.unpack(self._data.read(_RECORD_LENGTH.size))
+                if offset + _RECORD_LENGTH.size + length <= data_size:
+                    data_end = offset + _RECORD_LENGTH.size + length
+                    break
+
+            count -= 1
+
+        self._index.truncate(_INDEX_HEADER.size + count * _OFFSET.size)
+        self._data.truncate(data_end)
+        self._index.seek(0, os.SEEK_END)
+        self._data.seek(0, os.SEEK_END)
+
+        self.end_revision = self.base_revision + count
+        self._data_end = data_end
+
+    def append(
+        self, ot_raw_list: _OTRawInputSeq, *, check_unoptimized: bool = True
+    ) -> int:
+        """Append ots as the next revision and return the revision"""
+
+        if not isinstance(ot_raw_list, (list, tuple)):
+            raise TypeError("`ot_raw_list` must be a list or tuple")
+
+        if not check(ot_raw_list, check_unoptimized=check_unoptimized):
+            raise ValueError("invalid OTs")
+
+        record = _encode_record(ot_raw_list)
+
+        self._data.write(record)
+        self._index.write(_OFFSET.pack(self._data_end))
+        self._data_end += len(record)
+
+        revision = self.end_revision
+        self.end_revision += 1
+
+        self._unsynced += 1
+        if (self.sync_every and self._unsynced >= self.sync_every) or self._sync_due():
+            self.sync()
+
+        return revision
+
+    def _sync_due(self) -> bool:
+        return (
+            self.sync_interval is not None
+            and time.monotonic() - self._last_sync >= self.sync_interval
+        )
+
+    def flush(self) -> None:
+        """Make appended records visible to readers
+
+        They are also fsynced if `sync_interval` seconds have passed since the
+        last fsync, so a writer which stopped appending can be synced by
+        flushing it periodically.
+        """
+        if self._unsynced and self._sync_due():
+            self.sync()
+            return
+
+        self._data.flush()
+        self._index.flush()
+
+    def sync(self) -> None:
+        """Flush and fsync appended records"""
+        self._data.flush()
+        os.fsync(self._data.fileno())
+        self._index.flush()
+        os.fsync(self._index.fileno())
+
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        if self._data.closed:
+            return
+
+        try:
+            if self._unsynced:
+                self.sync()
+        finally:
+            self._data.close()
+            self._index.close()
+
+    def __enter__(self) -> OpLogWriter:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+class OpLogReader:
+    """Read ots from an op-log by revision
+
+    The files are memory-mapped, so any revision is located in O(1) and only
+    the records being read are touched. Records appended after opening are
+    visible after `refresh`.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike[str]]) -> None:
+        self.base_revision = 0
+        self.end_revision = 0
+
+        self._data = open(path, "rb")
+        self._index = open(_index_path(path), "rb")
+
+        self._data_map: Optional[mmap.mmap] = None
+        self._index_map: Optional[mmap.mmap] = None
+
+        try:
+            self.refresh()
+        except BaseException:
+            self.close()
+            raise
+
+    def refresh(self) -> None:
+        """Map the files again to see records appended since"""
+        self._unmap()
+
+        self._data_map = mmap.mmap(self._data.fileno(), 0, access=mmap.ACCESS_READ)
+        self._index_map = mmap.mmap(self._index.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version = _DATA_HEADER.unpack_from(self._data_map)
+        if magic != _DATA_MAGIC or version != _VERSION:
+            raise ValueError("not an op-log")
+
+        magic, version, self.base_revision = _INDEX_HEADER.unpack_from(self._index_map)
+        if magic != _INDEX_MAGIC or version != _VERSION:
+            raise ValueError("not an op-log index")
+
+        count = (len(self._index_map) - _INDEX_HEADER.size) // _OFFSET.size
+
+        # ignore a torn tail being written
+        while count > 0:
+            (offset,) = _OFFSET.unpack_from(
+                self._index_map, _INDEX_HEADER.size + (count - 1) * _OFFSET.size
+            )
+            if offset + _RECORD_LENGTH.size <= len(self._data_map):
+                (length,) = _RECORD_LENGTH.unpack_from(self._data_map, offset)
+                if offset + _RECORD_LENGTH.size + length <= len(self._data_map):
+                    break
+            count -= 1
+
+        self.end_revision = self.base_revision + count
+
+    def __len__(self) -> int:
+        return self.end_revision - self.base_revision
+
+    def read(self, revision: int) -> list[_OTTuple]:
+        """Return the ots changing the doc at `revision` to the next revision
+
+        The ots are in the tuple form, which is accepted by all functions
+        without converting them.
+        """
+        if not self.base_revision <= revision < self.end_revision:
+            raise IndexError("revision out of range")
+
+        assert self._data_map is not None and self._index_map is not None
+
+        (offset,) = _OFFSET.unpack_from(
+            self._index_map,
+            _INDEX_HEADER.size + (revision - self.base_revision) * _OFFSET.size,
+        )
+        return _decode_record(self._data_map, offset)
+
+    def iter_ots(
+        self, start: Optional[int] = None, stop: Optional[int] = None
+    ) -> Iterator[list[_OTTuple]]:
+        """Yield the ots of revisions from `start` to `stop` (exclusive)"""
+        if start is None:
+            start = self.base_revision
+        if stop is None:
+            stop = self.end_revision
+
+        if start < self.base_revision or stop > self.end_revision:
+            raise IndexError("revision out of range")
+
+        for revision in range(start, stop):
+            yield self.read(revision)
+
+    def _unmap(self) -> None:
+        if self._data_map is not None:
+            self._data_map.close()
+            self._data_map = None
+        if self._index_map is not None:
+            self._index_map.close()
+            self._index_map = None
+
+    def close(self) -> None:
+        self._unmap()
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self) -> OpLogReader:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
@@ -0,0 +1,278 @@
+"""Record op workloads and replay them against each backend
+
+A capture is a JSON-lines file, one call per line as
+`{"func": name, "args": [...], "kwargs": {...}}`, with OTs in the raw form.
+`Recorder.wrap` records calls of `apply`, `transform` and `compose` before
+forwarding them, and setting `OTTYPE_RECORD=<path>` wraps them in `ottype`
+itself. Captures are replayed by
+
+.. code::
+    python -m ottype.profile <capture> [--backend python|mypyc|cython]
+        [--repeat N] [--cprofile <prefix>] [--perf]
+
+which reports the latency percentiles of each function for each backend.
+"""
+
+from __future__ import annotations
+
+import argparse
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from types import ModuleType, TracebackType
+from typing import Any, Callable, Optional, Sequence, TypeVar, Union
+
+from . import core
+from .core import _resolve_ot, _to_ot_raw_list
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+# (func, args, kwargs)
+_Call = tuple[str, list[Any], dict[str, Any]]
+
+RECORDED_FUNCS = ("apply", "transform", "compose")
+
+PERCENTILES = (50, 90, 99)
+
+
+def _encode_arg(arg: Any) -> Any:
+    """Convert OTs in the tuple form into the raw form, which JSON keeps"""
+    if not isinstance(arg, (list, tuple)):
+        return arg
+
+    encoded = []
+    for ot_raw in arg:
+        if isinstance(ot_raw, tuple):
+            try:
+                ot_raw = _to_ot_raw_list([_resolve_ot(ot_raw)])[0]
+            except ValueError:
+                pass
+        encoded.append(ot_raw)
+    return encoded
+
+
+class Recorder:
+    """Append calls of wrapped functions to a capture file"""
+
+    def __init__(self, path: Union[str, os.PathLike[str]]) -> None:
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> Recorder:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def record(self, func: str, args: Sequence[Any], kwargs: dict[str, Any]) -> None:
+        line = json.dumps(
+            {
+                "func": func,
+                "args": [_encode_arg(arg) for arg in args],
+                "kwargs": kwargs,
+            },
+            ensure_ascii=False,
+            separators=(",", ":"),
+            default=repr,
+        )
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line + "\n")
+
+    def wrap(self, func: _F) -> _F:
+        """Return `func` recording its calls, including the failing ones"""
+        name = func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            self.record(name, args, kwargs)
+            return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+
+def load(path: Union[str, os.PathLike[str]]) -> list[_Call]:
+    """Read the calls of a capture file"""
+    calls = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+
+            try:
+                entry = json.loads(line)
+                func = entry["func"]
+                args = entry.get("args", [])
+                kwargs = entry.get("kwargs", {})
+            except (ValueError, KeyError, TypeError, AttributeError):
+                raise ValueError(f"invalid capture at line {line_no}") from None
+
+            if (
+                func not in RECORDED_FUNCS
+                or not isinstance(args, list)
+                or not isinstance(kwargs, dict)
+            ):
+                raise ValueError(f"invalid capture at line {line_no}")
+
+            calls.append((func, args, kwargs))
+    return calls
+
+
+def replay(
+    calls: Sequence[_Call],
+    core_impl: ModuleType,
+    *,
+    repeat: int = 1,
+    clock: Callable[[], float] = time.perf_counter,
+) -> dict[str, list[float]]:
+    """Run the calls in order and return the latencies of each function
+
+    Calls raising exceptions are timed as well, since invalid inputs are
+    part of the workload.
+    """
+    if repeat < 1:
+        raise ValueError("invalid repeat")
+
+    funcs = {name: getattr(core_impl, name) for name in RECORDED_FUNCS}
+    latencies: dict[str, list[float]] = {}
+
+    for _ in range(repeat):
+        for name, args, kwargs in calls:
+            func = funcs[name]
+            start = clock()
+            try:
+                func(*args, **kwargs)
+            except Exception:
+                pass
+            latencies.setdefault(name, []).append(clock() - start)
+
+    return latencies
+
+
+def percentile(sorted_values: Sequence[float], p: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    if not sorted_values:
+        raise ValueError("no values")
+
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def format_report(results: dict[str, dict[str, list[float]]]) -> str:
+    """Format latencies of each backend as a markdown table in microseconds"""
+    lines = [
+        "| backend | function | calls | "
+        + " | ".join(f"p{p} (us)" for p in PERCENTILES)
+        + " | max (us) |",
+        "|---|---|---:|" + "---:|" * (len(PERCENTILES) + 1),
+    ]
+
+    for backend, latencies in results.items():
+        for name in RECORDED_FUNCS:
+            if name not in latencies:
+                continue
+
+            values = sorted(latencies[name])
+            cells = [f"{percentile(values, p) * 1e6:.2f}" for p in PERCENTILES]
+            cells.append(f"{values[-1] * 1e6:.2f}")
+            lines.append(
+                f"| {backend} | {name} | {len(values)} | " + " | ".join(cells) + " |"
+            )
+
+    return "\n".join(lines)
+
+
+def _backends() -> dict[str, ModuleType]:
+    backends = {"python": core}
+    try:
+        from . import core_mypyc  # type: ignore
+
+        backends["mypyc"] = core_mypyc
+    except ImportError:  # pragma: no cover
+        pass
+    try:
+        from . import core_boost  # type: ignore
+
+        backends["cython"] = core_boost
+    except ImportError:  # pragma: no cover
+        pass
+    return backends
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m ottype.profile",
+        description="Replay a capture of op calls against each backend",
+    )
+    parser.add_argument("capture", help="capture file written by a Recorder")
+    parser.add_argument(
+        "--backend",
+        action="append",
+        choices=["python", "mypyc", "cython"],
+        help="backend to replay against (default: all available)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="number of times to replay"
+    )
+    parser.add_argument(
+        "--cprofile",
+        metavar="PREFIX",
+        help="write cProfile stats of each backend to PREFIX.<backend>.pstats",
+    )
+    parser.add_argument(
+        "--perf",
+        action="store_true",
+        help="enable the perf trampoline (Python 3.12+) so that `perf` "
+        "shows Python frames",
+    )
+    args = parser.parse_args(argv)
+
+    if args.repeat < 1:
+        parser.error("--repeat must be positive")
+
+    available = _backends()
+    names = args.backend or list(available)
+    for name in names:
+        if name not in available:
+            parser.error(f"backend {name!r} is not available")
+
+    if args.perf:
+        if not hasattr(sys, "activate_stack_trampoline"):
+            parser.error("--perf requires Python 3.12 or later")
+        sys.activate_stack_trampoline("perf")
+
+    calls = load(args.capture)
+
+    results = {}
+    for name in names:
+        if args.cprofile:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            results[name] = replay(calls, available[name], repeat=args.repeat)
+            profiler.disable()
+            profiler.dump_stats(f"{args.cprofile}.{name}.pstats")
+        else:
+            results[name] = replay(calls, available[name], repeat=args.repeat)
+
+    print(f"{len(calls)} calls x {args.repeat}")
+    print()
+    print(format_report(results))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,468 @@
+"""Document cache shared by processes through shared memory
+
+A cache is a directory segment named `<name>` and a data segment for each
+cached doc.
+
+- `<name>` : a header (`_DIRECTORY_MAGIC`, version, `max_docs`, `max_bytes`,
+  bytes used, LRU clock, evictions) followed by `max_docs` slots of
+  (state, key, generation, revision, size of the data segment, last used).
+- `<name>-<slot>-<generation>` : a header (`_DATA_MAGIC`, version, revision,
+  byte length) followed by the UTF-8 encoded doc.
+
+All integers are little-endian. A data segment is never written after it is
+published; a new revision is published as a new segment and the old one is
+unlinked, so views of the old revision stay valid until they are closed.
+Changes of the directory are serialized by `fcntl.flock` on a lock file, so
+unrelated processes on the host can share a cache by its name.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import os
+import struct
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from types import TracebackType
+from typing import Iterator, Optional
+
+from . import apply as _apply
+from .core import _OTRawInputSeq
+
+_DIRECTORY_MAGIC = b"OTSC"
+_DATA_MAGIC = b"OTSD"
+_VERSION = 1
+
+# magic, version, max_docs, max_bytes, used_bytes, clock, evictions
+_DIRECTORY_HEADER = struct.Struct("<4sIQQQQQ")
+# state, key length, key, generation, revision, nbytes, last_used
+_SLOT = struct.Struct("<II64sQQQQ")
+# magic, version, revision, byte length of the doc
+_DATA_HEADER = struct.Struct("<4sIQQ")
+
+_SLOT_EMPTY = 0
+_SLOT_USED = 1
+
+_MAX_KEY_BYTES = 64
+
+
+def _open_segment(
+    name: str, *, create: bool = False, size: int = 0
+) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, create=create, size=size, track=False)
+
+    shm = shared_memory.SharedMemory(name, create=create, size=size)
+    # segments outlive the process which opened them, so the resource tracker
+    # must not unlink them when the process exits
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _unlink_segment(name: str) -> None:
+    try:
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name, track=False)
+        else:
+            # registered here and unregistered by `unlink`
+            shm = shared_memory.SharedMemory(name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+def _encode_key(key: str) -> bytes:
+    if not isinstance(key, str):
+        raise TypeError("`key` must be str")
+
+    encoded = key.encode()
+    if len(encoded) > _MAX_KEY_BYTES:
+        raise ValueError("key is too long")
+    return encoded
+
+
+class DocumentView:
+    """A cached revision of a doc mapped without copying
+
+    `data` is a read-only memoryview of the UTF-8 encoded doc, which can be
+    passed to `ottype.utf8` as is. The view must be closed to release the
+    mapping.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory) -> None:
+        magic, version, revision, length = _DATA_HEADER.unpack_from(shm.buf)
+        if magic != _DATA_MAGIC or version != _VERSION:
+            shm.close()
+            raise ValueError("incompatible cache")
+
+        self.revision: int = revision
+        self._buf = shm.buf[_DATA_HEADER.size : _DATA_HEADER.size + length]
+        self.data = self._buf.toreadonly()
+        self._shm = shm
+
+    def __enter__(self) -> DocumentView:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    @property
+    def text(self) -> str:
+        return str(self.data, "utf-8")
+
+    def close(self) -> None:
+        self.data.release()
+        self._buf.release()
+        self._shm.close()
+
+
+class SharedDocCache:
+    """Docs and their revisions cached in shared memory
+
+    A cache is created once with `create=True` and opened by its `name` in
+    the other processes. When publishing a doc makes the data segments
+    larger than `max_bytes` in total, or all `max_docs` slots are used, the
+    least recently used docs are evicted. Keys are strings of up to 64 bytes
+    in UTF-8.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        create: bool = False,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_docs: int = 1024,
+        lock_path: Optional[str] = None,
+    ) -> None:
+        if create and (max_bytes < 1 or max_docs < 1):
+            raise ValueError("invalid max_bytes or max_docs")
+
+        self.name = name
+        self.lock_path = lock_path or os.path.join(
+            tempfile.gettempdir(), f"{name}.lock"
+        )
+
+        self._thread_lock = threading.Lock()
+        self._lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+
+        try:
+            if create:
+                self._shm = _open_segment(
+                    name,
+                    create=True,
+                    size=_DIRECTORY_HEADER.size + _SLOT.size * max_docs,
+                )
+                _DIRECTORY_HEADER.pack_into(
+                    self._shm.buf,
+                    0,
+                    _DIRECTORY_MAGIC,
+                    _VERSION,
+                    max_docs,
+                    max_bytes,
+                    0,
+                    0,
+                    0,
+                )
+            else:
+                self._shm = _open_segment(name)
+                magic, version = _DIRECTORY_HEADER.unpack_from(self._shm.buf)[:2]
+                if magic != _DIRECTORY_MAGIC or version != _VERSION:
+                    self._shm.close()
+                    raise ValueError("incompatible cache")
+        except BaseException:
+            os.close(self._lock_fd)
+            raise
+
+        self.max_docs: int
+        self.max_bytes: int
+        self.max_docs, self.max_bytes = _DIRECTORY_HEADER.unpack_from(self._shm.buf)[
+            2:4
+        ]
+
+    def __enter__(self) -> SharedDocCache:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        with self._locked():
+            return sum(1 for i in range(self.max_docs) if self._slot(i)[0])
+
+    def __contains__(self, key: str) -> bool:
+        encoded = _encode_key(key)
+        with self._locked():
+            return self._find(encoded) >= 0
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of the data segments"""
+        with self._locked():
+            return self._header()[4]
+
+    @property
+    def evictions(self) -> int:
+        """Number of docs evicted to keep the cache within the limits"""
+        with self._locked():
+            return self._header()[6]
+
+    def close(self) -> None:
+        """Close the cache in this process, keeping the segments"""
+        self._shm.close()
+        os.close(self._lock_fd)
+
+    def unlink(self) -> None:
+        """Remove all segments of the cache, which must be closed afterwards"""
+        with self._locked():
+            for i in range(self.max_docs):
+                if self._slot(i)[0] == _SLOT_USED:
+                    self._evict(i, count=False)
+        _unlink_segment(self.name)
+        try:
+            os.unlink(self.lock_path)
+        except FileNotFoundError:  # pragma: no cover
+            pass
+
+    def get(self, key: str) -> Optional[tuple[int, str]]:
+        """Return `(revision, doc)` or `None` if the doc is not cached"""
+        view = self.view(key)
+        if view is None:
+            return None
+        with view:
+            return view.revision, view.text
+
+    def view(self, key: str) -> Optional[DocumentView]:
+        """Return a view of the doc or `None` if the doc is not cached"""
+        encoded = _encode_key(key)
+        with self._locked():
+            idx = self._find(encoded)
+            if idx < 0:
+                return None
+            self._touch(idx)
+            return DocumentView(_open_segment(self._segment_name(idx)))
+
+    def publish(
+        self,
+        key: str,
+        revision: int,
+        doc: str,
+        *,
+        expected_revision: Optional[int] = None,
+    ) -> bool:
+        """Cache `doc` as `revision` of the doc
+
+        If `expected_revision` is given and the cached revision (or `-1` if
+        the doc is not cached) differs from it, another process has published
+        the doc first, so nothing is changed and `False` is returned.
+        """
+        encoded = _encode_key(key)
+
+        if not isinstance(doc, str):
+            raise TypeError("`doc` must be string")
+
+        if not isinstance(revision, int) or not 0 <= revision < 2**64:
+            raise ValueError("invalid revision")
+
+        data = doc.encode()
+        size = _DATA_HEADER.size + len(data)
+        if size > self.max_bytes:
+            raise ValueError("doc exceeds max_bytes")
+
+        with self._locked():
+            idx = self._find(encoded)
+            if expected_revision is not None:
+                cached_revision = self._slot(idx)[4] if idx >= 0 else -1
+                if cached_revision != expected_revision:
+                    return False
+
+            self._publish(idx, encoded, revision, data)
+        return True
+
+    def apply(
+        self,
+        key: str,
+        ot_raw_list: _OTRawInputSeq,
+        *,
+        check_unoptimized: bool = True,
+    ) -> int:
+        """Apply ots to the cached doc, publish it and return its revision
+
+        The doc is read, changed and published under the lock, so concurrent
+        applies are serialized. `KeyError` is raised if the doc is not cached.
+        """
+        encoded = _encode_key(key)
+        with self._locked():
+            idx = self._find(encoded)
+            if idx < 0:
+                raise KeyError(key)
+
+            with DocumentView(_open_segment(self._segment_name(idx))) as view:
+                revision = view.revision
+                doc = view.text
+
+            data = _apply(
+                doc, ot_raw_list, check_unoptimized=check_unoptimized
+            ).encode()
+            if _DATA_HEADER.size + len(data) > self.max_bytes:
+                raise ValueError("doc exceeds max_bytes")
+
+            self._publish(idx, encoded, revision + 1, data)
+        return revision + 1
+
+    def discard(self, key: str) -> bool:
+        """Remove the doc from the cache and return whether it was cached"""
+        encoded = _encode_key(key)
+        with self._locked():
+            idx = self._find(encoded)
+            if idx < 0:
+                return False
+            self._evict(idx, count=False)
+        return True
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        # `flock` does not exclude threads sharing the file descriptor
+        with self._thread_lock:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _header(self) -> tuple[bytes, int, int, int, int, int, int]:
+        return _DIRECTORY_HEADER.unpack_from(self._shm.buf)
+
+    def _update_header(
+        self, *, used_bytes: int = 0, clock: int = 0, evictions: int = 0
+    ) -> None:
+        magic, version, max_docs, max_bytes, *counters = self._header()
+        _DIRECTORY_HEADER.pack_into(
+            self._shm.buf,
+            0,
+            magic,
+            version,
+            max_docs,
+            max_bytes,
+            counters[0] + used_bytes,
+            counters[1] + clock,
+            counters[2] + evictions,
+        )
+
+    def _slot_offset(self, idx: int) -> int:
+        return _DIRECTORY_HEADER.size + _SLOT.size * idx
+
+    def _slot(self, idx: int) -> tuple[int, int, bytes, int, int, int, int]:
+        return _SLOT.unpack_from(self._shm.buf, self._slot_offset(idx))
+
+    def _find(self, encoded: bytes) -> int:
+        for idx, (state, key_len, key, *_) in enumerate(
+            _SLOT.iter_unpack(
+                self._shm.buf[self._slot_offset(0) : self._slot_offset(self.max_docs)]
+            )
+        ):
+            if state == _SLOT_USED and key[:key_len] == encoded:
+                return idx
+        return -1
+
+    def _segment_name(self, idx: int, generation: Optional[int] = None) -> str:
+        if generation is None:
+            generation = self._slot(idx)[3]
+        return f"{self.name}-{idx:x}-{generation:x}"
+
+    def _touch(self, idx: int) -> None:
+        clock = self._header()[5] + 1
+        self._update_header(clock=1)
+
+        slot = list(self._slot(idx))
+        slot[6] = clock
+        _SLOT.pack_into(self._shm.buf, self._slot_offset(idx), *slot)
+
+    def _evict(self, idx: int, *, count: bool = True) -> None:
+        state, _, _, generation, _, nbytes, _ = self._slot(idx)
+        _unlink_segment(self._segment_name(idx, generation))
+
+        # the generation is kept so that a reused slot gets a new segment name
+        _SLOT.pack_into(
+            self._shm.buf,
+            self._slot_offset(idx),
+            _SLOT_EMPTY,
+            0,
+            b"",
+            generation,
+            0,
+            0,
+            0,
+        )
+        self._update_header(used_bytes=-nbytes, evictions=1 if count else 0)
+
+    def _lru(self, excluded: int) -> int:
+        lru_idx = -1
+        lru_clock = 0
+        for idx in range(self.max_docs):
+            state, *_, last_used = self._slot(idx)
+            if state == _SLOT_USED and idx != excluded:
+                if lru_idx < 0 or last_used < lru_clock:
+                    lru_idx = idx
+                    lru_clock = last_used
+        return lru_idx
+
+    def _publish(self, idx: int, encoded: bytes, revision: int, data: bytes) -> None:
+        size = _DATA_HEADER.size + len(data)
+        old_nbytes = self._slot(idx)[5] if idx >= 0 else 0
+
+        while self._header()[4] - old_nbytes + size > self.max_bytes:
+            self._evict(self._lru(idx))
+
+        if idx < 0:
+            idx = next(
+                (i for i in range(self.max_docs) if self._slot(i)[0] == _SLOT_EMPTY),
+                -1,
+            )
+            if idx < 0:
+                idx = self._lru(-1)
+                self._evict(idx)
+
+        state, _, _, generation, *_ = self._slot(idx)
+        old_name = self._segment_name(idx, generation) if state == _SLOT_USED else None
+
+        generation += 1
+        shm = _open_segment(self._segment_name(idx, generation), create=True, size=size)
+        try:
+            _DATA_HEADER.pack_into(
+                shm.buf, 0, _DATA_MAGIC, _VERSION, revision, len(data)
+            )
+            shm.buf[_DATA_HEADER.size : size] = data
+        finally:
+            shm.close()
+
+        _SLOT.pack_into(
+            self._shm.buf,
+            self._slot_offset(idx),
+            _SLOT_USED,
+            len(encoded),
+            encoded,
+            generation,
+            revision,
+            size,
+            0,
+        )
+        self._update_header(used_bytes=size - old_nbytes)
+        self._touch(idx)
+
+        if old_name is not None:
+            _unlink_segment(old_name)
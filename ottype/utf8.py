@@ -0,0 +1,197 @@
+"""OT operations on UTF-8 encoded docs
+
+Same as the functions of `ottype`, except that skips and the lengths of
+inserts and deletes count UTF-8 bytes instead of characters, and docs are
+UTF-8 encoded `bytes`, `bytearray` or `memoryview`. OTs still carry `str`,
+so the same OTs can be exchanged with clients as JSON.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Literal, Union
+
+from . import check
+from . import compose as _compose
+from . import transform as _transform
+from .core import (
+    _OTRawInputSeq,
+    _OTRawOutputSeq,
+    _OTTypeActionDelete,
+    _OTTypeActionInsert,
+    _OTTypeActionSkip,
+    _resolve_ot,
+)
+
+_BytesDoc = Union[bytes, bytearray, memoryview]
+
+
+def _is_boundary(view: memoryview, pos: int) -> bool:
+    """Whether `pos` is not inside a UTF-8 character of `view`"""
+    return pos == len(view) or view[pos] & 0xC0 != 0x80
+
+
+def _edit(
+    view: memoryview, ot_raw_list: _OTRawInputSeq, inverse: bool
+) -> tuple[int, bytes, int]:
+    """Edit `view` by ots
+
+    Return `(start, new, end)` where `view[start:end]` is replaced by `new`.
+    The leading skip is not copied.
+    """
+    keep_action, drop_action = _OTTypeActionInsert, _OTTypeActionDelete
+    if inverse:
+        keep_action, drop_action = drop_action, keep_action
+
+    parts: list[Union[bytes, memoryview]] = []
+    start = 0
+    pos = 0
+
+    for ot_raw in ot_raw_list:
+        ot_action, ot_arg = _resolve_ot(ot_raw)
+
+        if ot_action == _OTTypeActionSkip:
+            assert isinstance(ot_arg, int)
+
+            if ot_arg > len(view) - pos:
+                raise ValueError("skip exceeds doc length")
+
+            if not parts and pos == start:
+                start += ot_arg
+            else:
+                parts.append(view[pos : pos + ot_arg])
+            pos += ot_arg
+
+            if not _is_boundary(view, pos):
+                raise ValueError("skip ends inside a UTF-8 character")
+
+        elif ot_action == keep_action:
+            assert isinstance(ot_arg, str)
+
+            parts.append(ot_arg.encode())
+
+        elif ot_action == drop_action:
+            assert isinstance(ot_arg, str)
+
+            encoded = ot_arg.encode()
+            doc_slice = view[pos : pos + len(encoded)]
+            if doc_slice != encoded:
+                raise ValueError(
+                    "inconsistent delete (doc, OT.arg)", bytes(doc_slice), encoded
+                )
+            pos += len(encoded)
+
+    return start, b"".join(parts), pos
+
+
+def _apply(
+    doc: _BytesDoc, ot_raw_list: _OTRawInputSeq, check_unoptimized: bool, inverse: bool
+) -> _BytesDoc:
+    if not isinstance(doc, (bytes, bytearray, memoryview)):
+        raise TypeError("`doc` must be bytes, bytearray or memoryview")
+
+    if not isinstance(ot_raw_list, (list, tuple)):
+        raise TypeError("`ot_raw_list` must be a list or tuple")
+
+    if not check(ot_raw_list, check_unoptimized=check_unoptimized):
+        raise ValueError("invalid OTs")
+
+    with memoryview(doc) as raw_view, raw_view.cast("B") as view:
+        start, new, end = _edit(view, ot_raw_list, inverse)
+
+        if not isinstance(doc, bytearray):
+            return b"".join([view[:start], new, view[end:]])
+
+    # the edit is validated as a whole before `doc` is changed
+    doc[start:end] = new
+    return doc
+
+
+def apply(
+    doc: _BytesDoc,
+    ot_raw_list: _OTRawInputSeq,
+    *,
+    check_unoptimized: bool = True,
+) -> _BytesDoc:
+    """Apply ots to UTF-8 encoded doc
+
+    A `bytearray` is edited in place and returned, otherwise new `bytes` is
+    returned. Only the bytes between the first and the last edit are copied.
+    """
+    return _apply(doc, ot_raw_list, check_unoptimized, False)
+
+
+def inverse_apply(
+    doc: _BytesDoc,
+    ot_raw_list: _OTRawInputSeq,
+    *,
+    check_unoptimized: bool = True,
+) -> _BytesDoc:
+    """Inversely apply ots to UTF-8 encoded doc
+
+    A `bytearray` is edited in place and returned, otherwise new `bytes` is
+    returned.
+    """
+    return _apply(doc, ot_raw_list, check_unoptimized, True)
+
+
+def _to_byte_ots(ot_raw_list: _OTRawInputSeq) -> list[Any]:
+    """Map each byte of the UTF-8 encoded OT args to a character
+
+    Splitting the mapped args by a length is splitting the UTF-8 encoded args
+    by the same number of bytes. Unexpected OTs are kept for `check`.
+    """
+    if not isinstance(ot_raw_list, (list, tuple)):
+        raise TypeError("`ot_raw_list` must be a list or tuple")
+
+    byte_ots: list[Any] = []
+    for ot_raw in ot_raw_list:
+        if isinstance(ot_raw, str):
+            ot_raw = ot_raw.encode().decode("latin-1")
+        elif isinstance(ot_raw, dict) and isinstance(ot_raw.get("d"), str):
+            ot_raw = {"d": ot_raw["d"].encode().decode("latin-1")}
+        elif (
+            isinstance(ot_raw, tuple)
+            and len(ot_raw) == 2
+            and ot_raw[0] in (2, 3)
+            and isinstance(ot_raw[1], str)
+        ):
+            ot_raw = (ot_raw[0], ot_raw[1].encode().decode("latin-1"))
+        byte_ots.append(ot_raw)
+
+    return byte_ots
+
+
+def _from_byte_ots(byte_ots: _OTRawOutputSeq) -> _OTRawOutputSeq:
+    try:
+        ot_raw_list: list[Any] = []
+        for ot_raw in byte_ots:
+            if isinstance(ot_raw, str):
+                ot_raw = ot_raw.encode("latin-1").decode()
+            elif isinstance(ot_raw, dict):
+                ot_raw = {"d": ot_raw["d"].encode("latin-1").decode()}
+            ot_raw_list.append(ot_raw)
+
+    except UnicodeDecodeError:
+        raise ValueError("OT splits a UTF-8 character") from None
+
+    return ot_raw_list
+
+
+def transform(
+    ot_raw_list_1: _OTRawInputSeq,
+    ot_raw_list_2: _OTRawInputSeq,
+    side: Literal["left", "right"],
+) -> _OTRawOutputSeq:
+    """Transform `ot_raw_list_1` by `ot_raw_list_2` counting UTF-8 bytes"""
+    return _from_byte_ots(
+        _transform(_to_byte_ots(ot_raw_list_1), _to_byte_ots(ot_raw_list_2), side)
+    )
+
+
+def compose(
+    ot_raw_list_1: _OTRawInputSeq, ot_raw_list_2: _OTRawInputSeq
+) -> _OTRawOutputSeq:
+    """Compose `ot_raw_list_1` and `ot_raw_list_2` counting UTF-8 bytes"""
+    return _from_byte_ots(
+        _compose(_to_byte_ots(ot_raw_list_1), _to_byte_ots(ot_raw_list_2))
+    )
@@ -7,6 +7,7 @@ TARGET_PYBIN=(
     "cp311-cp311"
     "cp312-cp312"
     "cp313-cp313"
+    "cp313-cp313t"
     "pp310-pypy310_pp73"
     "pp311-pypy311_pp73"
 )
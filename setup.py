@@ -1,18 +1,69 @@
 import os
+import platform
+import shutil
+import sysconfig
+
 from setuptools import Extension, setup
 
 NO_EXTENSIONS = os.getenv("NO_EXTENSIONS", "FALSE").lower() == "true"
 
+# `core_mypyc` is the pure python `core` compiled by mypyc, which is used when
+# `core_boost` cannot be loaded
+NO_MYPYC = os.getenv("NO_MYPYC", "FALSE").lower() == "true"
+
+# per-module state lets `core_boost` be imported in subinterpreters with their
+# own GIL, but every access to module globals becomes a lookup
+SUBINTERPRETERS = os.getenv("SUBINTERPRETERS", "FALSE").lower() == "true"
+
 try:
     from Cython.Build import cythonize
 except ImportError:
     NO_EXTENSIONS = True
 
+try:
+    from mypyc.build import mypycify
+except ImportError:
+    NO_MYPYC = True
+
+# mypyc supports neither other implementations nor the free-threaded build
+if platform.python_implementation() != "CPython":
+    NO_MYPYC = True
+if sysconfig.get_config_var("Py_GIL_DISABLED"):
+    NO_MYPYC = True
+
+
+def mypyc_extensions() -> list[Extension]:
+    # mypyc names the module after its path, so compile a copy of `core`
+    src_dir = os.path.join("build", "mypyc_src", "ottype")
+    os.makedirs(src_dir, exist_ok=True)
+    open(os.path.join(src_dir, "__init__.py"), "w").close()
+    shutil.copyfile(
+        os.path.join("ottype", "core.py"), os.path.join(src_dir, "core_mypyc.py")
+    )
+
+    return mypycify(
+        [os.path.join(src_dir, "core_mypyc.py")],
+        opt_level="3",
+        target_dir=os.path.join("build", "mypyc"),
+    )
+
+
 setup(
     name="python-ottype",
     ext_modules=(
-        cythonize([Extension("ottype.core_boost", ["ottype/core_boost.pyx"])])
+        cythonize(
+            [
+                Extension(
+                    "ottype.core_boost",
+                    ["ottype/core_boost.pyx"],
+                    define_macros=(
+                        [("CYTHON_USE_MODULE_STATE", "1")] if SUBINTERPRETERS else []
+                    ),
+                )
+            ]
+        )
         if not NO_EXTENSIONS
         else []
-    ),
+    )
+    + (mypyc_extensions() if not NO_MYPYC else []),
 )
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import random
+from typing import Any
+
+import pytest
+
+from ottype import apply, blame, normalize, transform
+
+from . import utils
+
+FUZZ_TEST_COUNT = 100
+FUZZ_TEST_INIT_DOC_LENGTH = 100
+FUZZ_TEST_OTS_LENGTH = 10
+FUZZ_TEST_LOG_LENGTH = 10
+
+
+def apply_naive(authors: list[int], ot_raw_list: Any, author: int) -> list[int]:
+    new_authors: list[int] = []
+    pos = 0
+    for ot_raw in ot_raw_list:
+        if isinstance(ot_raw, int):
+            new_authors += authors[pos : pos + ot_raw]
+            pos += ot_raw
+        elif isinstance(ot_raw, str):
+            new_authors += [author] * len(ot_raw)
+        else:
+            pos += len(ot_raw["d"])
+    return new_authors + authors[pos:]
+
+
+def assert_map(author_map: blame.AuthorMap, authors: list[int]) -> None:
+    assert len(author_map) == len(authors)
+    assert [author_map.author_at(i) for i in range(len(authors))] == authors
+
+    spans = author_map.spans()
+    for (_, end, author), (start, _, next_author) in zip(spans, spans[1:]):
+        assert end == start
+        assert author != next_author
+
+
+def test_author_map() -> None:
+    with pytest.raises(ValueError):
+        blame.AuthorMap(-1)
+
+    author_map = blame.AuthorMap()
+    assert len(author_map) == 0
+    assert author_map.spans() == []
+
+    with pytest.raises(IndexError):
+        author_map.author_at(0)
+
+    author_map = blame.AuthorMap(5, 1)
+    assert author_map.spans() == [(0, 5, 1)]
+
+    author_map.apply([2, "xy"], 2)
+    assert author_map.spans() == [(0, 2, 1), (2, 4, 2), (4, 7, 1)]
+
+    author_map.apply([1, {"d": "bxy"}, "z"], 3)
+    assert author_map.spans() == [(0, 1, 1), (1, 2, 3), (2, 5, 1)]
+
+    author_map.apply([1, {"d": "z"}], 3)
+    assert author_map.spans() == [(0, 4, 1)]
+
+    with pytest.raises(TypeError):
+        author_map.apply(1234, 1)  # type: ignore
+
+    with pytest.raises(ValueError):
+        author_map.apply([3, 4], 1)
+
+    with pytest.raises(ValueError):
+        author_map.apply(["x"], -1)
+
+    with pytest.raises(ValueError):
+        author_map.apply([5, "x"], 1)
+
+    # the map is unchanged by ots not fitting the doc
+    with pytest.raises(ValueError):
+        author_map.apply(["x", 2, {"d": "xyz"}], 1)
+    assert author_map.spans() == [(0, 4, 1)]
+
+
+def test_author_map_bytes() -> None:
+    author_map = blame.AuthorMap(5, 1)
+    author_map.apply([2, "xy"], 2**64 - 1)
+
+    data = author_map.to_bytes()
+    assert len(data) == 16 + 3 * 16
+    assert blame.AuthorMap.from_bytes(data).spans() == author_map.spans()
+
+    with pytest.raises(ValueError):
+        blame.AuthorMap.from_bytes(b"")
+
+    with pytest.raises(ValueError):
+        blame.AuthorMap.from_bytes(b"x" * 16)
+
+    with pytest.raises(ValueError):
+        blame.AuthorMap.from_bytes(data[:-1])
+
+
+def test_author_map_trailing_skip(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(blame, "_BLOCK_RUNS", 2)
+
+    author_map = blame.AuthorMap(1, 0)
+    authors = [0]
+    for i in range(20):
+        author_map.apply([len(author_map), "x"], i % 7 + 1)
+        authors = apply_naive(authors, [len(authors), "x"], i % 7 + 1)
+
+    # unoptimized ots with a trailing skip past the rewritten blocks
+    ot_raw_list: list[Any] = [10, "a", len(author_map) - 10]
+    author_map.apply(ot_raw_list, 99, check_unoptimized=False)
+    authors = apply_naive(authors, ot_raw_list, 99)
+    assert_map(author_map, authors)
+
+
+@pytest.mark.parametrize("block_runs", [2, 256])
+def test_author_map_fuzz(block_runs: int, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(blame, "_BLOCK_RUNS", block_runs)
+
+    for _ in range(FUZZ_TEST_COUNT):
+        doc = utils.make_random_doc(random.randint(0, FUZZ_TEST_INIT_DOC_LENGTH))
+        author_map = blame.AuthorMap(len(doc))
+        authors = [0] * len(doc)
+
+        for _ in range(FUZZ_TEST_LOG_LENGTH):
+            ot_raw_list = normalize(utils.make_random_ots(doc, FUZZ_TEST_OTS_LENGTH))
+            author = random.randint(0, 3)
+
+            author_map.apply(ot_raw_list, author)
+            authors = apply_naive(authors, ot_raw_list, author)
+            doc = apply(doc, ot_raw_list)
+
+            assert_map(author_map, authors)
+
+        data = author_map.to_bytes()
+        assert blame.AuthorMap.from_bytes(data).spans() == author_map.spans()
+
+
+def test_author_map_transform_fuzz() -> None:
+    for _ in range(FUZZ_TEST_COUNT):
+        doc = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH)
+        ots_1 = normalize(utils.make_random_ots(doc, FUZZ_TEST_OTS_LENGTH))
+        ots_2 = normalize(utils.make_random_ots(doc, FUZZ_TEST_OTS_LENGTH))
+
+        author_map_1 = blame.AuthorMap(len(doc))
+        author_map_1.apply(ots_1, 1)
+        author_map_1.apply(transform(ots_2, ots_1, "left"), 2)
+
+        author_map_2 = blame.AuthorMap(len(doc))
+        author_map_2.apply(ots_2, 2)
+        author_map_2.apply(transform(ots_1, ots_2, "right"), 1)
+
+        assert author_map_1.spans() == author_map_2.spans()
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from ottype import apply, broadcast, normalize
+
+from . import utils
+
+FUZZ_TEST_COUNT = 100
+FUZZ_TEST_INIT_DOC_LENGTH = 100
+FUZZ_TEST_OTS_LENGTH = 10
+FUZZ_TEST_LOG_LENGTH = 30
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_outgoing_queue() -> None:
+    with pytest.raises(ValueError):
+        broadcast.OutgoingQueue(max_ops=0)
+
+    with pytest.raises(ValueError):
+        broadcast.OutgoingQueue(max_age=-1)
+
+    queue = broadcast.OutgoingQueue(10)
+    assert len(queue) == 0
+    assert queue.start_revision == queue.end_revision == 10
+
+    with pytest.raises(IndexError):
+        queue.pop()
+
+    with pytest.raises(TypeError):
+        queue.push(1234)  # type: ignore
+
+    with pytest.raises(ValueError):
+        queue.push([3, 4])
+
+    assert queue.push(["a"]) == 10
+    assert queue.push([1, "b"]) == 11
+    assert queue.push([2, "c"]) == 12
+    assert len(queue) == 3
+    assert (queue.start_revision, queue.end_revision) == (10, 13)
+
+    assert queue.pop() == (10, 11, ["a"])
+    assert queue.nbytes == len('[1,"b"]') + len('[2,"c"]')
+
+    queue.coalesce()
+    assert queue.drain() == [(11, 13, [1, "bc"])]
+    assert queue.ops_merged == 1
+    assert queue.bytes_saved == len('[1,"b"]') + len('[2,"c"]') - len('[1,"bc"]')
+    assert queue.nbytes == 0
+    assert queue.start_revision == queue.end_revision == 13
+
+
+def test_outgoing_queue_thresholds() -> None:
+    queue = broadcast.OutgoingQueue(max_ops=2)
+    queue.push(["a"])
+    queue.push([1, "b"])
+    assert len(queue) == 2
+
+    queue.push([2, "c"])
+    assert queue.drain() == [(0, 3, ["abc"])]
+    assert queue.ops_merged == 2
+
+    clock = FakeClock()
+    queue = broadcast.OutgoingQueue(max_age=1.0, clock=clock)
+    queue.push(["a"])
+    clock.now = 0.5
+    queue.push([1, "b"])
+    assert len(queue) == 2
+
+    # the oldest ots has waited long enough
+    clock.now = 1.0
+    queue.push([2, "c"])
+    assert len(queue) == 1
+
+    # the composed ots keeps the time of the oldest ots
+    queue.push([3, "d"])
+    assert queue.drain() == [(0, 4, ["abcd"])]
+    assert queue.ops_merged == 3
+
+
+def test_outgoing_queue_fuzz() -> None:
+    for _ in range(FUZZ_TEST_COUNT):
+        doc = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH)
+        docs = [doc]
+
+        queue = broadcast.OutgoingQueue(max_ops=random.randint(1, 5))
+        received = []
+
+        for _ in range(FUZZ_TEST_LOG_LENGTH):
+            ot_raw_list = normalize(utils.make_random_ots(doc, FUZZ_TEST_OTS_LENGTH))
+            doc = apply(doc, ot_raw_list)
+            docs.append(doc)
+
+            queue.push(ot_raw_list)
+            if random.random() < 0.2:
+                received += queue.drain()
+        received += queue.drain()
+
+        revision = 0
+        for start_revision, end_revision, entry_ot_raw_list in received:
+            assert start_revision == revision
+            assert apply(docs[start_revision], entry_ot_raw_list) == docs[end_revision]
+            revision = end_revision
+        assert revision == FUZZ_TEST_LOG_LENGTH
+        assert len(received) + queue.ops_merged == FUZZ_TEST_LOG_LENGTH
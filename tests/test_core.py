@@ -1,9 +1,18 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from json import JSONDecodeError
+from typing import TYPE_CHECKING, Callable, Union
 
 import pytest
 
+import ottype
 from ottype import core
 
 from . import utils
@@ -13,6 +22,13 @@ FUZZ_TEST_INIT_DOC_LENGTH = 100
 FUZZ_TEST_OTS_LENGTH = 20
 
 CORE_IMPL = [core]
+try:
+    from ottype import core_mypyc  # type: ignore
+
+    CORE_IMPL.append(core_mypyc)
+except ImportError:
+    pass
+
 try:
     from ottype import core_boost  # type: ignore
 
@@ -167,6 +183,58 @@ def test__Taker(core_impl) -> None:  # type: ignore
     assert taker_4.peak_action() == core._OTTypeActionNop
 
 
+def test__Appender_view(core_impl) -> None:  # type: ignore
+    if TYPE_CHECKING:
+        core_impl = core
+
+    _Appender = core_impl._Appender
+
+    ots_1: list[core._OTType] = []
+    appender_1 = _Appender(ots_1)
+
+    appender_1.append_view(None)
+    appender_1.append_view((core._OTTypeActionSkip, "", 2, 6))
+    appender_1.append_view((core._OTTypeActionSkip, "", 0, 3))
+    appender_1.append_view((core._OTTypeActionInsert, "qwer", 0, 4))
+    appender_1.flush()
+    assert ots_1 == [OTSkip(7), OTInsert("qwer")]
+
+    appender_1.append_view((core._OTTypeActionInsert, "asdf", 1, 3))
+    appender_1.append_view((core._OTTypeActionDelete, "zxcv", 0, 2))
+    appender_1.append_view((core._OTTypeActionDelete, "zxcv", 2, 4))
+    assert ots_1 == [OTSkip(7), OTInsert("qwersd")]
+
+    appender_1.append(OTDelete("ty"))
+    assert ots_1 == [OTSkip(7), OTInsert("qwersd"), OTDelete("zxcvty")]
+
+    source = "a" * 100
+    ots_2: list[core._OTType] = []
+    appender_2 = _Appender(ots_2)
+    appender_2.append_view((core._OTTypeActionInsert, source, 0, 100))
+    appender_2.flush()
+    assert ots_2[0][1] is source
+
+
+def test__Taker_view(core_impl) -> None:  # type: ignore
+    if TYPE_CHECKING:
+        core_impl = core
+
+    _Taker = core_impl._Taker
+
+    source = "asdf"
+    ots_1: list[core._OTRawInputType] = [3, source, {"d": "qwer"}]
+    taker_1 = _Taker(ots_1)
+    assert taker_1.take_view(1) == (core._OTTypeActionSkip, "", 0, 1)
+    assert taker_1.take_view(5) == (core._OTTypeActionSkip, "", 1, 3)
+    view = taker_1.take_view(1)
+    assert view == (core._OTTypeActionInsert, "asdf", 0, 1)
+    assert view[1] is source
+    assert taker_1.take_view(1, "i") == (core._OTTypeActionInsert, "asdf", 1, 4)
+    assert taker_1.take_view(2, "d") == (core._OTTypeActionDelete, "qwer", 0, 4)
+    assert taker_1.take_view(2) == (core._OTTypeActionSkip, "", 0, 2)
+    assert taker_1.take_view(-1) is None
+
+
 def test__trim(core_impl) -> None:  # type: ignore
     if TYPE_CHECKING:
         core_impl = core
@@ -247,6 +315,147 @@ def test_apply_fuzz(core_impl, input_cls) -> None:  # type:ignore
         apply(doc, random_ot_raw_list)
 
 
+def test_apply_chain(core_impl, input_cls) -> None:  # type:ignore
+    if TYPE_CHECKING:
+        core_impl = core
+        input_cls = list
+
+    apply_chain = core_impl.apply_chain
+
+    with pytest.raises(TypeError):
+        apply_chain(None, [])
+
+    with pytest.raises(TypeError):
+        apply_chain("", 12345)
+
+    with pytest.raises(TypeError):
+        apply_chain("", [12345])
+
+    with pytest.raises(ValueError):
+        apply_chain("", input_cls([input_cls([3, 4])]))
+
+    assert apply_chain("abcde", input_cls([])) == "abcde"
+    assert (
+        apply_chain(
+            "abcde",
+            input_cls(
+                [
+                    input_cls([2, "qq", {"d": "c"}, 1, "w"]),
+                    input_cls([{"d": "ab"}, 2, "z"]),
+                    input_cls(["x"]),
+                ]
+            ),
+        )
+        == "xqqzdwe"
+    )
+    assert (
+        apply_chain(
+            "abcde",
+            input_cls([input_cls([1, 1, "q"]), input_cls(["x", "y"])]),
+            check_unoptimized=False,
+        )
+        == "xyabqcde"
+    )
+
+    with pytest.raises(ValueError):
+        apply_chain("ab", input_cls([input_cls(["x"]), input_cls([{"d": "y"}])]))
+
+    with pytest.raises(ValueError):
+        apply_chain("ab", input_cls([input_cls(["x"]), input_cls([4, "y"])]))
+
+    # same as applying each ots, even if composing them would fit the doc
+    with pytest.raises(ValueError):
+        apply_chain("ab", input_cls([input_cls([5, "x"]), input_cls([5, {"d": "x"}])]))
+
+
+def test_apply_chain_fuzz(core_impl, input_cls) -> None:  # type:ignore
+    if TYPE_CHECKING:
+        core_impl = core
+
+    apply = core_impl.apply
+    apply_chain = core_impl.apply_chain
+    normalize = core_impl.normalize
+
+    for _ in range(FUZZ_TEST_COUNT // 10):
+        doc = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH)
+
+        new_doc = doc
+        ot_raw_lists = []
+        for _ in range(random.randint(1, 20)):
+            ot_raw_list = normalize(
+                input_cls(utils.make_random_ots(new_doc, FUZZ_TEST_OTS_LENGTH))
+            )
+            new_doc = apply(new_doc, ot_raw_list)
+            ot_raw_lists.append(ot_raw_list)
+
+        assert apply_chain(doc, input_cls(ot_raw_lists)) == new_doc
+
+
+def test_apply_batch(core_impl, input_cls) -> None:  # type:ignore
+    if TYPE_CHECKING:
+        core_impl = core
+        input_cls = list
+
+    apply_batch = core_impl.apply_batch
+
+    with pytest.raises(TypeError):
+        apply_batch(None, [])
+
+    with pytest.raises(TypeError):
+        apply_batch([], 12345)
+
+    with pytest.raises(ValueError):
+        apply_batch(["a", "b"], input_cls([input_cls([])]))
+
+    assert apply_batch([], input_cls([])) == []
+
+    results = apply_batch(
+        ["abcde", "abcde", "ab", None, "abc", "abcde"],
+        input_cls(
+            [
+                input_cls([2, "qq", {"d": "c"}, 1, "w"]),
+                input_cls([3, 4]),
+                input_cls([{"d": "x"}]),
+                input_cls(["x"]),
+                12345,
+                input_cls([1, 1, "q"]),
+            ]
+        ),
+    )
+    assert results[0] == "abqqdwe"
+    assert isinstance(results[1], ValueError)
+    assert isinstance(results[2], ValueError)
+    assert isinstance(results[3], TypeError)
+    assert isinstance(results[4], TypeError)
+    assert isinstance(results[5], ValueError)
+
+    assert apply_batch(
+        ["abcde"], input_cls([input_cls([1, 1, "q"])]), check_unoptimized=False
+    ) == ["abqcde"]
+
+
+def test_apply_batch_fuzz(core_impl, input_cls) -> None:  # type:ignore
+    if TYPE_CHECKING:
+        core_impl = core
+
+    apply = core_impl.apply
+    apply_batch = core_impl.apply_batch
+    normalize = core_impl.normalize
+
+    docs = [
+        utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH)
+        for _ in range(FUZZ_TEST_COUNT // 10)
+    ]
+    ot_raw_lists = [
+        normalize(input_cls(utils.make_random_ots(doc, FUZZ_TEST_OTS_LENGTH)))
+        for doc in docs
+    ]
+
+    assert apply_batch(docs, input_cls(ot_raw_lists)) == [
+        apply(doc, ot_raw_list) for doc, ot_raw_list in zip(docs, ot_raw_lists)
+    ]
+
+
 def test_inverse_apply(core_impl, input_cls) -> None:  # type:ignore
     if TYPE_CHECKING:
         core_impl = core
@@ -290,6 +499,65 @@ def test_inverse_apply_fuzz(core_impl, input_cls) -> None:  # type:ignore
         assert doc == inverse_apply(new_doc, random_ot_raw_list)
 
 
+def test_op_lengths(core_impl, input_cls) -> None:  # type:ignore
+    if TYPE_CHECKING:
+        core_impl = core
+        input_cls = list
+
+    op_lengths = core_impl.op_lengths
+
+    with pytest.raises(TypeError):
+        op_lengths(12345)
+
+    with pytest.raises(ValueError):
+        op_lengths(input_cls([3, 4]))
+
+    assert op_lengths(input_cls([])) == (0, 0)
+    assert op_lengths(input_cls([2, "qq", {"d": "c"}, 1, "w"])) == (4, 6)
+    assert op_lengths(input_cls([3, 4]), check_unoptimized=False) == (7, 7)
+
+
+def test_op_lengths_fuzz(core_impl, input_cls) -> None:  # type:ignore
+    if TYPE_CHECKING:
+        core_impl = core
+
+    apply = core_impl.apply
+    normalize = core_impl.normalize
+    op_lengths = core_impl.op_lengths
+
+    for _ in range(FUZZ_TEST_COUNT):
+        doc = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH)
+        random_ot_raw_list = normalize(
+            input_cls(utils.make_random_ots(doc, FUZZ_TEST_OTS_LENGTH))
+        )
+
+        base_len, target_len = op_lengths(random_ot_raw_list)
+        assert base_len <= len(doc)
+        assert len(apply(doc, random_ot_raw_list)) == len(doc) - base_len + target_len
+
+
+def test_op_stats(core_impl, input_cls) -> None:  # type:ignore
+    if TYPE_CHECKING:
+        core_impl = core
+        input_cls = list
+
+    op_stats = core_impl.op_stats
+
+    with pytest.raises(TypeError):
+        op_stats(12345)
+
+    with pytest.raises(ValueError):
+        op_stats(input_cls(["as", "df"]))
+
+    assert op_stats(input_cls([2, "qq", {"d": "c"}, 1, "w"])) == {
+        "base_len": 4,
+        "target_len": 6,
+        "inserted": 3,
+        "deleted": 1,
+        "components": 5,
+    }
+
+
 def test_normalize(core_impl, input_cls) -> None:  # type:ignore
     if TYPE_CHECKING:
         core_impl = core
@@ -403,6 +671,248 @@ def test_compose_fuzz(core_impl, input_cls) -> None:  # type:ignore
         assert doc_3 == doc_3_composed
 
 
+def test_merge_histories(core_impl) -> None:  # type:ignore
+    if TYPE_CHECKING:
+        core_impl = core
+
+    merge_histories = core_impl.merge_histories
+
+    with pytest.raises(TypeError):
+        merge_histories(1234, [], "left")
+
+    with pytest.raises(TypeError):
+        merge_histories([], 1234, "left")
+
+    with pytest.raises(TypeError):
+        merge_histories([1234], [], "left")
+
+    with pytest.raises(ValueError):
+        merge_histories([], [], "up")
+
+    with pytest.raises(ValueError):
+        merge_histories([], [[3, 4]], "left")
+
+    assert merge_histories([], [], "left") == ([], [])
+    assert merge_histories([], [["x"], [1, "y"]], "left") == ([], ["xy"])
+    assert merge_histories([["a"]], [], "left") == ([["a"]], [])
+
+    local = [["a"], [1, "b"]]
+    remote = [["x"], [1, "y"]]
+    assert merge_histories(local, remote, "left") == ([["a"], [1, "b"]], [2, "xy"])
+    assert merge_histories(local, remote, "right") == ([[2, "a"], [3, "b"]], ["xy"])
+
+
+def test_merge_histories_fuzz(core_impl) -> None:  # type:ignore
+    if TYPE_CHECKING:
+        core_impl = core
+
+    apply = core_impl.apply
+    apply_chain = core_impl.apply_chain
+    merge_histories = core_impl.merge_histories
+    normalize = core_impl.normalize
+    transform = core_impl.transform
+
+    def make_random_history(doc: str) -> tuple[list[utils.OTRawListType], str]:
+        ot_raw_lists = []
+        for _ in range(random.randint(0, 5)):
+            ot_raw_list = normalize(utils.make_random_ots(doc, FUZZ_TEST_OTS_LENGTH))
+            doc = apply(doc, ot_raw_list)
+            ot_raw_lists.append(ot_raw_list)
+        return ot_raw_lists, doc
+
+    for _ in range(FUZZ_TEST_COUNT):
+        doc = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH)
+        local, local_doc = make_random_history(doc)
+        remote, remote_doc = make_random_history(doc)
+        side = random.choice(["left", "right"])
+        remote_side = "right" if side == "left" else "left"
+
+        rebased_local, remote_for_local = merge_histories(local, remote, side)
+
+        merged_doc = apply(local_doc, remote_for_local)
+        assert apply_chain(remote_doc, rebased_local) == merged_doc
+
+        # same as the pairwise transform grid
+        expected_rebased_local = []
+        for local_ot_raw_list in local:
+            transformed_remote = []
+            for remote_ot_raw_list in remote:
+                transformed_remote.append(
+                    transform(remote_ot_raw_list, local_ot_raw_list, remote_side)
+                )
+                local_ot_raw_list = transform(
+                    local_ot_raw_list, remote_ot_raw_list, side
+                )
+            expected_rebased_local.append(local_ot_raw_list)
+            remote = transformed_remote
+
+        assert rebased_local == expected_rebased_local
+        assert apply_chain(local_doc, remote) == merged_doc
+
+
+def test_iter_transform(core_impl) -> None:  # type:ignore
+    if TYPE_CHECKING:
+        core_impl = core
+
+    iter_transform = core_impl.iter_transform
+
+    with pytest.raises(TypeError):
+        iter_transform(1234, [3], "left")
+
+    with pytest.raises(TypeError):
+        iter_transform([3], "asdf", "left")
+
+    with pytest.raises(ValueError):
+        iter_transform([], [], "good")
+
+    assert list(iter_transform(iter(["a", 1, "b"]), iter([1, "x"]), "left")) == [
+        "a",
+        1,
+        "b",
+    ]
+
+    # ots are checked while consumed
+    results = iter_transform(iter([1, {"d": "a"}, 2, "b", 3, 4]), iter([]), "left")
+    assert next(results) == 1
+    with pytest.raises(ValueError):
+        list(results)
+
+    with pytest.raises(ValueError):
+        list(iter_transform(["a"], (ot for ot in [1, "x", -1]), "left"))
+
+
+def test_iter_compose(core_impl) -> None:  # type:ignore
+    if TYPE_CHECKING:
+        core_impl = core
+
+    iter_compose = core_impl.iter_compose
+
+    with pytest.raises(TypeError):
+        iter_compose(1234, [3])
+
+    with pytest.raises(TypeError):
+        iter_compose([3], {"d": "a"})
+
+    assert list(iter_compose(iter(["ab"]), iter([1, {"d": "b"}, "c"]))) == ["ac"]
+
+    results = iter_compose(iter([{"d": "a"}, 1, "b"]), iter([1, {"d": "x"}]))
+    assert next(results) == {"d": "a"}
+    with pytest.raises(ValueError):
+        next(results)
+
+
+def test_iter_transform_compose_fuzz(core_impl) -> None:  # type:ignore
+    if TYPE_CHECKING:
+        core_impl = core
+
+    apply = core_impl.apply
+    compose = core_impl.compose
+    iter_compose = core_impl.iter_compose
+    iter_transform = core_impl.iter_transform
+    normalize = core_impl.normalize
+    transform = core_impl.transform
+
+    for _ in range(FUZZ_TEST_COUNT):
+        doc = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH)
+        ot_raw_list_1 = normalize(utils.make_random_ots(doc, FUZZ_TEST_OTS_LENGTH))
+        ot_raw_list_2 = normalize(utils.make_random_ots(doc, FUZZ_TEST_OTS_LENGTH))
+        ot_raw_list_3 = normalize(
+            utils.make_random_ots(apply(doc, ot_raw_list_1), FUZZ_TEST_OTS_LENGTH)
+        )
+
+        for side in ["left", "right"]:
+            assert list(
+                iter_transform((ot for ot in ot_raw_list_1), iter(ot_raw_list_2), side)
+            ) == transform(ot_raw_list_1, ot_raw_list_2, side)
+
+        assert list(
+            iter_compose(iter(ot_raw_list_1), (ot for ot in ot_raw_list_3))
+        ) == compose(ot_raw_list_1, ot_raw_list_3)
+
+
+def test_loads_ops(core_impl) -> None:  # type:ignore
+    if TYPE_CHECKING:
+        core_impl = core
+
+    loads_ops = core_impl.loads_ops
+
+    assert loads_ops("[]") == []
+    assert loads_ops(b' [ 3 , "a\\u00e9" , { "d" : "x" } ] ') == [
+        OTSkip(3),
+        OTInsert("a\u00e9"),
+        OTDelete("x"),
+    ]
+    assert loads_ops('["\\ud83d\\ude00\\n", 1]', check_unoptimized=False) == [
+        OTInsert("\U0001f600\n"),
+        OTSkip(1),
+    ]
+
+    with pytest.raises(TypeError):
+        loads_ops(1234)
+
+    with pytest.raises(UnicodeDecodeError):
+        loads_ops(b'["\xff"]')
+
+    for data, msg, pos in [
+        ("", "Expecting '['", 0),
+        ("{}", "Expecting '['", 0),
+        ("[1", "Expecting ','", 2),
+        ('[1,"a"] x', "Extra data", 8),
+        ("[0]", "invalid OT-Skip", 1),
+        ('["a", -1]', "invalid OT-Skip", 6),
+        ('["a", 1.5]', "invalid OT-Skip", 6),
+        ('["a", 9223372036854775808]', "invalid OT-Skip", 6),
+        ('[""]', "invalid OT-Insert", 1),
+        ('[{"d": ""}]', "invalid OT-Delete", 1),
+        ('[{"i": "a"}]', "invalid OT-Delete", 1),
+        ('[{"d": "a", "e": "b"}]', "invalid OT-Delete", 1),
+        ("[null]", "unexpected OT structure", 1),
+        ('["a", "b"]', "unoptimized OTs", 6),
+        ('["a", 1]', "unoptimized OTs", 6),
+        ('["a\\q"]', "Invalid \\escape", 3),
+        ('["a', "Unterminated string starting at", 1),
+    ]:
+        with pytest.raises(JSONDecodeError) as exc_info:
+            loads_ops(data)
+        assert (exc_info.value.msg, exc_info.value.pos) == (msg, pos)
+
+
+def test_dumps_ops(core_impl, input_cls) -> None:  # type:ignore
+    if TYPE_CHECKING:
+        core_impl = core
+
+    dumps_ops = core_impl.dumps_ops
+    loads_ops = core_impl.loads_ops
+
+    assert dumps_ops(input_cls([])) == "[]"
+    assert dumps_ops(input_cls([3, 'a"\\\n\x01', OTDelete("b")])) == (
+        '[3,"a\\"\\\\\\n\\u0001",{"d":"b"}]'
+    )
+
+    with pytest.raises(TypeError):
+        dumps_ops(1234)
+
+    with pytest.raises(ValueError):
+        dumps_ops(input_cls([3]))
+
+    assert dumps_ops(input_cls([3]), check_unoptimized=False) == "[3]"
+
+    for _ in range(FUZZ_TEST_COUNT):
+        doc = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH, utils.UNICODE_ALPHABET)
+        ot_raw_list = core.normalize(
+            utils.make_random_ots(
+                doc, FUZZ_TEST_OTS_LENGTH, alphabet=utils.UNICODE_ALPHABET + '"\\\t'
+            )
+        )
+
+        data = dumps_ops(input_cls(ot_raw_list))
+        assert data == json.dumps(
+            ot_raw_list, ensure_ascii=False, separators=(",", ":")
+        )
+        assert core.normalize(loads_ops(data)) == ot_raw_list
+        assert loads_ops(json.dumps(ot_raw_list, indent=1)) == loads_ops(data)
+
+
 def test_diff() -> None:
     diff = core.diff
 
@@ -426,6 +936,127 @@ def test_diff_fuzz() -> None:
         assert apply(doc1, diff(doc1, doc2)) == doc2
 
 
+def test_diff_granularity() -> None:
+    diff = core.diff
+
+    with pytest.raises(TypeError):
+        diff(None, "")  # type: ignore
+
+    with pytest.raises(ValueError):
+        diff("", "", granularity="sentence")  # type: ignore
+
+    doc1 = "the quick brown fox\njumps over\n"
+    doc2 = "the quick red fox\njumps over\nthe dog\n"
+
+    assert diff(doc1, doc2, granularity="word") == [
+        10,
+        {"d": "b"},
+        1,
+        {"d": "own"},
+        "ed",
+        16,
+        "the dog\n",
+    ]
+    assert diff(doc1, doc2, granularity="line") == diff(doc1, doc2)
+
+    assert diff(doc1, doc2, granularity="word", cleanup=True) == [
+        10,
+        {"d": "brown"},
+        "red",
+        16,
+        "the dog\n",
+    ]
+
+
+def test_diff_granularity_fuzz() -> None:
+    apply = core.apply
+    diff = core.diff
+    check = core.check
+
+    for granularity in ["char", "word", "line"]:
+        for cleanup in [False, True]:
+            for _ in range(FUZZ_TEST_COUNT // 10):
+                doc1 = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH, "ab .\n")
+                doc2 = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH, "ab .\n")
+                ot_raw_list = diff(
+                    doc1,
+                    doc2,
+                    granularity=granularity,  # type: ignore
+                    cleanup=cleanup,
+                )
+                assert check(ot_raw_list)
+                assert apply(doc1, ot_raw_list) == doc2
+
+
+def test_bounded_diff() -> None:
+    apply = core.apply
+    bounded_diff = core.bounded_diff
+    diff = core.diff
+
+    with pytest.raises(ValueError):
+        bounded_diff("", "", deadline=-1)
+
+    with pytest.raises(ValueError):
+        bounded_diff("", "", max_cost=-1)
+
+    doc1 = "the quick brown fox\njumps over\n"
+    doc2 = "the quick red fox\njumps over\nthe dog\n"
+
+    assert bounded_diff(doc1, doc2) == (diff(doc1, doc2), False)
+    assert bounded_diff(doc1, doc2, max_cost=1_000) == (diff(doc1, doc2), False)
+    assert bounded_diff(doc1, doc2, max_cost=0) == (
+        [10, {"d": "brown fox\njumps over"}, "red fox\njumps over\nthe dog"],
+        True,
+    )
+
+    ot_raw_list, truncated = bounded_diff(doc1, doc2, deadline=0)
+    assert truncated
+    assert apply(doc1, ot_raw_list) == doc2
+
+    # the first match of unrelated docs compares most pairs of characters,
+    # which is not started if it cannot finish within the budget
+    alphabet = "".join(chr(0x4E00 + i) for i in range(500))
+    chars1 = utils.make_random_doc(100_000, alphabet)
+    chars2 = utils.make_random_doc(100_000, alphabet)
+
+    # repeated lines, which are not junked, compare many pairs in every region
+    lines1 = utils.make_random_doc(20_000, "ab").replace("", "\n")[1:]
+    lines2 = utils.make_random_doc(20_000, "ab").replace("", "\n")[1:]
+
+    for doc1, doc2, granularity in [(chars1, chars2, "char"), (lines1, lines2, "line")]:
+        for deadline, max_cost in [(0.05, None), (None, 1_000_000)]:
+            start = time.monotonic()
+            ot_raw_list, truncated = bounded_diff(
+                doc1,
+                doc2,
+                granularity=granularity,  # type: ignore
+                deadline=deadline,
+                max_cost=max_cost,
+            )
+            assert time.monotonic() - start < 1
+            assert truncated
+            assert apply(doc1, ot_raw_list) == doc2
+
+
+def test_bounded_diff_fuzz() -> None:
+    apply = core.apply
+    bounded_diff = core.bounded_diff
+    check = core.check
+
+    for granularity in ["char", "word", "line"]:
+        for _ in range(FUZZ_TEST_COUNT // 10):
+            doc1 = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH, "ab .\n")
+            doc2 = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH, "ab .\n")
+            ot_raw_list, _ = bounded_diff(
+                doc1,
+                doc2,
+                granularity=granularity,  # type: ignore
+                max_cost=random.randint(0, 1_000),
+            )
+            assert check(ot_raw_list)
+            assert apply(doc1, ot_raw_list) == doc2
+
+
 def test_complex_fuzz(core_impl, input_cls) -> None:  # type:ignore
     if TYPE_CHECKING:
         core_impl = core
@@ -476,3 +1107,193 @@ def test_complex_fuzz(core_impl, input_cls) -> None:  # type:ignore
         )
 
         assert left_first_doc == right_first_doc
+
+
+def test_ops_from_edits() -> None:
+    ops_from_edits = core.ops_from_edits
+
+    with pytest.raises(TypeError):
+        ops_from_edits(None, [])  # type: ignore
+
+    with pytest.raises(TypeError):
+        ops_from_edits("abc", 1234)  # type: ignore
+
+    with pytest.raises(TypeError):
+        ops_from_edits("abc", [(0, 1)])  # type: ignore
+
+    with pytest.raises(TypeError):
+        ops_from_edits("abc", [(0, 1, None)])  # type: ignore
+
+    with pytest.raises(ValueError):
+        ops_from_edits("abc", [(2, 3, "x"), (0, 1, "y")])
+
+    with pytest.raises(ValueError):
+        ops_from_edits("abc", [(0, 2, "x"), (1, 3, "y")])
+
+    with pytest.raises(ValueError):
+        ops_from_edits("abc", [(2, 4, "x")])
+
+    assert ops_from_edits("abcdef", []) == []
+    assert ops_from_edits("abcdef", [(1, 1, "x"), (3, 5, "")]) == [
+        1,
+        "x",
+        2,
+        {"d": "de"},
+    ]
+    # adjacent edits are merged and unchanged ends are kept
+    assert ops_from_edits("abcdef", [(0, 1, "x"), (1, 2, "y"), (4, 4, "z")]) == [
+        {"d": "ab"},
+        "xy",
+        2,
+        "z",
+    ]
+    assert ops_from_edits("color", [(0, 5, "colour")]) == [4, "u"]
+    assert ops_from_edits("abc", [(1, 2, "b")]) == []
+
+
+def test_ops_from_edits_fuzz() -> None:
+    apply = core.apply
+    check = core.check
+    ops_from_edits = core.ops_from_edits
+
+    for _ in range(FUZZ_TEST_COUNT):
+        doc = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH, "ab")
+
+        positions = sorted(
+            random.randint(0, len(doc)) for _ in range(FUZZ_TEST_OTS_LENGTH * 2)
+        )
+        edits = [
+            (start, end, utils.make_random_doc(random.randint(0, 3), "ab"))
+            for start, end in zip(positions[::2], positions[1::2])
+        ]
+
+        expected = []
+        pos = 0
+        for start, end, text in edits:
+            expected.append(doc[pos:start] + text)
+            pos = end
+        expected.append(doc[pos:])
+
+        ot_raw_list = ops_from_edits(doc, edits)
+        assert check(ot_raw_list)
+        assert apply(doc, ot_raw_list) == "".join(expected)
+
+
+def test_replace_ops() -> None:
+    apply = core.apply
+    replace_ops = core.replace_ops
+
+    with pytest.raises(TypeError):
+        replace_ops(None, "a", "b")  # type: ignore
+
+    with pytest.raises(TypeError):
+        replace_ops("abc", re.compile("a"), "b", literal=True)
+
+    with pytest.raises(ValueError):
+        replace_ops("abc", "a", "b", count=-1)
+
+    doc = "color colors colour"
+    assert replace_ops(doc, "colou?r", "colour") == [4, "u", 6, "u"]
+    assert replace_ops(doc, "COLOR", "hue", flags=re.I, count=1) == [
+        {"d": "color"},
+        "hue",
+    ]
+    assert replace_ops("a.b.c", ".", "-", literal=True) == [
+        1,
+        {"d": "."},
+        "-",
+        1,
+        {"d": "."},
+        "-",
+    ]
+
+    cases: list[tuple[str, Union[str, Callable[[re.Match[str]], str]]]] = [
+        ("colou?r", "colour"),
+        (r"(\w+) (\w+)", r"\2 \1"),
+        ("x*", "-"),
+        ("o", lambda match: str(match.start())),
+    ]
+    for pattern, repl in cases:
+        for count in [0, 1, 2]:
+            assert apply(doc, replace_ops(doc, pattern, repl, count=count)) == re.sub(
+                pattern, repl, doc, count=count
+            )
+
+
+def test_split_ops() -> None:
+    split_ops = core.split_ops
+
+    with pytest.raises(TypeError):
+        split_ops(1234, 3)  # type: ignore
+
+    with pytest.raises(ValueError):
+        split_ops(["a"], 0)
+
+    with pytest.raises(ValueError):
+        split_ops([0, "a"], 3)
+
+    assert split_ops([], 3) == []
+    assert split_ops([1, 2, "ab", "c"], 2) == [[3, "ab"], [5, "c"]]
+    assert split_ops([3], 3) == []
+    assert split_ops([2, "abcdefg", {"d": "xyz"}, "q"], 3) == [
+        [2, "abc"],
+        [5, "def"],
+        [8, "g", {"d": "xy"}],
+        [9, {"d": "z"}, "q"],
+    ]
+
+
+def test_split_ops_fuzz() -> None:
+    for _ in range(FUZZ_TEST_COUNT):
+        doc = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH)
+        ot_raw_list = core.normalize(utils.make_random_ots(doc, FUZZ_TEST_OTS_LENGTH))
+        max_chars = random.randint(1, 20)
+
+        new_doc = doc
+        for chunk in core.split_ops(ot_raw_list, max_chars):
+            stats = core.op_stats(chunk)
+            assert 0 < stats["inserted"] + stats["deleted"] <= max_chars
+            new_doc = core.apply(new_doc, chunk)
+
+        assert new_doc == core.apply(doc, ot_raw_list)
+
+
+def test_flag_arguments(core_impl) -> None:  # type: ignore
+    if TYPE_CHECKING:
+        core_impl = core
+
+    # flags accept any truthy or falsy value on every backend
+    for value in [None, 0, 1, "", "yes"]:
+        assert core_impl.check([3, "a", 1], check_unoptimized=value) == (not value)
+        assert core_impl.apply("abc", [3, "a"], check_unoptimized=value) == "abca"
+
+        if hasattr(core_impl, "diff"):
+            assert core_impl.diff("ab", "ac", cleanup=value) == [1, {"d": "b"}, "c"]
+            assert core_impl.replace_ops("a.c", ".", "b", literal=value) == (
+                [1, {"d": "."}, "b"] if value else [{"d": "a.c"}, "bbb"]
+            )
+
+
+def test_backend() -> None:
+    # `OTTYPE_NO_EXTENSIONS` selects `core` even if the backends are built
+    impls = {} if ottype.NO_EXTENSIONS else {impl.__name__: impl for impl in CORE_IMPL}
+
+    # the fastest backend built is selected
+    if "ottype.core_boost" in impls:
+        assert ottype.BACKEND == "cython"
+    elif "ottype.core_mypyc" in impls:
+        assert ottype.BACKEND == "mypyc"
+    else:
+        assert ottype.BACKEND == "python"
+
+    # functions not boosted yet come from `core_mypyc`
+    assert ottype.split_ops is impls.get("ottype.core_mypyc", core).split_ops
+
+    result = subprocess.run(
+        [sys.executable, "-c", "import ottype; print(ottype.BACKEND)"],
+        env={**os.environ, "OTTYPE_NO_EXTENSIONS": "1"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "python"
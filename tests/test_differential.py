@@ -0,0 +1,413 @@
+"""Differential tests between `core` and the compiled backends
+
+Every function is called with the same inputs on `core`, `core_mypyc` and
+`core_boost`, which must return the same outputs or raise the same type of
+exception, with the same message for `ValueError`.
+"""
+
+from __future__ import annotations
+
+import importlib
+import json
+import random
+import sys
+import sysconfig
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from json import JSONDecodeError
+from typing import Any, Callable
+
+import pytest
+
+import ottype
+from ottype import core
+
+from . import utils
+
+# compiled backends compared with `core`
+BACKENDS: list[Any] = []
+
+try:
+    from ottype import core_mypyc  # type: ignore
+
+    BACKENDS.append(core_mypyc)
+except ImportError:  # pragma: no cover
+    pass
+
+try:
+    from ottype import core_boost  # type: ignore
+
+    BACKENDS.append(core_boost)
+except ImportError:  # pragma: no cover
+    pass
+
+pytestmark = pytest.mark.skipif(not BACKENDS, reason="no backend is built")
+
+FUZZ_TEST_COUNT = 300
+FUZZ_TEST_INIT_DOC_LENGTH = 1_000
+FUZZ_TEST_OTS_LENGTH = 50
+
+THREAD_TEST_COUNT = 8
+THREAD_TEST_CASE_COUNT = 50
+
+
+def call(func: Callable[..., Any], *args: Any, **kwargs: Any) -> tuple[Any, ...]:
+    try:
+        return ("ok", func(*args, **kwargs))
+    except ValueError as e:
+        # messages of invalid values are the same, unlike those of wrong types
+        # which come from the argument parsing of each backend
+        return ("error", type(e), e.args)
+    except Exception as e:
+        return ("error", type(e))
+
+
+def assert_same(name: str, *args: Any, **kwargs: Any) -> Any:
+    result_py = call(getattr(core, name), *args, **kwargs)
+    for impl in BACKENDS:
+        result = call(getattr(impl, name), *args, **kwargs)
+        assert result_py == result, (impl.__name__, name, args, kwargs)
+
+    return result_py[1]
+
+
+def assert_same_iter(name: str, *args: Any) -> Any:
+    """Compare the items yielded until an error is raised"""
+
+    def collect(func: Callable[..., Any]) -> tuple[Any, ...]:
+        items = []
+        try:
+            for item in func(*args):
+                items.append(item)
+        except ValueError as e:
+            return ("error", type(e), e.args, items)
+        except Exception as e:
+            return ("error", type(e), items)
+        return ("ok", items)
+
+    result_py = collect(getattr(core, name))
+    for impl in BACKENDS:
+        assert result_py == collect(getattr(impl, name)), (impl.__name__, name, args)
+
+    return result_py[-1]
+
+
+def apply_sequentially(doc: str, chain: list[Any], check_unoptimized: bool) -> str:
+    for ots in chain:
+        doc = core.apply(doc, ots, check_unoptimized=check_unoptimized)
+    return doc
+
+
+@pytest.fixture(params=["list", "tuple", "tuple_form"])
+def input_form(request: pytest.FixtureRequest) -> Callable[[Any], Any]:
+    if request.param == "list":
+        return list
+    elif request.param == "tuple":
+        return tuple
+    return utils.to_tuple_ots
+
+
+def make_random_ots(doc: str) -> utils.OTRawListType:
+    return core.normalize(
+        utils.make_random_ots(
+            doc, FUZZ_TEST_OTS_LENGTH, alphabet=utils.UNICODE_ALPHABET
+        )
+    )
+
+
+def test_differential_fuzz(input_form: Callable[[Any], Any]) -> None:
+    for _ in range(FUZZ_TEST_COUNT):
+        doc = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH, utils.UNICODE_ALPHABET)
+        ot_raw_list_1 = make_random_ots(doc)
+        ot_raw_list_2 = make_random_ots(doc)
+
+        ots_1 = input_form(ot_raw_list_1)
+        ots_2 = input_form(ot_raw_list_2)
+
+        for ot_raw_list, ots in [(ot_raw_list_1, ots_1), (ot_raw_list_2, ots_2)]:
+            assert assert_same("check", ots) is True
+            assert assert_same("normalize", ots) == ot_raw_list
+            assert_same("op_lengths", ots)
+            assert_same("op_stats", ots)
+
+            data = assert_same("dumps_ops", ots)
+            assert core.normalize(assert_same("loads_ops", data)) == ot_raw_list
+
+        doc_1 = assert_same("apply", doc, ots_1)
+        doc_2 = assert_same("apply", doc, ots_2)
+        assert assert_same("inverse_apply", doc_1, ots_1) == doc
+        assert assert_same("inverse_apply", doc_2, ots_2) == doc
+
+        # TP1 of transform
+        ots_2_left = assert_same("transform", ots_2, ots_1, "left")
+        ots_1_right = assert_same("transform", ots_1, ots_2, "right")
+        assert core.apply(doc_1, ots_2_left) == core.apply(doc_2, ots_1_right)
+        assert assert_same_iter("iter_transform", ots_2, ots_1, "left") == (ots_2_left)
+
+        # Composition of compose
+        ot_raw_list_3 = make_random_ots(doc_1)
+        ots_3 = input_form(ot_raw_list_3)
+        composed = assert_same("compose", ots_1, ots_3)
+        assert core.apply(doc, composed) == core.apply(doc_1, ots_3)
+        assert assert_same_iter("iter_compose", ots_1, ots_3) == composed
+
+        assert assert_same("apply_chain", doc, [ots_1, ots_3]) == core.apply(
+            doc, composed
+        )
+
+        for side in ["left", "right"]:
+            assert_same("merge_histories", [ots_1, ots_3], [ots_2], side)
+
+
+def test_differential_broken_fuzz(input_form: Callable[[Any], Any]) -> None:
+    for _ in range(FUZZ_TEST_COUNT):
+        doc = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH, utils.UNICODE_ALPHABET)
+        other_doc = utils.make_random_doc(
+            FUZZ_TEST_INIT_DOC_LENGTH, utils.UNICODE_ALPHABET
+        )
+
+        ots = input_form(make_random_ots(doc))
+        other_ots = input_form(make_random_ots(other_doc))
+        broken_ots = utils.make_broken_ots(ots)
+
+        for check_unoptimized in [True, False]:
+            for name in ["check", "op_lengths", "op_stats"]:
+                assert_same(name, broken_ots, check_unoptimized=check_unoptimized)
+
+            for name in ["apply", "inverse_apply"]:
+                assert_same(name, doc, broken_ots, check_unoptimized=check_unoptimized)
+                assert_same(name, other_doc, ots, check_unoptimized=check_unoptimized)
+
+        assert_same("normalize", broken_ots)
+
+        for check_unoptimized in [True, False]:
+            batch: list[Any] = [ots, broken_ots, ots]
+            results = [
+                [
+                    r if isinstance(r, str) else (type(r), r.args)
+                    for r in impl.apply_batch(
+                        [doc, doc, other_doc],
+                        batch,
+                        check_unoptimized=check_unoptimized,
+                    )
+                ]
+                for impl in [core, *BACKENDS]
+            ]
+            assert all(result == results[0] for result in results)
+
+        for check_unoptimized in [True, False]:
+            for chain in [[ots, broken_ots], [broken_ots, ots], [ots, other_ots]]:
+                result = assert_same(
+                    "apply_chain", doc, chain, check_unoptimized=check_unoptimized
+                )
+
+                # same as applying each ots in order
+                expected = call(
+                    apply_sequentially,
+                    doc,
+                    chain,
+                    check_unoptimized=check_unoptimized,
+                )
+                assert (expected[0] == "ok") == isinstance(result, str)
+                if expected[0] == "ok":
+                    assert expected[1] == result
+
+        for side in ["left", "right"]:
+            assert_same("transform", broken_ots, ots, side)
+            assert_same("transform", ots, broken_ots, side)
+            assert_same("transform", ots, other_ots, side)
+
+        assert_same("compose", broken_ots, ots)
+        assert_same("compose", ots, broken_ots)
+        assert_same("compose", ots, other_ots)
+
+        for args in [(broken_ots, ots), (ots, broken_ots), (ots, other_ots)]:
+            for side in ["left", "right"]:
+                assert_same_iter("iter_transform", *args, side)
+            assert_same_iter("iter_compose", *args)
+
+        for side in ["left", "right"]:
+            assert_same("merge_histories", [ots], [broken_ots], side)
+            assert_same("merge_histories", [broken_ots], [ots], side)
+            assert_same("merge_histories", [ots], [other_ots], side)
+
+
+def test_differential_loads_ops_fuzz() -> None:
+    def loads_ops(impl: Any, data: str) -> Any:
+        try:
+            return ("ok", impl.loads_ops(data))
+        except JSONDecodeError as e:
+            return ("error", e.msg, e.pos)
+
+    for _ in range(FUZZ_TEST_COUNT):
+        doc = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH, utils.UNICODE_ALPHABET)
+        data = json.dumps(make_random_ots(doc), indent=random.choice([None, 1]))
+
+        # break the JSON at a random position
+        pos = random.randrange(len(data))
+        for broken_data in [
+            data[:pos],
+            data[:pos] + data[pos + 1 :],
+            data[:pos] + random.choice('[]{}",:\\0-.e "') + data[pos:],
+        ]:
+            result_py = loads_ops(core, broken_data)
+            for impl in BACKENDS:
+                assert result_py == loads_ops(impl, broken_data), broken_data
+
+
+def test_differential_arguments() -> None:
+    values: list[Any] = [None, 1234, "asdf", b"asdf", [3, "a"], (3, "a"), {"d": "a"}]
+
+    for ots in values:
+        for name in ["check", "normalize", "op_lengths", "op_stats", "dumps_ops"]:
+            assert_same(name, ots)
+
+        assert_same("loads_ops", ots)
+
+        for doc in values:
+            assert_same("apply", doc, ots)
+            assert_same("apply_chain", doc, ots)
+            assert_same("apply_chain", doc, [ots])
+            assert_same("inverse_apply", doc, ots)
+            assert_same("apply_batch", [doc], ots)
+            assert_same("apply_batch", doc, [ots])
+
+        for other_ots in values:
+            assert_same("compose", ots, other_ots)
+            assert_same_iter("iter_compose", ots, other_ots)
+
+            for side in values + ["left", "right"]:
+                assert_same("transform", ots, other_ots, side)
+                assert_same_iter("iter_transform", ots, other_ots, side)
+                assert_same("merge_histories", ots, other_ots, side)
+                assert_same("merge_histories", [ots], [other_ots], side)
+
+    for check_unoptimized in [None, 0, 1, "", "yes"]:
+        assert_same("check", [3, "a"], check_unoptimized=check_unoptimized)
+        assert_same("apply", "abc", [3, "a"], check_unoptimized=check_unoptimized)
+
+    # invalid ots are reported before ots which do not fit the doc
+    invalid_ots: list[Any] = [[5, "x", "y"], [{"d": "x"}, 0], [1, {"d": "x"}, 1, 1]]
+    for ots in invalid_ots:
+        with pytest.raises(ValueError, match="invalid OTs"):
+            core.apply("ab", ots)
+
+        assert assert_same("apply", "ab", ots) is ValueError
+        assert assert_same("inverse_apply", "ab", ots) is ValueError
+        assert assert_same("apply_chain", "ab", [ots]) is ValueError
+
+    # ots in the middle of a chain must fit the doc they are applied to
+    for chain in [[[5, "x"], [5, {"d": "x"}]], [["x"], [4, "y"], [{"d": "x"}]]]:
+        assert assert_same("apply_chain", "ab", chain) is ValueError
+
+
+def test_differential_big_skip() -> None:
+    for skip in [2**31 - 1, 2**31, 2**63, -(2**31)]:
+        for name in ["check", "normalize", "op_lengths", "op_stats"]:
+            assert_same(name, [skip, "a"])
+
+        assert_same("apply", "abc", [skip, "a"])
+        assert_same("inverse_apply", "abc", [skip, "a"])
+        assert_same("transform", [skip, "a"], ["b"], "left")
+        assert_same("transform", ["b"], [skip, "a"], "left")
+        assert_same("compose", [skip, "a"], [1, {"d": "b"}])
+        assert_same("compose", ["b"], [skip, "a"])
+
+
+def test_differential_threads() -> None:
+    cases = []
+    for _ in range(THREAD_TEST_CASE_COUNT):
+        doc = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH, utils.UNICODE_ALPHABET)
+        ots_1 = make_random_ots(doc)
+        ots_2 = make_random_ots(doc)
+        ots_3 = make_random_ots(core.apply(doc, ots_1))
+        cases.append(
+            (
+                ots_1,
+                ots_2,
+                ots_3,
+                core.transform(ots_1, ots_2, "left"),
+                core.compose(ots_1, ots_3),
+                core.merge_histories([ots_1, ots_3], [ots_2], "right"),
+            )
+        )
+
+    barrier = threading.Barrier(THREAD_TEST_COUNT)
+
+    def run(offset: int) -> None:
+        barrier.wait()
+        # all threads read the same inputs, in different orders
+        for i in range(len(cases)):
+            ots_1, ots_2, ots_3, transformed, composed, merged = cases[
+                (i + offset) % len(cases)
+            ]
+            for impl in BACKENDS:
+                assert impl.transform(ots_1, ots_2, "left") == transformed
+                assert list(impl.iter_transform(ots_1, ots_2, "left")) == transformed
+                assert impl.compose(ots_1, ots_3) == composed
+                assert list(impl.iter_compose(ots_1, ots_3)) == composed
+                assert impl.merge_histories([ots_1, ots_3], [ots_2], "right") == (
+                    merged
+                )
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(THREAD_TEST_COUNT) as executor:
+            futures = [executor.submit(run, i) for i in range(THREAD_TEST_COUNT)]
+            for future in futures:
+                future.result()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+
+@pytest.mark.skipif(
+    not sysconfig.get_config_var("Py_GIL_DISABLED"), reason="GIL is enabled"
+)
+def test_differential_free_threading() -> None:  # pragma: no cover
+    # importing a module which does not declare free-threading support
+    # enables the GIL again
+    assert not sys._is_gil_enabled()
+
+
+def test_differential_subinterpreter() -> None:
+    for module_name in ["_interpreters", "_xxsubinterpreters"]:
+        try:
+            interpreters = importlib.import_module(module_name)
+            break
+        except ImportError:
+            pass
+    else:  # pragma: no cover
+        pytest.skip("subinterpreters are not available")
+
+    # without per-module state, whether `core_boost` can be imported in a
+    # subinterpreter depends on the version and the GIL of the interpreter
+    core_boost = sys.modules.get("ottype.core_boost")
+    if ottype.NO_EXTENSIONS or core_boost is None or not core_boost._has_module_state():
+        pytest.skip("core_boost is not built with per-module state")
+
+    doc = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH, utils.UNICODE_ALPHABET)
+    ots_1 = make_random_ots(doc)
+    ots_2 = make_random_ots(doc)
+    ots_3 = make_random_ots(core.apply(doc, ots_1))
+
+    transformed = core.transform(ots_1, ots_2, "left")
+    composed = core.compose(ots_1, ots_3)
+
+    script = f"""
+import sys
+sys.path[:0] = {sys.path!r}
+
+import ottype
+
+assert ottype.BACKEND == "cython", ottype.BACKEND
+
+assert ottype.transform({ots_1!r}, {ots_2!r}, "left") == {transformed!r}
+assert ottype.compose({ots_1!r}, {ots_3!r}) == {composed!r}
+"""
+    interp = interpreters.create()
+    try:
+        # failures are raised before Python 3.13 and returned since then
+        assert interpreters.run_string(interp, script) is None
+    finally:
+        interpreters.destroy(interp)
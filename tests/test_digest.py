@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from ottype import apply, digest, normalize
+
+from . import utils
+
+try:
+    from ottype import core_boost  # type: ignore
+except ImportError:  # pragma: no cover
+    core_boost = None
+
+FUZZ_TEST_COUNT = 100
+FUZZ_TEST_INIT_DOC_LENGTH = 300
+FUZZ_TEST_OTS_LENGTH = 10
+FUZZ_TEST_LOG_LENGTH = 10
+
+
+def test_poly_hash() -> None:
+    docs = [
+        "",
+        "a",
+        "ab",
+        "ba",
+        "\U0001f600\ud800",
+        "\x00",
+        "\x00\x00ab",
+        "\x00ab",
+        "\U0010ffff",
+        utils.make_random_doc(10_000, utils.UNICODE_ALPHABET),
+    ]
+
+    hashes = [digest._poly_hash_py(doc) for doc in docs]
+    assert len(set(hashes)) == len(hashes)
+
+    # hash of concatenation
+    a, b = docs[-1][:3000], docs[-1][3000:]
+    assert digest._poly_hash_py(a + b) == (
+        digest._poly_hash_py(a)
+        * pow(digest._POLY_HASH_BASE, len(b), digest._POLY_HASH_MOD)
+        + digest._poly_hash_py(b)
+    ) % (digest._POLY_HASH_MOD)
+
+    if core_boost is not None:
+        assert core_boost._poly_hash_params() == (
+            digest._POLY_HASH_MOD,
+            digest._POLY_HASH_BASE,
+        )
+        assert [core_boost._poly_hash(doc) for doc in docs] == hashes
+
+    # leading NUL characters change the digest
+    assert digest.doc_digest("\x00abc") != digest.doc_digest("abc")
+    assert digest.DocDigest("\x00abc").digest != digest.DocDigest("abc").digest
+
+
+def test_doc_digest() -> None:
+    with pytest.raises(TypeError):
+        digest.DocDigest(1234)  # type: ignore
+
+    with pytest.raises(TypeError):
+        digest.doc_digest(1234)  # type: ignore
+
+    with pytest.raises(ValueError):
+        digest.DocDigest(chunk_size=0)
+
+    doc_digest = digest.DocDigest("hello world", chunk_size=4)
+    assert len(doc_digest) == 11
+    assert doc_digest.digest == digest.doc_digest("hello world")
+    assert digest.DocDigest().digest == digest.doc_digest("") == 0
+
+    doc_digest.apply([{"d": "hello"}, "bye", 6, "!"])
+    assert len(doc_digest) == 10
+    assert doc_digest.digest == digest.doc_digest("bye world!")
+
+    with pytest.raises(TypeError):
+        doc_digest.apply(1234)  # type: ignore
+
+    with pytest.raises(ValueError):
+        doc_digest.apply([3, 4])
+
+    with pytest.raises(ValueError):
+        doc_digest.apply([11, "x"])
+
+    with pytest.raises(ValueError):
+        doc_digest.apply([8, {"d": "xyz"}])
+
+    # the digest is unchanged by ots not fitting the doc
+    with pytest.raises(ValueError):
+        doc_digest.apply(["x", {"d": "hello"}])
+    assert doc_digest.digest == digest.doc_digest("bye world!")
+
+
+def test_doc_digest_fuzz() -> None:
+    for _ in range(FUZZ_TEST_COUNT):
+        doc = utils.make_random_doc(
+            random.randint(0, FUZZ_TEST_INIT_DOC_LENGTH), utils.UNICODE_ALPHABET
+        )
+        doc_digest = digest.DocDigest(doc, chunk_size=random.randint(1, 64))
+
+        for _ in range(FUZZ_TEST_LOG_LENGTH):
+            ot_raw_list = normalize(
+                utils.make_random_ots(
+                    doc, FUZZ_TEST_OTS_LENGTH, alphabet=utils.UNICODE_ALPHABET
+                )
+            )
+            doc_digest.apply(ot_raw_list)
+            doc = apply(doc, ot_raw_list)
+
+            assert len(doc_digest) == len(doc)
+            assert doc_digest.digest == digest.doc_digest(doc)
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from ottype import apply, history, normalize
+
+from . import utils
+
+FUZZ_TEST_COUNT = 100
+FUZZ_TEST_INIT_DOC_LENGTH = 100
+FUZZ_TEST_OTS_LENGTH = 10
+FUZZ_TEST_LOG_LENGTH = 30
+
+
+def make_random_log(doc: str, n: int) -> tuple[list[utils.OTRawListType], list[str]]:
+    ot_raw_lists = []
+    docs = [doc]
+    for _ in range(n):
+        ot_raw_list = normalize(utils.make_random_ots(doc, FUZZ_TEST_OTS_LENGTH))
+        doc = apply(doc, ot_raw_list)
+        ot_raw_lists.append(ot_raw_list)
+        docs.append(doc)
+    return ot_raw_lists, docs
+
+
+def test_compose_all() -> None:
+    with pytest.raises(TypeError):
+        history.compose_all(1234)  # type: ignore
+
+    assert history.compose_all([]) == []
+    assert history.compose_all([[(2, "asdf")], [2, {"d": "df"}]]) == ["as"]
+    assert history.compose_all([["a"], [1, "b"], [2, "c"]]) == ["abc"]
+
+
+def test_compose_all_fuzz() -> None:
+    for _ in range(FUZZ_TEST_COUNT):
+        doc = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH)
+        ot_raw_lists, docs = make_random_log(doc, FUZZ_TEST_LOG_LENGTH)
+
+        assert apply(doc, history.compose_all(ot_raw_lists)) == docs[-1]
+
+
+def test_compact() -> None:
+    ot_raw_lists: list[utils.OTRawListType] = [
+        ["a"],
+        [1, "b"],
+        [2, "c"],
+        [3, "d"],
+        [4, "e"],
+    ]
+
+    with pytest.raises(TypeError):
+        history.compact(1234, 3)  # type: ignore
+
+    with pytest.raises(ValueError):
+        history.compact(ot_raw_lists, 3, keep_every=-1)
+
+    with pytest.raises(ValueError):
+        history.compact(ot_raw_lists, 3, keep_last=-1)
+
+    compaction = history.compact(ot_raw_lists, 3, doc="")
+    assert compaction.entries == [
+        (0, 3, ["abc"]),
+        (3, 4, [3, "d"]),
+        (4, 5, [4, "e"]),
+    ]
+    assert compaction.watermark == 3
+    assert compaction.snapshot == "abc"
+    assert compaction.bytes_reclaimed == 12
+
+    compaction = history.compact(ot_raw_lists, 5, keep_every=2, keep_last=2)
+    assert compaction.entries == [
+        (0, 2, ["ab"]),
+        (2, 3, [2, "c"]),
+        (3, 4, [3, "d"]),
+        (4, 5, [4, "e"]),
+    ]
+    assert compaction.watermark == 3
+    assert compaction.snapshot is None
+
+    compaction = history.compact(ot_raw_lists[2:], 5, keep_every=2, base_revision=2)
+    assert compaction.entries == [(2, 4, [2, "cd"]), (4, 5, [4, "e"])]
+
+
+def test_compact_fuzz() -> None:
+    for _ in range(FUZZ_TEST_COUNT):
+        doc = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH)
+        ot_raw_lists, docs = make_random_log(doc, FUZZ_TEST_LOG_LENGTH)
+
+        compaction = history.compact(
+            ot_raw_lists, 20, keep_every=7, keep_last=5, doc=doc
+        )
+        assert compaction.watermark == 20
+        assert compaction.snapshot == docs[20]
+
+        revision = 0
+        for start, end, ot_raw_list in compaction.entries:
+            assert start == revision
+            assert end <= 20 or end == start + 1
+            assert apply(docs[start], ot_raw_list) == docs[end]
+            revision = end
+        assert revision == FUZZ_TEST_LOG_LENGTH
+
+
+def test_delta_index() -> None:
+    ot_raw_lists: list[utils.OTRawListType] = [
+        ["a"],
+        [1, "b"],
+        [2, "c"],
+        [3, "d"],
+        [4, "e"],
+    ]
+
+    with pytest.raises(TypeError):
+        history.DeltaIndex(1234)  # type: ignore
+
+    with pytest.raises(ValueError):
+        history.DeltaIndex(max_bytes=-1)
+
+    index = history.DeltaIndex(ot_raw_lists[:3], base_revision=10)
+    assert index.append(ot_raw_lists[3]) == 13
+    assert index.append(ot_raw_lists[4]) == 14
+    assert len(index) == 5
+    assert index.end_revision == 15
+    assert index.num_levels == 3
+
+    with pytest.raises(TypeError):
+        index.append(1234)  # type: ignore
+
+    with pytest.raises(ValueError):
+        index.append([3, 4])
+
+    with pytest.raises(IndexError):
+        index.delta(9, 12)
+
+    with pytest.raises(IndexError):
+        index.delta(12, 16)
+
+    with pytest.raises(IndexError):
+        index.delta(12, 11)
+
+    assert index.delta(12, 12) == []
+    assert index.delta(10, 15) == ["abcde"]
+    assert index.delta(11, 14) == [1, "bcd"]
+    assert index.delta(13, 14) == [3, "d"]
+
+
+def test_delta_index_fuzz() -> None:
+    for max_bytes in [None, 0, 2_000]:
+        doc = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH)
+        ot_raw_lists, docs = make_random_log(doc, FUZZ_TEST_LOG_LENGTH * 2)
+
+        index = history.DeltaIndex(max_bytes=max_bytes)
+        for revision, ot_raw_list in enumerate(ot_raw_lists):
+            assert index.append(ot_raw_list) == revision
+            if max_bytes is not None:
+                assert index.nbytes <= max_bytes
+
+        if max_bytes == 0:
+            assert index.num_levels == 1
+
+        for _ in range(FUZZ_TEST_COUNT):
+            start = random.randint(0, len(ot_raw_lists))
+            end = random.randint(start, len(ot_raw_lists))
+            assert apply(docs[start], index.delta(start, end)) == docs[end]
+
+
+def test_packed_log() -> None:
+    with pytest.raises(TypeError):
+        history.PackedLog(1234)  # type: ignore
+
+    log = history.PackedLog([["a"], [(1, 1), (2, "b")], [2, "c"]], base_revision=10)
+    assert len(log) == 3
+    assert log.end_revision == 13
+
+    with pytest.raises(TypeError):
+        log.append(1234)  # type: ignore
+
+    with pytest.raises(ValueError):
+        log.append([3, 4])
+
+    assert log.append([]) == 13
+    assert log.append([2, {"d": "c"}, "d😀"]) == 14
+
+    with pytest.raises(IndexError):
+        log.read(9)
+
+    with pytest.raises(IndexError):
+        log.read(15)
+
+    with pytest.raises(IndexError):
+        list(log.iter_ots(10, 16))
+
+    assert log.read(11) == [(1, 1), (2, "b")]
+    assert log.read(13) == []
+    assert log.read(14) == [(1, 2), (3, "c"), (2, "d😀")]
+    assert apply("", log.read(10)) == "a"
+    assert normalize(log.read(14)) == [2, {"d": "c"}, "d😀"]
+
+    doc = ""
+    for ots in log.iter_ots():
+        doc = apply(doc, ots)
+    assert doc == "abd😀"
+
+    report = log.memory_report()
+    assert report.revisions == 5
+    assert report.nbytes == log.nbytes
+    assert report.bytes_per_revision == report.nbytes / 5
+    assert report.list_bytes_per_revision == report.list_nbytes / 5
+
+    assert history.PackedLog().memory_report().bytes_per_revision > 0
+
+
+def test_packed_log_fuzz(monkeypatch: pytest.MonkeyPatch) -> None:
+    # spread the texts over many pages
+    monkeypatch.setattr(history, "_PAGE_CHARS", 16)
+
+    doc = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH)
+    ot_raw_lists, docs = make_random_log(doc, FUZZ_TEST_LOG_LENGTH * 10)
+
+    log = history.PackedLog()
+    for revision, ot_raw_list in enumerate(ot_raw_lists):
+        assert log.append(ot_raw_list) == revision
+
+        # reading joins the texts appended so far into the pages
+        if random.random() < 0.3:
+            read_revision = random.randint(0, revision)
+            assert normalize(log.read(read_revision)) == ot_raw_lists[read_revision]
+
+    assert len(log._pages) > 1
+    for revision, ots in enumerate(log.iter_ots()):
+        assert normalize(ots) == ot_raw_lists[revision]
+        assert apply(docs[revision], ots) == docs[revision + 1]
+
+    report = log.memory_report()
+    assert report.nbytes * 3 < report.list_nbytes
+
+
+def test_packed_log_without_reads() -> None:
+    log = history.PackedLog()
+    for revision in range(5_000):
+        log.append([revision * 2 + 1, "ab"] if revision else ["ab"])
+
+    # appended texts are packed into the pages without being read
+    nbytes = log.nbytes
+    assert nbytes < 5_000 * 40
+
+    report = log.memory_report()
+    assert report.nbytes == nbytes
+    assert report.nbytes * 3 < report.list_nbytes
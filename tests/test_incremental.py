@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import asyncio
+import random
+
+import pytest
+
+from ottype import apply, incremental, normalize
+
+from . import utils
+
+FUZZ_TEST_COUNT = 100
+FUZZ_TEST_INIT_DOC_LENGTH = 100
+FUZZ_TEST_OTS_LENGTH = 10
+
+
+def test_apply() -> None:
+    with pytest.raises(TypeError):
+        asyncio.run(incremental.apply(1234, ["a"]))  # type: ignore
+
+    with pytest.raises(TypeError):
+        asyncio.run(incremental.apply("abc", 1234))  # type: ignore
+
+    with pytest.raises(ValueError):
+        asyncio.run(incremental.apply("abc", ["a"], max_chars=0))
+
+    with pytest.raises(ValueError):
+        asyncio.run(incremental.apply("abc", [3, 4]))
+
+    with pytest.raises(ValueError):
+        asyncio.run(incremental.apply("abc", [4, "a"]))
+
+    with pytest.raises(ValueError):
+        asyncio.run(incremental.apply("abc", [1, {"d": "bcd"}]))
+
+    with pytest.raises(ValueError):
+        asyncio.run(incremental.apply("abcdef", [{"d": "abcdeX"}], max_chars=2))
+
+    assert asyncio.run(incremental.apply("abc", [1, "x", {"d": "b"}])) == "axc"
+
+    # flags are any truthy or falsy values as in `ottype`
+    for falsy in [None, 0, ""]:
+        new_doc = asyncio.run(
+            incremental.apply("abc", [1, 1, "x"], check_unoptimized=falsy)
+        )
+        assert new_doc == "abxc"
+
+    for truthy in [1, "yes"]:
+        with pytest.raises(ValueError):
+            asyncio.run(incremental.apply("abc", [1, 1, "x"], check_unoptimized=truthy))
+
+
+def test_apply_yields() -> None:
+    ticks = 0
+
+    async def count_ticks() -> None:
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0)
+
+    async def main() -> str:
+        task = asyncio.create_task(count_ticks())
+        await asyncio.sleep(0)
+
+        new_doc = await incremental.apply(
+            "a" * 1000, [100, {"d": "a" * 500}, "b" * 1000], max_chars=100
+        )
+
+        task.cancel()
+        return new_doc
+
+    assert asyncio.run(main()) == "a" * 100 + "b" * 1000 + "a" * 400
+    assert ticks >= 10
+
+
+def test_apply_fuzz() -> None:
+    async def main() -> None:
+        for _ in range(FUZZ_TEST_COUNT):
+            doc = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH)
+            ot_raw_list = normalize(utils.make_random_ots(doc, FUZZ_TEST_OTS_LENGTH))
+            max_chars = random.randint(1, 20)
+
+            new_doc = await incremental.apply(doc, ot_raw_list, max_chars=max_chars)
+            assert new_doc == apply(doc, ot_raw_list)
+
+    asyncio.run(main())
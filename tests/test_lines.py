@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from ottype import apply, lines, normalize
+
+from . import utils
+
+FUZZ_TEST_COUNT = 100
+FUZZ_TEST_INIT_DOC_LENGTH = 300
+FUZZ_TEST_OTS_LENGTH = 10
+FUZZ_TEST_LOG_LENGTH = 10
+
+LINE_ALPHABET = "ab\n\U0001f600"
+
+
+def assert_index(index: lines.LineIndex, doc: str) -> None:
+    doc_lines = doc.split("\n")
+
+    assert len(index) == len(doc_lines)
+    assert index.length == len(doc)
+
+    offset = 0
+    for line, text in enumerate(doc_lines):
+        for col in range(len(text) + 1):
+            assert index.position(offset + col) == (line, col)
+            assert index.offset(line, col) == offset + col
+        with pytest.raises(IndexError):
+            index.offset(line, len(text) + 1)
+        offset += len(text) + 1
+
+
+def test_line_index() -> None:
+    with pytest.raises(TypeError):
+        lines.LineIndex(1234)  # type: ignore
+
+    index = lines.LineIndex()
+    assert_index(index, "")
+
+    with pytest.raises(IndexError):
+        index.position(1)
+
+    with pytest.raises(IndexError):
+        index.offset(1, 0)
+
+    with pytest.raises(IndexError):
+        index.offset(0, 1)
+
+    index.apply(["ab\ncd\n"])
+    assert_index(index, "ab\ncd\n")
+
+    with pytest.raises(IndexError):
+        index.offset(0, 3)
+
+    # the newline of the line before the empty last line is not a column
+    with pytest.raises(IndexError):
+        index.offset(1, 3)
+
+    assert_index(lines.LineIndex("a\n"), "a\n")
+    assert_index(lines.LineIndex("\n\n"), "\n\n")
+
+    index.apply([1, {"d": "b\nc"}, "x\n\ny"])
+    assert_index(index, "ax\n\nyd\n")
+
+    with pytest.raises(TypeError):
+        index.apply(1234)  # type: ignore
+
+    with pytest.raises(ValueError):
+        index.apply([3, 4])
+
+    with pytest.raises(ValueError):
+        index.apply([8, "x"])
+
+    with pytest.raises(ValueError):
+        index.apply([6, {"d": "xyz"}])
+
+    # the newline is not where the delete expects, and the index is unchanged
+    with pytest.raises(ValueError):
+        index.apply(["z\n", {"d": "a\n"}])
+    assert_index(index, "ax\n\nyd\n")
+
+
+def test_line_index_fuzz() -> None:
+    for _ in range(FUZZ_TEST_COUNT):
+        doc = utils.make_random_doc(
+            random.randint(0, FUZZ_TEST_INIT_DOC_LENGTH), LINE_ALPHABET
+        )
+        index = lines.LineIndex(doc)
+        assert_index(index, doc)
+
+        for _ in range(FUZZ_TEST_LOG_LENGTH):
+            ot_raw_list = normalize(
+                utils.make_random_ots(doc, FUZZ_TEST_OTS_LENGTH, alphabet=LINE_ALPHABET)
+            )
+            index.apply(ot_raw_list)
+            doc = apply(doc, ot_raw_list)
+
+        assert_index(index, doc)
+
+        for line in range(len(index)):
+            for col in range(index.length + 2):
+                try:
+                    offset = index.offset(line, col)
+                except IndexError:
+                    break
+                assert index.position(offset) == (line, col)
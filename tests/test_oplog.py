@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import os
+import pathlib
+
+import pytest
+
+from ottype import apply, normalize, oplog
+
+from . import utils
+
+FUZZ_TEST_INIT_DOC_LENGTH = 100
+FUZZ_TEST_OTS_LENGTH = 10
+FUZZ_TEST_LOG_LENGTH = 300
+
+
+def test_oplog(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "doc.oplog"
+
+    with oplog.OpLogWriter(path, base_revision=10, sync_every=0) as writer:
+        with pytest.raises(TypeError):
+            writer.append(1234)  # type: ignore
+
+        with pytest.raises(ValueError):
+            writer.append([3, 4])
+
+        assert writer.append(["a\U0001f600"]) == 10
+        assert writer.append([2, {"d": "\U0001f600"}, "b"]) == 11
+        assert writer.append([(1, 2**40), (2, "c")]) == 12
+        writer.flush()
+
+        with oplog.OpLogReader(path) as reader:
+            assert len(reader) == 3
+            assert reader.base_revision == 10
+            assert reader.end_revision == 13
+
+            assert reader.read(10) == [(2, "a\U0001f600")]
+            assert reader.read(11) == [(1, 2), (3, "\U0001f600"), (2, "b")]
+            assert reader.read(12) == [(1, 2**40), (2, "c")]
+
+            with pytest.raises(IndexError):
+                reader.read(9)
+
+            with pytest.raises(IndexError):
+                reader.read(13)
+
+            assert list(reader.iter_ots(11)) == [reader.read(11), reader.read(12)]
+            assert list(reader.iter_ots(10, 10)) == []
+
+            with pytest.raises(IndexError):
+                list(reader.iter_ots(10, 14))
+
+            writer.append(["d"])
+            writer.flush()
+            assert len(reader) == 3
+
+            reader.refresh()
+            assert reader.read(13) == [(2, "d")]
+
+    # reopen and keep appending
+    with oplog.OpLogWriter(path) as writer:
+        assert writer.base_revision == 10
+        assert writer.append([1, "e"]) == 14
+
+    with oplog.OpLogReader(path) as reader:
+        assert [ots for ots in reader.iter_ots()][-1] == [(1, 1), (2, "e")]
+
+
+def test_oplog_torn_tail(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "doc.oplog"
+
+    with oplog.OpLogWriter(path) as writer:
+        writer.append(["abc"])
+        writer.append([1, "def"])
+
+    # a record without its index entry, and an index entry of a partial record
+    with open(path, "ab") as f:
+        f.write(b"\x05\x00\x00\x00\x02\x03")
+    with open(str(path) + ".idx", "ab") as f:
+        f.write((path.stat().st_size - 6).to_bytes(8, "little"))
+
+    with oplog.OpLogReader(path) as reader:
+        assert len(reader) == 2
+
+    with oplog.OpLogWriter(path) as writer:
+        assert writer.append([2, "g"]) == 2
+
+    with oplog.OpLogReader(path) as reader:
+        assert list(reader.iter_ots()) == [
+            [(2, "abc")],
+            [(1, 1), (2, "def")],
+            [(1, 2), (2, "g")],
+        ]
+
+
+def test_oplog_missing_index(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "doc.oplog"
+    index_path = tmp_path / "doc.oplog.idx"
+
+    # a crash after creating the log and before writing the index
+    path.write_bytes(b"")
+    with oplog.OpLogWriter(path, base_revision=5) as writer:
+        assert writer.append(["abc"]) == 5
+        assert writer.append([1, "def"]) == 6
+
+    # records and a torn tail without the index
+    with open(path, "ab") as f:
+        f.write(b"\x05\x00\x00\x00\x02\x03")
+    index_path.unlink()
+
+    with oplog.OpLogWriter(path, base_revision=5) as writer:
+        assert writer.end_revision == 7
+        assert writer.append([2, "g"]) == 7
+
+    with oplog.OpLogReader(path) as reader:
+        assert reader.base_revision == 5
+        assert list(reader.iter_ots()) == [
+            [(2, "abc")],
+            [(1, 1), (2, "def")],
+            [(1, 2), (2, "g")],
+        ]
+
+
+def test_oplog_sync_on_flush(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    fsync = os.fsync
+    synced = []
+
+    def fsync_counted(fd: int) -> None:
+        synced.append(fd)
+        fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", fsync_counted)
+
+    with oplog.OpLogWriter(
+        tmp_path / "doc.oplog", sync_every=0, sync_interval=60
+    ) as writer:
+        synced.clear()
+
+        writer.append(["abc"])
+        writer.flush()
+        assert not synced
+
+        # the writer is idle when the interval passes
+        writer._last_sync -= 60
+        writer.flush()
+        assert len(synced) == 2
+
+        writer.flush()
+        assert len(synced) == 2
+
+
+def test_oplog_invalid_file(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "doc.oplog"
+    path.write_bytes(b"not an op-log")
+    (tmp_path / "doc.oplog.idx").write_bytes(b"not an op-log index")
+
+    with pytest.raises(ValueError):
+        oplog.OpLogWriter(path)
+
+    with pytest.raises(ValueError):
+        oplog.OpLogReader(path)
+
+    with pytest.raises(ValueError):
+        oplog.OpLogWriter(tmp_path / "other.oplog", sync_every=-1)
+
+
+def test_oplog_fuzz(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "doc.oplog"
+
+    doc = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH, utils.UNICODE_ALPHABET)
+    docs = [doc]
+
+    with oplog.OpLogWriter(path, sync_every=50) as writer:
+        for _ in range(FUZZ_TEST_LOG_LENGTH):
+            ot_raw_list = normalize(
+                utils.make_random_ots(
+                    doc, FUZZ_TEST_OTS_LENGTH, alphabet=utils.UNICODE_ALPHABET
+                )
+            )
+            writer.append(ot_raw_list)
+            doc = apply(doc, ot_raw_list)
+            docs.append(doc)
+
+    with oplog.OpLogReader(path) as reader:
+        assert len(reader) == FUZZ_TEST_LOG_LENGTH
+
+        for revision in [0, 1, 150, 299]:
+            doc = docs[revision]
+            for ots in reader.iter_ots(revision):
+                doc = apply(doc, ots)
+            assert doc == docs[-1]
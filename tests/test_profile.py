@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import pathlib
+from typing import Any
+
+import pytest
+
+from ottype import core, profile
+
+from . import utils
+
+
+def test_recorder(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "capture.jsonl"
+
+    with profile.Recorder(path) as recorder:
+        apply = recorder.wrap(core.apply)
+        transform = recorder.wrap(core.transform)
+        compose = recorder.wrap(core.compose)
+
+        assert apply("abc", [(1, 1), (2, "x")]) == "axbc"
+        assert transform(["a"], [1, "b"], "left") == ["a"]
+        assert compose(["a"], [1, "b"]) == ["ab"]
+
+        with pytest.raises(ValueError):
+            apply("abc", [3, 4], check_unoptimized=False)
+
+    assert profile.load(path) == [
+        ("apply", ["abc", [1, "x"]], {}),
+        ("transform", [["a"], [1, "b"], "left"], {}),
+        ("compose", [["a"], [1, "b"]], {}),
+        ("apply", ["abc", [3, 4]], {"check_unoptimized": False}),
+    ]
+
+    # the capture can be appended to
+    with profile.Recorder(path) as recorder:
+        recorder.wrap(core.apply)("", ["a"])
+    assert len(profile.load(path)) == 5
+
+
+def test_load_invalid(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "capture.jsonl"
+
+    for line in ["[", '{"args": []}', '{"func": "diff", "args": []}', "[1]"]:
+        path.write_text('{"func": "apply", "args": ["", []]}\n' + line + "\n")
+        with pytest.raises(ValueError, match="line 2"):
+            profile.load(path)
+
+
+def test_replay(tmp_path: pathlib.Path) -> None:
+    calls: list[tuple[str, list[Any], dict[str, Any]]] = []
+    for _ in range(20):
+        doc = utils.make_random_doc(100)
+        ot_raw_list_1 = core.normalize(utils.make_random_ots(doc, 10))
+        ot_raw_list_2 = core.normalize(utils.make_random_ots(doc, 10))
+        calls.append(("apply", [doc, ot_raw_list_1], {}))
+        calls.append(("transform", [ot_raw_list_1, ot_raw_list_2, "left"], {}))
+    calls.append(("compose", [[3, 4], []], {}))
+
+    with pytest.raises(ValueError):
+        profile.replay(calls, core, repeat=0)
+
+    latencies = profile.replay(calls, core, repeat=2)
+    assert {name: len(values) for name, values in latencies.items()} == {
+        "apply": 40,
+        "transform": 40,
+        "compose": 2,
+    }
+
+    report = profile.format_report({"python": latencies})
+    assert "| python | apply | 40 |" in report
+    assert "| python | compose | 2 |" in report
+
+
+def test_percentile() -> None:
+    values = [float(i) for i in range(1, 101)]
+    assert profile.percentile(values, 50) == 50
+    assert profile.percentile(values, 99) == 99
+    assert profile.percentile(values, 100) == 100
+    assert profile.percentile([3.0], 50) == 3
+
+    with pytest.raises(ValueError):
+        profile.percentile([], 50)
+
+
+def test_main(tmp_path: pathlib.Path, capsys: pytest.CaptureFixture[str]) -> None:
+    path = tmp_path / "capture.jsonl"
+    with profile.Recorder(path) as recorder:
+        recorder.wrap(core.apply)("abc", [1, "x"])
+        recorder.wrap(core.compose)(["a"], [1, "b"])
+
+    prefix = tmp_path / "stats"
+    assert (
+        profile.main(
+            [str(path), "--backend", "python", "--repeat", "2"]
+            + ["--cprofile", str(prefix)]
+        )
+        == 0
+    )
+    out = capsys.readouterr().out
+    assert "2 calls x 2" in out
+    assert "| python | apply | 2 |" in out
+    assert (tmp_path / "stats.python.pstats").exists()
+
+    with pytest.raises(SystemExit):
+        profile.main([str(path), "--repeat", "0"])
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import multiprocessing
+import uuid
+from typing import Iterator
+
+import pytest
+
+from ottype import utf8
+from ottype.shmcache import SharedDocCache
+
+WORKER_COUNT = 4
+WORKER_APPLY_COUNT = 25
+
+
+@pytest.fixture
+def cache_name() -> Iterator[str]:
+    name = f"ots{uuid.uuid4().hex[:8]}"
+    yield name
+
+    try:
+        cache = SharedDocCache(name)
+    except FileNotFoundError:
+        return
+    cache.unlink()
+    cache.close()
+
+
+def test_shared_doc_cache(cache_name: str) -> None:
+    with pytest.raises(ValueError):
+        SharedDocCache(cache_name, create=True, max_bytes=0)
+
+    with pytest.raises(FileNotFoundError):
+        SharedDocCache(cache_name)
+
+    with SharedDocCache(cache_name, create=True) as cache:
+        assert len(cache) == 0
+        assert cache.get("doc") is None
+        assert cache.view("doc") is None
+        assert "doc" not in cache
+
+        with pytest.raises(TypeError):
+            cache.publish(1234, 0, "")  # type: ignore
+
+        with pytest.raises(ValueError):
+            cache.publish("x" * 65, 0, "")
+
+        with pytest.raises(ValueError):
+            cache.publish("doc", -1, "")
+
+        with pytest.raises(KeyError):
+            cache.apply("doc", ["a"])
+
+        assert cache.publish("doc", 3, "héllo")
+        assert cache.get("doc") == (3, "héllo")
+        assert "doc" in cache
+        assert len(cache) == 1
+
+        with cache.view("doc") as view:  # type: ignore[union-attr]
+            assert view.revision == 3
+            assert view.data == "héllo".encode()
+            assert view.data.readonly
+            assert utf8.apply(view.data, [1, {"d": "é"}, "e"]) == b"hello"
+
+            # the view keeps the revision it was opened at
+            assert cache.apply("doc", [5, " world"]) == 4
+            assert view.text == "héllo"
+
+        assert cache.get("doc") == (4, "héllo world")
+
+        with pytest.raises(ValueError):
+            cache.apply("doc", [100, "x"])
+        assert cache.get("doc") == (4, "héllo world")
+
+        assert not cache.publish("doc", 5, "x", expected_revision=3)
+        assert cache.publish("doc", 5, "x", expected_revision=4)
+        assert not cache.publish("new", 0, "y", expected_revision=0)
+        assert cache.publish("new", 0, "y", expected_revision=-1)
+
+        with SharedDocCache(cache_name) as other:
+            assert other.get("doc") == (5, "x")
+            assert other.discard("doc")
+            assert not other.discard("doc")
+
+        assert cache.get("doc") is None
+        assert len(cache) == 1
+
+
+def test_shared_doc_cache_eviction(cache_name: str) -> None:
+    with SharedDocCache(cache_name, create=True, max_bytes=200, max_docs=3) as cache:
+        with pytest.raises(ValueError):
+            cache.publish("big", 0, "x" * 200)
+
+        cache.publish("a", 0, "a" * 50)
+        cache.publish("b", 0, "b" * 50)
+        assert cache.nbytes == 2 * (24 + 50)
+
+        # "a" is used more recently than "b"
+        assert cache.get("a") is not None
+        cache.publish("c", 0, "c" * 50)
+        assert "b" not in cache
+        assert cache.evictions == 1
+        assert cache.nbytes <= 200
+
+        # out of slots
+        cache.publish("d", 0, "d")
+        cache.publish("e", 0, "e")
+        assert len(cache) == 3
+        assert "e" in cache
+        assert "a" not in cache
+        assert cache.evictions == 2
+
+        # growing a doc evicts the others but never the doc itself
+        cache.publish("e", 1, "e" * 170)
+        assert cache.get("e") == (1, "e" * 170)
+        assert cache.nbytes <= 200
+
+
+def _apply_in_worker(name: str) -> None:
+    with SharedDocCache(name) as cache:
+        for _ in range(WORKER_APPLY_COUNT):
+            cache.apply("doc", ["a"])
+
+
+def test_shared_doc_cache_processes(cache_name: str) -> None:
+    with SharedDocCache(cache_name, create=True) as cache:
+        cache.publish("doc", 0, "")
+
+        processes = [
+            multiprocessing.Process(target=_apply_in_worker, args=(cache_name,))
+            for _ in range(WORKER_COUNT)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            assert process.exitcode == 0
+
+        revision = WORKER_COUNT * WORKER_APPLY_COUNT
+        assert cache.get("doc") == (revision, "a" * revision)
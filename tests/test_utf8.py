@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from ottype import apply, compose, normalize, transform, utf8
+
+from . import utils
+
+FUZZ_TEST_COUNT = 300
+FUZZ_TEST_INIT_DOC_LENGTH = 100
+FUZZ_TEST_OTS_LENGTH = 10
+
+
+def to_byte_ots(doc: str, ot_raw_list: Any) -> list[Any]:
+    """Convert ots counting characters of doc to ots counting UTF-8 bytes"""
+    byte_ots: list[Any] = []
+    pos = 0
+    for ot_raw in ot_raw_list:
+        if isinstance(ot_raw, int):
+            byte_ots.append(len(doc[pos : pos + ot_raw].encode()))
+            pos += ot_raw
+        else:
+            byte_ots.append(ot_raw)
+            if isinstance(ot_raw, dict):
+                pos += len(ot_raw["d"])
+    return byte_ots
+
+
+def test_apply() -> None:
+    with pytest.raises(TypeError):
+        utf8.apply("abc", [])  # type: ignore
+
+    with pytest.raises(TypeError):
+        utf8.apply(b"abc", 1234)  # type: ignore
+
+    with pytest.raises(ValueError):
+        utf8.apply(b"abc", [3, 4])
+
+    doc = "héllo wörld".encode()
+    ot_raw_list: list[Any] = [1, {"d": "é"}, "e", 7, "ö"]
+    expected = "hello wöörld".encode()
+
+    assert utf8.apply(doc, ot_raw_list) == expected
+    assert utf8.apply(memoryview(doc), ot_raw_list) == expected
+
+    doc_buffer = bytearray(doc)
+    assert utf8.apply(doc_buffer, ot_raw_list) is doc_buffer
+    assert doc_buffer == expected
+
+    assert utf8.apply(doc, [3, "\U0001f600"]) == "hé\U0001f600llo wörld".encode()
+
+    # skip inside of a character
+    with pytest.raises(ValueError):
+        utf8.apply(doc, [2, "x"])
+
+    with pytest.raises(ValueError):
+        utf8.apply(doc, [1, {"d": "e"}])
+
+    with pytest.raises(ValueError):
+        utf8.apply(doc, [14, "x"])
+
+    # a failed edit does not change the doc
+    doc_buffer = bytearray(doc)
+    with pytest.raises(ValueError):
+        utf8.apply(doc_buffer, ["x", 1, {"d": "x"}])
+    assert doc_buffer == doc
+
+
+def test_inverse_apply() -> None:
+    with pytest.raises(TypeError):
+        utf8.inverse_apply("abc", [])  # type: ignore
+
+    doc = "hello wöörld".encode()
+    ot_raw_list: list[Any] = [1, {"d": "é"}, "e", 7, "ö"]
+    expected = "héllo wörld".encode()
+
+    assert utf8.inverse_apply(doc, ot_raw_list) == expected
+
+    doc_buffer = bytearray(doc)
+    assert utf8.inverse_apply(doc_buffer, ot_raw_list) is doc_buffer
+    assert doc_buffer == expected
+
+    with pytest.raises(ValueError):
+        utf8.inverse_apply(doc, [8, {"d": "x"}])
+
+
+def test_transform_compose() -> None:
+    with pytest.raises(TypeError):
+        utf8.transform(1234, [], "left")  # type: ignore
+
+    with pytest.raises(TypeError):
+        utf8.compose([], 1234)  # type: ignore
+
+    with pytest.raises(ValueError):
+        utf8.compose([3, 4], [])
+
+    assert utf8.transform(["é"], ["ab"], "right") == [2, "é"]
+    assert utf8.transform([{"d": "é"}], [2, "x"], "left") == [{"d": "é"}]
+    assert utf8.compose(["é"], [2, "x"]) == ["éx"]
+    assert utf8.compose(["éa"], [2, {"d": "a"}]) == ["é"]
+
+    # splitting a character
+    with pytest.raises(ValueError):
+        utf8.compose(["é"], [1, "x"])
+
+    with pytest.raises(ValueError):
+        utf8.transform([{"d": "é"}], [1, "x"], "left")
+
+
+def test_fuzz() -> None:
+    for _ in range(FUZZ_TEST_COUNT):
+        doc = utils.make_random_doc(FUZZ_TEST_INIT_DOC_LENGTH, utils.UNICODE_ALPHABET)
+        ots_1 = normalize(
+            utils.make_random_ots(
+                doc, FUZZ_TEST_OTS_LENGTH, alphabet=utils.UNICODE_ALPHABET
+            )
+        )
+        ots_2 = normalize(
+            utils.make_random_ots(
+                doc, FUZZ_TEST_OTS_LENGTH, alphabet=utils.UNICODE_ALPHABET
+            )
+        )
+        doc_1 = apply(doc, ots_1)
+        doc_2 = apply(doc, ots_2)
+
+        byte_ots_1 = to_byte_ots(doc, ots_1)
+        byte_ots_2 = to_byte_ots(doc, ots_2)
+
+        assert utf8.apply(doc.encode(), byte_ots_1) == doc_1.encode()
+        assert utf8.inverse_apply(doc_1.encode(), byte_ots_1) == doc.encode()
+
+        doc_buffer = bytearray(doc.encode())
+        utf8.apply(doc_buffer, byte_ots_1)
+        assert doc_buffer == doc_1.encode()
+
+        for side in ("left", "right"):
+            expected = to_byte_ots(doc_2, transform(ots_1, ots_2, side))
+            assert utf8.transform(byte_ots_1, byte_ots_2, side) == expected
+
+        ots_3 = normalize(
+            utils.make_random_ots(
+                doc_1, FUZZ_TEST_OTS_LENGTH, alphabet=utils.UNICODE_ALPHABET
+            )
+        )
+        assert utf8.compose(byte_ots_1, to_byte_ots(doc_1, ots_3)) == to_byte_ots(
+            doc, compose(ots_1, ots_3)
+        )
@@ -5,30 +5,55 @@ from typing import Union
 
 OTRawListType = Sequence[Union[int, str, dict[str, str]]]
 
+# letters with multi-byte and non-BMP characters
+UNICODE_ALPHABET = (
+    string.ascii_letters + " \n\u00e9\u00df\uac00\u4e2d\U0001f600\U0001d518"
+)
 
-def make_random_doc(amount: int) -> str:
+INVALID_OT_RAWS: list[object] = [
+    0,
+    -1,
+    "",
+    {"d": ""},
+    {"d": 1},
+    {"i": "a"},
+    1.5,
+    None,
+    b"a",
+    ["a"],
+    (0, 1),
+    (4, "a"),
+    (1, 0),
+    (2, ""),
+    (3, ""),
+    (1, 2, 3),
+]
+
+
+def make_random_doc(amount: int, alphabet: str = string.ascii_letters) -> str:
     if amount < 10:
         amount = 10
 
-    return "".join(random.choices(string.ascii_letters, k=amount))
+    return "".join(random.choices(alphabet, k=amount))
 
 
 def make_random_ots(
     doc: str,
     n: int,
     ids_weights: tuple[float, float, float] = (0.4, 0.4, 0.2),
+    alphabet: str = string.ascii_letters,
 ) -> OTRawListType:
     offset = 0
     ot_raw_list: list[Union[int, str, dict]] = []
     for _ in range(n):
         if len(doc) - offset == 0:
-            (action,) = random.choices(["i", "d"], ids_weights[:2], k=1)
+            action = "i"
         else:
             (action,) = random.choices(["i", "d", "s"], ids_weights, k=1)
 
         if action == "i":
             amount = random.randint(1, max(1, min(len(doc) - offset, len(doc) // n)))
-            ot_raw_list.append("".join(random.choices(string.ascii_letters, k=amount)))
+            ot_raw_list.append("".join(random.choices(alphabet, k=amount)))
 
         elif action == "d":
             amount = random.randint(1, max(1, min(len(doc) - offset, len(doc) // n)))
@@ -41,3 +66,33 @@ def make_random_ots(
             offset += amount
 
     return ot_raw_list
+
+
+def to_tuple_ots(ot_raw_list: OTRawListType) -> list[tuple[int, Union[int, str]]]:
+    ot_tuple_list: list[tuple[int, Union[int, str]]] = []
+    for ot_raw in ot_raw_list:
+        if isinstance(ot_raw, int):
+            ot_tuple_list.append((1, ot_raw))
+        elif isinstance(ot_raw, str):
+            ot_tuple_list.append((2, ot_raw))
+        else:
+            ot_tuple_list.append((3, ot_raw["d"]))
+    return ot_tuple_list
+
+
+def make_broken_ots(ot_raw_list: OTRawListType) -> list[object]:
+    """Break ots by one random mutation"""
+    broken: list[object] = list(ot_raw_list)
+    mutation = random.choice(["invalid", "duplicate", "trailing_skip", "drop"])
+
+    if mutation == "invalid" or not broken:
+        broken.insert(random.randint(0, len(broken)), random.choice(INVALID_OT_RAWS))
+    elif mutation == "duplicate":
+        idx = random.randrange(len(broken))
+        broken.insert(idx, broken[idx])
+    elif mutation == "trailing_skip":
+        broken.append(random.randint(1, 5))
+    elif mutation == "drop":
+        del broken[random.randrange(len(broken))]
+
+    return broken